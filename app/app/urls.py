@@ -39,4 +39,6 @@ urlpatterns = [
     path('medicine/', include('medicine.urls')),
     path('contact/', include('contact.urls')),
     path('church/', include('church.urls')),
+    path('sync/', include('sync.urls')),
+    path('reports/', include('reports.urls')),
 ]
@@ -5,11 +5,16 @@ from rest_framework import serializers
 
 from django.utils import timezone
 
+from core.serializers import DynamicFieldsMixin
 from core.utils import PROVINCES_CUBA
 from core.models import (
     Municipality,
     Denomination,
     Church,
+    ChurchDiseaseStats,
+    ChurchMedicineStats,
+    ChurchStats,
+    ExpiringStock,
     Note
 )
 from contact.serializers import (
@@ -19,7 +24,8 @@ from contact.serializers import (
 )
 
 
-class BaseNameOnlyModelSerializer(serializers.ModelSerializer):
+class BaseNameOnlyModelSerializer(DynamicFieldsMixin,
+                                  serializers.ModelSerializer):
     """Basic id-name only for models serializers."""
 
     class Meta:
@@ -109,3 +115,55 @@ class ChurchDetailSerializer(ChurchSerializer):
         )
 
         return church
+
+
+class ChurchDiseaseStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the treatment count of a disease in a church."""
+    name = serializers.CharField(source='disease.name', read_only=True)
+
+    class Meta:
+        model = ChurchDiseaseStats
+        fields = ['disease', 'name', 'treatments']
+        read_only_fields = fields
+
+
+class ChurchMedicineStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the prescription count of a medicine in a church."""
+    name = serializers.CharField(source='medicine.name', read_only=True)
+
+    class Meta:
+        model = ChurchMedicineStats
+        fields = ['medicine', 'name', 'prescriptions']
+        read_only_fields = fields
+
+
+class ChurchStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the statistics of a church."""
+    diseases = ChurchDiseaseStatsSerializer(many=True, read_only=True)
+    medicines = ChurchMedicineStatsSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ChurchStats
+        fields = ['church', 'patients', 'treatments', 'diseases',
+                  'medicines']
+        read_only_fields = fields
+
+
+class ProvinceStatsSerializer(serializers.Serializer):
+    """Serializer for the church statistics rolled up by province."""
+    province = serializers.CharField(allow_null=True)
+    churches = serializers.IntegerField()
+    patients = serializers.IntegerField()
+    treatments = serializers.IntegerField()
+
+
+class ExpiringStockSerializer(serializers.ModelSerializer):
+    """Serializer for the stock of a church expiring soon."""
+    name = serializers.CharField(source='medicine.name', read_only=True)
+    batch = serializers.CharField(source='medicine.batch', read_only=True)
+
+    class Meta:
+        model = ExpiringStock
+        fields = ['id', 'medicine', 'name', 'batch', 'expiry_date',
+                  'quantity']
+        read_only_fields = fields
@@ -9,6 +9,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import (
+    Contact,
     Denomination,
     Municipality,
     Church
@@ -124,6 +125,31 @@ class PrivateChurchAPITest(TestCase):
         res = self.client.get(CHURCH_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_filter_churches(self):
+        """Test filtering churches by municipality, province, denomination."""
+        havana = create_church(name='Havana', denomination_name='Metodista',
+                               municipality_name='Plaza')
+        havana.municipality.province = 'HAB'
+        havana.municipality.save()
+        matanzas = create_church(name='Matanzas',
+                                 denomination_name='Bautista',
+                                 municipality_name='Cardenas')
+        matanzas.municipality.province = 'MTZ'
+        matanzas.municipality.save()
+
+        def ids(params):
+            res = self.client.get(CHURCH_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return [item['id'] for item in res.data['results']]
+
+        self.assertEqual(ids({'municipality': havana.municipality.id}),
+                         [havana.id])
+        self.assertEqual(ids({'province': 'mtz'}), [matanzas.id])
+        self.assertEqual(ids({'province': 'HAB,MTZ'}),
+                         [havana.id, matanzas.id])
+        self.assertEqual(ids({'denomination': matanzas.denomination.id}),
+                         [matanzas.id])
+
     def test_detail_church_authenticated(self):
         """
         Test that authenticated users can access the details of a church.
@@ -155,3 +181,45 @@ class PrivateChurchAPITest(TestCase):
         url = detail_url(church.id)
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_retrieve_church_not_modified(self):
+        """Test a current ETag gets a 304 with a single query."""
+        church = create_church()
+        church.priest = Contact.objects.create(name='Priest')
+        church.save()
+        url = detail_url(church.id)
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_retrieve_church_invalid_id(self):
+        """Test a non numeric id is not found."""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_church_modified(self):
+        """Test changes to the church or its rendered relations renew it."""
+        church = create_church()
+        church.priest = Contact.objects.create(name='Priest')
+        church.save()
+        url = detail_url(church.id)
+        etag = self.client.get(url)['ETag']
+
+        church.priest.name = 'New Priest'
+        church.priest.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['priest']['name'], 'New Priest')
+        self.assertNotEqual(res['ETag'], etag)
+
+        etag = res['ETag']
+        self.client.patch(url, {'name': 'New Name'}, format='json')
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,150 @@
+"""
+Tests for the church statistics API.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    Medicine,
+    Municipality,
+    Patient,
+    Treatment,
+)
+
+
+PROVINCE_STATS_URL = reverse('church:church-province-stats')
+
+
+def stats_url(church_id):
+    """Create and return the statistics URL of a church."""
+    return reverse('church:church-stats', args=[church_id])
+
+
+class PublicChurchStatsAPITests(TestCase):
+    """Test unauthenticated church statistics requests."""
+
+    def test_stats_unauthenticated(self):
+        """Test the statistics require authentication."""
+        res = APIClient().get(PROVINCE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateChurchStatsAPITests(TestCase):
+    """Test the church statistics of authenticated users."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(
+            name='Iglesia', denomination=denomination,
+            municipality=Municipality.objects.create(name='Playa',
+                                                     province='LHA'),
+        )
+        self.other = Church.objects.create(
+            name='Otra', denomination=denomination,
+            municipality=Municipality.objects.create(name='Cardenas',
+                                                     province='MTZ'),
+        )
+        self.diseases = [Disease.objects.create(name=f'Disease {index}')
+                         for index in range(3)]
+        self.medicine = Medicine.objects.create(name='Salbutamol')
+
+    def create_treatments(self, church, diseases, ci):
+        """Create a patient of the church with a treatment per disease."""
+        patient = Patient.objects.create(
+            contact=Contact.objects.create(name=f'Patient {ci}'),
+            ci=ci, church=church,
+        )
+        for disease in diseases:
+            treatment = Treatment.objects.create(patient=patient,
+                                                 disease=disease)
+            treatment.medicine.add(self.medicine)
+
+    def test_church_stats(self):
+        """Test the statistics of a church with its top diseases."""
+        self.create_treatments(self.church, self.diseases, '00000000001')
+        self.create_treatments(self.church, self.diseases[1:], '00000000002')
+
+        res = self.client.get(stats_url(self.church.id), {'top': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['patients'], 2)
+        self.assertEqual(res.data['treatments'], 5)
+        self.assertEqual(
+            [(row['name'], row['treatments']) for row in res.data['diseases']],
+            [('Disease 1', 2), ('Disease 2', 2)],
+        )
+        self.assertEqual(
+            [(row['name'], row['prescriptions'])
+             for row in res.data['medicines']],
+            [('Salbutamol', 5)],
+        )
+
+    def test_church_stats_constant_queries(self):
+        """Test the statistics take the same queries for more data."""
+        self.create_treatments(self.church, self.diseases[:1], '00000000001')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(stats_url(self.church.id))
+        self.create_treatments(self.church, self.diseases, '00000000002')
+        self.create_treatments(self.church, self.diseases, '00000000003')
+
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(stats_url(self.church.id))
+
+        self.assertEqual(res.data['treatments'], 7)
+        self.assertEqual(len(many), len(few))
+
+    def test_church_stats_not_found(self):
+        """Test the statistics of a missing church."""
+        res = self.client.get(stats_url(0))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_province_stats(self):
+        """Test the statistics rolled up by province."""
+        self.create_treatments(self.church, self.diseases, '00000000001')
+        self.create_treatments(self.other, self.diseases[:1], '00000000002')
+        self.create_treatments(self.other, [], '00000000003')
+
+        res = self.client.get(PROVINCE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [dict(row) for row in res.data['provinces']],
+            [
+                {'province': 'LHA', 'churches': 1, 'patients': 1,
+                 'treatments': 3},
+                {'province': 'MTZ', 'churches': 1, 'patients': 2,
+                 'treatments': 1},
+            ],
+        )
+        self.assertEqual(res.data['diseases'][0],
+                         {'disease': self.diseases[0].id,
+                          'name': 'Disease 0', 'treatments': 2})
+        self.assertEqual(res.data['medicines'][0]['prescriptions'], 4)
+
+    def test_province_stats_filtered(self):
+        """Test the statistics of the given provinces only."""
+        self.create_treatments(self.church, self.diseases, '00000000001')
+        self.create_treatments(self.other, self.diseases[:1], '00000000002')
+
+        res = self.client.get(PROVINCE_STATS_URL, {'province': 'mtz'})
+
+        self.assertEqual([row['province'] for row in res.data['provinces']],
+                         ['MTZ'])
+        self.assertEqual(len(res.data['diseases']), 1)
+        self.assertEqual(res.data['medicines'][0]['prescriptions'], 1)
@@ -3,33 +3,62 @@ Viewsets for the church APP.
 """
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from django.db.models import Count, F, Sum
+
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework import (
     viewsets,
 )
 
 from church import serializers
 
+from core import filters
+from core.mixins import (
+    CachedListMixin,
+    ConditionalGetMixin,
+    OptimizedQuerySetMixin,
+)
+from core.pagination import ExpiryCursorPagination, IdCursorPagination
 from core.models import (
     Municipality,
     Denomination,
-    Church
+    Church,
+    ChurchDiseaseStats,
+    ChurchMedicineStats,
+    ChurchStats,
+    ExpiringStock,
 )
 
 
-class BasePrivateViewSet(viewsets.ModelViewSet):
+# Number of diseases and medicines listed in the statistics by default.
+STATS_TOP = 10
+STATS_MAX_TOP = 100
+
+
+def top_param(request):
+    """Return the number of diseases and medicines of the statistics."""
+    top = filters.int_param(request, 'top') or STATS_TOP
+    return max(1, min(top, STATS_MAX_TOP))
+
+
+class BasePrivateViewSet(ConditionalGetMixin, OptimizedQuerySetMixin,
+                         viewsets.ModelViewSet):
     """Base authorization classes viewset for private endpoints."""
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    pagination_class = IdCursorPagination
 
 
-class MunicipalityViewSet(BasePrivateViewSet):
+class MunicipalityViewSet(CachedListMixin, BasePrivateViewSet):
     """Viewset for the municipality."""
     serializer_class = serializers.MunicipalitySerializer
     queryset = Municipality.objects.all()
 
 
-class DenominationViewSet(BasePrivateViewSet):
+class DenominationViewSet(CachedListMixin, BasePrivateViewSet):
     """Viewset for the municipality."""
     serializer_class = serializers.DenominationSerializer
     queryset = Denomination.objects.all()
@@ -40,9 +69,121 @@ class ChurchViewSet(BasePrivateViewSet):
     serializer_class = serializers.ChurchDetailSerializer
     queryset = Church.objects.all()
 
+    def get_queryset(self):
+        """
+        Filter churches by `municipality` and `denomination` ids and by
+        `province` codes.
+        """
+        queryset = super().get_queryset()
+        municipalities = filters.int_list_param(self.request, 'municipality')
+        if municipalities:
+            queryset = queryset.filter(municipality__in=municipalities)
+        provinces = filters.str_param(self.request, 'province')
+        if provinces:
+            queryset = queryset.filter(
+                municipality__province__in=provinces.upper().split(',')
+            )
+        denominations = filters.int_list_param(self.request, 'denomination')
+        if denominations:
+            queryset = queryset.filter(denomination__in=denominations)
+
+        return queryset
+
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
             return serializers.ChurchSerializer
 
         return self.serializer_class
+
+    @action(detail=True, methods=['get'],
+            serializer_class=serializers.ChurchStatsSerializer)
+    def stats(self, request, pk=None):
+        """
+        Return the patient and treatment counts of the church, with its
+        `top` diseases by treatments and medicines by prescriptions, read
+        from the statistics kept up to date as the data changes.
+        """
+        top = top_param(request)
+        stats = get_object_or_404(ChurchStats.objects.all(), church=pk)
+        stats.diseases = ChurchDiseaseStats.objects.filter(
+            church=stats.church_id, treatments__gt=0
+        ).select_related('disease').order_by('-treatments', 'disease')[:top]
+        stats.medicines = ChurchMedicineStats.objects.filter(
+            church=stats.church_id, prescriptions__gt=0
+        ).select_related('medicine').order_by(
+            '-prescriptions', 'medicine'
+        )[:top]
+
+        return Response(self.get_serializer(stats).data)
+
+    @action(detail=False, methods=['get'], url_path='stats',
+            url_name='province-stats',
+            serializer_class=serializers.ProvinceStatsSerializer)
+    def province_stats(self, request):
+        """
+        Return the church statistics rolled up by province, for the
+        `province` codes when given, with the `top` diseases and medicines
+        across those churches.
+        """
+        top = top_param(request)
+        churches = ChurchStats.objects.all()
+        diseases = ChurchDiseaseStats.objects.filter(treatments__gt=0)
+        medicines = ChurchMedicineStats.objects.filter(prescriptions__gt=0)
+        provinces = filters.str_param(request, 'province')
+        if provinces:
+            lookup = {'church__municipality__province__in':
+                      provinces.upper().split(',')}
+            churches = churches.filter(**lookup)
+            diseases = diseases.filter(**lookup)
+            medicines = medicines.filter(**lookup)
+
+        rows = churches.values(
+            province=F('church__municipality__province')
+        ).annotate(
+            churches=Count('church'),
+            total_patients=Sum('patients'),
+            total_treatments=Sum('treatments'),
+        ).order_by('province')
+        top_diseases = diseases.values(
+            'disease', name=F('disease__name')
+        ).annotate(total=Sum('treatments')).order_by('-total', 'disease')
+        top_medicines = medicines.values(
+            'medicine', name=F('medicine__name')
+        ).annotate(total=Sum('prescriptions')).order_by('-total', 'medicine')
+
+        return Response({
+            'provinces': self.get_serializer([
+                {**row, 'patients': row['total_patients'],
+                 'treatments': row['total_treatments']}
+                for row in rows
+            ], many=True).data,
+            'diseases': [
+                {'disease': row['disease'], 'name': row['name'],
+                 'treatments': row['total']}
+                for row in top_diseases[:top]
+            ],
+            'medicines': [
+                {'medicine': row['medicine'], 'name': row['name'],
+                 'prescriptions': row['total']}
+                for row in top_medicines[:top]
+            ],
+        })
+
+    @action(detail=True, methods=['get'],
+            pagination_class=ExpiryCursorPagination,
+            serializer_class=serializers.ExpiringStockSerializer)
+    def expiring(self, request, pk=None):
+        """
+        List the medicine batches in stock at the church expiring soon,
+        the first to expire first, as precomputed every night by the
+        `precompute_expiring_stock` command.
+        """
+        church = get_object_or_404(Church.objects.only('id'), pk=pk)
+        queryset = ExpiringStock.objects.filter(
+            church=church
+        ).select_related('medicine')
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
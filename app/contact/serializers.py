@@ -1,6 +1,8 @@
 """
 Serializers for the contact API.
 """
+from collections import Counter
+
 from rest_framework import serializers
 
 from django.utils import timezone
@@ -10,6 +12,8 @@ from django.shortcuts import get_object_or_404
 
 from django_countries.serializers import CountryFieldMixin
 
+from core import stats
+from core.serializers import DynamicFieldsMixin
 from core.models import (
     Note,
     Contact,
@@ -18,6 +22,7 @@ from core.models import (
     Medic,
     Donor,
     Patient,
+    PatientCodeSequence,
     Church
 )
 from core.utils import (
@@ -27,7 +32,7 @@ from core.utils import (
 import re
 
 
-class NoteSerializer(serializers.ModelSerializer):
+class NoteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the Note model."""
 
     class Meta:
@@ -36,7 +41,7 @@ class NoteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the contact model."""
     user = serializers.PrimaryKeyRelatedField(
         queryset=get_user_model().objects.all(),
@@ -61,7 +66,34 @@ class ContactSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class PhoneNumberSerializer(serializers.ModelSerializer):
+class ContactSearchPatientSerializer(serializers.ModelSerializer):
+    """Patient record shown in the contact search results."""
+
+    class Meta:
+        model = Patient
+        fields = ['id', 'code', 'ci', 'church']
+        read_only_fields = fields
+
+
+class ContactSearchSerializer(serializers.ModelSerializer):
+    """Contact search result with its patient record and phone numbers."""
+    patient = ContactSearchPatientSerializer(read_only=True, allow_null=True)
+    phone_numbers = serializers.SlugRelatedField(
+        source='phonenumber_set',
+        slug_field='number',
+        many=True,
+        read_only=True
+    )
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Contact
+        fields = ['id', 'name', 'lastname', 'patient', 'phone_numbers',
+                  'rank']
+        read_only_fields = fields
+
+
+class PhoneNumberSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the PhoneNumber model."""
     contact = serializers.PrimaryKeyRelatedField(
         many=False,
@@ -89,7 +121,7 @@ class PhoneNumberSerializer(serializers.ModelSerializer):
         return number
 
 
-class WorkingSiteSerializer(serializers.ModelSerializer):
+class WorkingSiteSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the working site model."""
 
     class Meta:
@@ -98,7 +130,8 @@ class WorkingSiteSerializer(serializers.ModelSerializer):
         read_only_fiels = ['id']
 
 
-class BaseContactChildrenSerializer(serializers.ModelSerializer):
+class BaseContactChildrenSerializer(DynamicFieldsMixin,
+                                    serializers.ModelSerializer):
     """Base serializer for diferent diferent contact types."""
     contact = ContactSerializer(read_only=False)
 
@@ -202,3 +235,158 @@ class PatientSerializer(BaseContactChildrenSerializer):
         )
 
         return patient
+
+
+class PatientBulkContactSerializer(ContactSerializer):
+    """Contact fields accepted when registering patients in bulk."""
+
+    class Meta(ContactSerializer.Meta):
+        fields = [
+            field for field in ContactSerializer.Meta.fields
+            if field != 'note'
+        ]
+
+
+class PatientBulkListSerializer(serializers.ListSerializer):
+    """
+    Create or update a batch of patients with a fixed number of queries,
+    reporting errors per item in the order they were sent.
+    """
+
+    def to_internal_value(self, data):
+        """Validate every item, then check the batch against the DB."""
+        items = super().to_internal_value(data)
+        errors = [{} for _ in items]
+
+        if self.instance is not None:
+            self._validate_ids(items, errors)
+        self._validate_churches(items, errors)
+        self._validate_cis(items, errors)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
+
+    def _validate_ids(self, items, errors):
+        """Check every update item points to a distinct known patient."""
+        self.instances = {patient.id: patient for patient in self.instance}
+        seen = set()
+        for item, error in zip(items, errors):
+            patient_id = item.get('id')
+            if patient_id is None:
+                error['id'] = [_('This field is required.')]
+            elif patient_id not in self.instances:
+                error['id'] = [_('Patient do not exists.')]
+            elif patient_id in seen:
+                error['id'] = [_('Patient repeated in the batch.')]
+            seen.add(patient_id)
+
+    def _validate_churches(self, items, errors):
+        """Check the churches of the batch with a single query."""
+        church_ids = {
+            item['church_id'] for item in items if 'church_id' in item
+        }
+        existing = set(
+            Church.objects.filter(id__in=church_ids)
+            .values_list('id', flat=True)
+        )
+        for item, error in zip(items, errors):
+            if 'church_id' in item and item['church_id'] not in existing:
+                error['church'] = [_('Church do not exists.')]
+
+    def _validate_cis(self, items, errors):
+        """Check ci uniqueness in the batch and the DB with one query."""
+        owners = dict(
+            Patient.objects.filter(
+                ci__in=[item['ci'] for item in items if 'ci' in item]
+            ).values_list('ci', 'id')
+        )
+        seen = set()
+        for item, error in zip(items, errors):
+            if 'ci' not in item:
+                continue
+            owner = owners.get(item['ci'])
+            if item['ci'] in seen or \
+                    (owner is not None and owner != item.get('id')):
+                error['ci'] = [_('Patient with this ci already exists.')]
+            seen.add(item['ci'])
+
+    def create(self, validated_data):
+        """Insert the contacts and patients of the batch in bulk."""
+        today = timezone.now().date()
+        contacts = Contact.objects.bulk_create([
+            Contact(**item.pop('contact')) for item in validated_data
+        ])
+
+        numbers = {}
+        counts = Counter(item['church_id'] for item in validated_data)
+        for church_id, count in counts.items():
+            last = PatientCodeSequence.objects.allocate(church_id, count)
+            numbers[church_id] = iter(range(last - count + 1, last + 1))
+
+        patients = []
+        for contact, item in zip(contacts, validated_data):
+            item.pop('id', None)
+            church_id = item['church_id']
+            patients.append(Patient(
+                contact=contact,
+                code=f'{church_id}-{next(numbers[church_id])}',
+                inscript=item.pop('inscript', None) or today,
+                **item
+            ))
+
+        patients = Patient.objects.bulk_create(patients)
+        # bulk_create skips the signals keeping the church statistics.
+        stats.add_patients(counts)
+
+        return patients
+
+    def update(self, instances, validated_data):
+        """Apply the batch changes with one bulk update per table."""
+        patients, contact_fields, patient_fields = [], set(), set()
+        moved_churches = set()
+        for item in validated_data:
+            patient = self.instances[item.pop('id')]
+            if item.get('church_id', patient.church_id) != patient.church_id:
+                moved_churches |= {patient.church_id, item['church_id']}
+            for attr, value in item.pop('contact', {}).items():
+                setattr(patient.contact, attr, value)
+                contact_fields.add(attr)
+            for attr, value in item.items():
+                setattr(patient, attr, value)
+                patient_fields.add(attr)
+            patients.append(patient)
+
+        # bulk_update skips auto_now, so the timestamps are set here.
+        now = timezone.now()
+        if contact_fields:
+            for patient in patients:
+                patient.contact.updated_at = now
+            Contact.objects.bulk_update(
+                [patient.contact for patient in patients],
+                contact_fields | {'updated_at'})
+        if patient_fields:
+            for patient in patients:
+                patient.updated_at = now
+            Patient.objects.bulk_update(patients,
+                                        patient_fields | {'updated_at'})
+        if moved_churches:
+            stats.rebuild_church_stats(moved_churches)
+
+        return patients
+
+
+class PatientBulkSerializer(PatientSerializer):
+    """Serializer for the items of the patient bulk endpoint."""
+    id = serializers.IntegerField(required=False)
+    contact = PatientBulkContactSerializer()
+    church = serializers.IntegerField(source='church_id')
+
+    class Meta(PatientSerializer.Meta):
+        list_serializer_class = PatientBulkListSerializer
+        extra_kwargs = {'ci': {'validators': []}}
+
+    def validate_contact(self, contact_info):
+        """Keep the contact data, the list serializer inserts it in bulk."""
+        return contact_info
@@ -0,0 +1,133 @@
+"""
+Tests for the contact search API.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Patient,
+    PhoneNumber,
+)
+
+
+SEARCH_URL = reverse('contact:contact-search')
+
+
+def create_contact(name, lastname=None, ci=None, church=None, number=None):
+    """Create and return a contact, as a patient if a CI is given."""
+    contact = Contact.objects.create(name=name, lastname=lastname)
+    if ci:
+        Patient.objects.create(contact=contact, ci=ci, church=church)
+    if number:
+        PhoneNumber.objects.create(contact=contact, number=number)
+
+    return contact
+
+
+class PrivateContactSearchAPITests(TestCase):
+    """Test the authenticated contact search."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(id=11111,
+                                                    email='user@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(name='Iglesia',
+                                            denomination=denomination)
+
+    def search(self, **params):
+        """Search and return the ids of the results."""
+        res = self.client.get(SEARCH_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [result['id'] for result in res.data['results']]
+
+    def test_search_by_name_and_lastname(self):
+        """Test contacts are matched by a part of the name or last name."""
+        maria = create_contact('María', 'González')
+        jose = create_contact('José', 'Gonzalo')
+        create_contact('Ana', 'Pérez')
+
+        self.assertEqual(set(self.search(q='gonz')), {maria.id, jose.id})
+        self.assertEqual(self.search(q='marí'), [maria.id])
+
+    def test_search_by_ci_and_phone(self):
+        """Test contacts are matched by patient CI or phone number."""
+        patient = create_contact('María', ci='85010112345',
+                                 church=self.church)
+        phone = create_contact('José', number='+5352123456')
+
+        self.assertEqual(self.search(q='0101123'), [patient.id])
+        self.assertEqual(self.search(q='52123'), [phone.id])
+
+    def test_search_every_term_matches(self):
+        """Test every word of the query must match the contact."""
+        maria = create_contact('María', 'González')
+        create_contact('María', 'Pérez')
+
+        self.assertEqual(self.search(q='maría gonzález'), [maria.id])
+
+    def test_search_full_name_ranked_first(self):
+        """Test a contact starting with the query ranks above the rest."""
+        create_contact('Rosa', 'Anabel')
+        ana = create_contact('Ana', 'Rosa')
+
+        ids = self.search(q='ana')
+
+        self.assertEqual(ids[0], ana.id)
+        self.assertEqual(len(ids), 2)
+
+    def test_search_result_fields(self):
+        """Test results embed the patient record and phone numbers."""
+        contact = create_contact('María', 'González', ci='85010112345',
+                                 church=self.church, number='+5352123456')
+
+        res = self.client.get(SEARCH_URL, {'q': 'maría'})
+
+        result = res.data['results'][0]
+        self.assertEqual(result['patient']['ci'], '85010112345')
+        self.assertEqual(result['patient']['code'], contact.patient.code)
+        self.assertEqual(result['phone_numbers'], ['+5352123456'])
+        self.assertIn('rank', result)
+
+    def test_search_patients_only(self):
+        """Test the patients filter drops contacts that are not patients."""
+        patient = create_contact('María', ci='85010112345',
+                                 church=self.church)
+        create_contact('María')
+
+        self.assertEqual(self.search(q='maría', patients=1), [patient.id])
+
+    def test_search_short_query(self):
+        """Test a query under three characters is rejected."""
+        for params in ({}, {'q': 'ma'}, {'q': '  m '}):
+            res = self.client.get(SEARCH_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('q', res.data)
+
+    def test_search_queries_do_not_grow(self):
+        """Test the search queries do not grow with the results."""
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(SEARCH_URL, {'q': 'maría'})
+            return len(queries)
+
+        create_contact('María', ci='85010112345', church=self.church,
+                       number='+5352000001')
+        few = count_queries()
+        for index in range(2, 8):
+            create_contact('María', ci=f'9501011234{index}',
+                           church=self.church, number=f'+535200000{index}')
+
+        self.assertEqual(count_queries(), few)
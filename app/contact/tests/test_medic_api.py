@@ -154,6 +154,18 @@ class PrivateMedicAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_retrieve_medic_without_etag(self):
+        """Test a medic, lacking an update time, is never answered 304."""
+        medic = create_medic()
+        url = detail_url(medic.id)
+        self.assertNotIn('ETag', self.client.get(url))
+
+        self.client.patch(url, {'specialty': 'Neurology'}, format='json')
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['specialty'], 'Neurology')
+
     def test_delete_medic_authenticated(self):
         """
         Test that authenticated users can delete a Medic.
@@ -3,7 +3,9 @@ Tests for the patient API.
 """
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -140,6 +142,31 @@ class PrivatePatientAPITest(TestCase):
         res = self.client.get(PATIENT_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_list_patients_query_count_constant(self):
+        """
+        Test listing patients costs the same queries for any number of rows.
+        """
+        church = Church.objects.get()
+
+        def add_patients(count):
+            for _ in range(count):
+                index = Patient.objects.count()
+                Patient.objects.create(
+                    contact=Contact.objects.create(name=f'Name {index}'),
+                    ci=f'{index:011d}',
+                    church=church
+                )
+
+        add_patients(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(PATIENT_URL)
+        add_patients(10)
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(PATIENT_URL)
+
+        self.assertEqual(len(res.data['results']), 12)
+        self.assertEqual(len(few), len(many))
+
     def test_detail_patient_authenticated(self):
         """
         Test that authenticated users can access the details of a patient.
@@ -161,6 +188,69 @@ class PrivatePatientAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_update_patient_keeps_code(self):
+        """
+        Test a patch neither renumbers the patient nor allocates a code.
+        """
+        patient = create_patient()
+        code = patient.code
+
+        url = detail_url(patient.id)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(url, {'ci': '10987654321'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patient.refresh_from_db()
+        self.assertEqual(patient.code, code)
+        self.assertEqual(res.data['code'], code)
+        statements = [query['sql'] for query in queries]
+        self.assertFalse(
+            [sql for sql in statements if 'core_patientcodesequence' in sql]
+        )
+        self.assertFalse(
+            [sql for sql in statements if 'ORDER BY "core_patient"' in sql]
+        )
+
+    def test_filter_patients(self):
+        """Test filtering patients by church, inscription date and ci."""
+        church = Church.objects.get()
+        other = Church.objects.create(name='Other', denomination=None)
+        old = Patient.objects.create(
+            contact=Contact.objects.create(name='Old'), ci='00000000001',
+            church=church, inscript='2020-01-15'
+        )
+        new = Patient.objects.create(
+            contact=Contact.objects.create(name='New'), ci='00000000002',
+            church=church, inscript='2024-06-01'
+        )
+        moved = Patient.objects.create(
+            contact=Contact.objects.create(name='Moved'), ci='00000000003',
+            church=other, inscript='2024-06-01'
+        )
+
+        def ids(params):
+            res = self.client.get(PATIENT_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return [item['id'] for item in res.data['results']]
+
+        self.assertEqual(ids({'church': church.id}), [old.id, new.id])
+        self.assertEqual(ids({'church': f'{church.id},{other.id}'}),
+                         [old.id, new.id, moved.id])
+        self.assertEqual(
+            ids({'church': church.id, 'inscript_after': '2024-01-01'}),
+            [new.id]
+        )
+        self.assertEqual(ids({'inscript_before': '2020-12-31'}), [old.id])
+        self.assertEqual(ids({'ci': '00000000003'}), [moved.id])
+
+    def test_filter_patients_invalid_params(self):
+        """Test invalid filter values are rejected."""
+        res = self.client.get(PATIENT_URL, {'church': 'one',
+                                            'inscript_after': '2024-13-01'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('church', res.data)
+
     def test_delete_patient_authenticated(self):
         """
         Test that authenticated users can delete a patient.
@@ -172,6 +262,29 @@ class PrivatePatientAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
 
+    def test_retrieve_patient_not_modified(self):
+        """Test a current ETag gets a 304 until the patient changes."""
+        patient = create_patient()
+        url = detail_url(patient.id)
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        patient.contact.name = 'Jane'
+        patient.contact.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['contact']['name'], 'Jane')
+
+    def test_retrieve_patient_invalid_id(self):
+        """Test a non numeric id is not found."""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
 
 class PatientModelTest(TestCase):
     """General test Cases"""
@@ -212,6 +325,17 @@ class PatientModelTest(TestCase):
         )
         self.assertEqual(patient2.code, f'{self.church.id}-2')
 
+    def test_patient_code_past_nine(self):
+        """Test codes keep counting numerically past the ninth patient."""
+        for index in range(11):
+            patient = Patient.objects.create(
+                contact=Contact.objects.create(name=f'Contact {index}'),
+                ci=f'{index:011d}',
+                church=self.church,
+            )
+
+        self.assertEqual(patient.code, f'{self.church.id}-11')
+
     def test_patient_relations(self):
         """Test the relationships between Patient and other models."""
         patient = Patient.objects.create(
@@ -0,0 +1,137 @@
+"""
+Tests for the patient bulk API.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Patient,
+    Contact,
+    Church,
+    Denomination
+)
+
+
+PATIENT_BULK_URL = reverse('contact:patient-bulk')
+
+
+def patient_payload(index, church):
+    """Return the payload of a new patient."""
+    return {
+        'contact': {'name': f'Name {index}', 'lastname': 'Doe'},
+        'ci': f'{index:011d}',
+        'church': church.id
+    }
+
+
+class PublicPatientBulkAPITests(TestCase):
+    """Tests for unauthenticated users calling the bulk endpoint."""
+
+    def test_bulk_create_unauthenticated(self):
+        """Test unauthenticated cannot create patients in bulk."""
+        res = APIClient().post(PATIENT_BULK_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivatePatientBulkAPITests(TestCase):
+    """Tests for authenticated users calling the bulk endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            id=999999,
+            email='test@example.com'
+        )
+        self.client.force_authenticate(user=self.user)
+        denomination = Denomination.objects.create(name="Denomination")
+        self.church = Church.objects.create(name="Church",
+                                            denomination=denomination)
+        self.other_church = Church.objects.create(name="Other Church",
+                                                  denomination=denomination)
+
+    def test_bulk_create_patients(self):
+        """Test creating a list of patients with sequential codes."""
+        payload = [patient_payload(i, self.church) for i in range(3)]
+        payload.append(patient_payload(3, self.other_church))
+
+        res = self.client.post(PATIENT_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Patient.objects.count(), 4)
+        self.assertEqual(Contact.objects.count(), 4)
+        self.assertEqual(
+            [item['code'] for item in res.data],
+            [f'{self.church.id}-1', f'{self.church.id}-2',
+             f'{self.church.id}-3', f'{self.other_church.id}-1']
+        )
+        patient = Patient.objects.get(ci=payload[0]['ci'])
+        self.assertEqual(patient.contact.name, 'Name 0')
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported by position and nothing saved."""
+        Patient.objects.create(
+            contact=Contact.objects.create(name='Existing'),
+            ci=f'{1:011d}',
+            church=self.church
+        )
+        payload = [patient_payload(i, self.church) for i in range(4)]
+        payload[2]['church'] = 0
+        payload[3]['ci'] = payload[0]['ci']
+
+        res = self.client.post(PATIENT_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('ci', res.data[1])
+        self.assertIn('church', res.data[2])
+        self.assertIn('ci', res.data[3])
+        self.assertEqual(Patient.objects.count(), 1)
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_bulk_create_query_count_constant(self):
+        """Test the number of queries does not grow with the batch."""
+        few = [patient_payload(i, self.church) for i in range(2)]
+        many = [patient_payload(i, self.church) for i in range(10, 30)]
+
+        with CaptureQueriesContext(connection) as few_queries:
+            self.client.post(PATIENT_BULK_URL, few, format='json')
+        with CaptureQueriesContext(connection) as many_queries:
+            res = self.client.post(PATIENT_BULK_URL, many, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(few_queries), len(many_queries))
+
+    def test_bulk_update_patients(self):
+        """Test updating a list of patients and their contacts."""
+        payload = [patient_payload(i, self.church) for i in range(2)]
+        res = self.client.post(PATIENT_BULK_URL, payload, format='json')
+        first, second = res.data
+
+        res = self.client.patch(PATIENT_BULK_URL, [
+            {'id': first['id'], 'contact': {'name': 'Renamed'}},
+            {'id': second['id'], 'ci': '99999999999'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patient = Patient.objects.get(id=first['id'])
+        self.assertEqual(patient.contact.name, 'Renamed')
+        self.assertEqual(patient.contact.lastname, 'Doe')
+        patient = Patient.objects.get(id=second['id'])
+        self.assertEqual(patient.ci, '99999999999')
+        self.assertEqual(patient.code, second['code'])
+
+    def test_bulk_update_unknown_patient(self):
+        """Test updating an unknown patient reports the item."""
+        res = self.client.patch(PATIENT_BULK_URL, [
+            {'id': 123456, 'ci': '99999999999'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
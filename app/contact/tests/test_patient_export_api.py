@@ -0,0 +1,143 @@
+"""
+Tests for the patient export API.
+"""
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    Medicine,
+    Municipality,
+    Patient,
+    PhoneNumber,
+    Treatment,
+)
+
+
+EXPORT_URL = reverse('contact:patient-export')
+
+
+def create_patient(index, church):
+    """Create and return a patient with a phone and a treatment."""
+    contact = Contact.objects.create(name=f'Patient {index}',
+                                     lastname='Pérez')
+    PhoneNumber.objects.create(contact=contact, number=f'+5350000{index:03d}')
+    patient = Patient.objects.create(contact=contact, ci=f'{index:011d}',
+                                     church=church)
+    treatment = Treatment.objects.create(
+        patient=patient,
+        disease=Disease.objects.create(name=f'Disease {index}'),
+    )
+    treatment.medicine.add(Medicine.objects.create(name=f'Medicine {index}'))
+
+    return patient
+
+
+class PublicPatientExportAPITests(TestCase):
+    """Test unauthenticated export requests."""
+
+    def test_anonymous_export(self):
+        """Test the export requires authentication."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivatePatientExportAPITests(TestCase):
+    """Test the authenticated patient export."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        municipality = Municipality.objects.create(name='Cárdenas',
+                                                   province='MTZ')
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(name='Iglesia',
+                                            denomination=denomination,
+                                            municipality=municipality)
+
+    def export(self, **params):
+        """Return the export response and its streamed content."""
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res, b''.join(res.streaming_content).decode()
+
+    def test_export_csv(self):
+        """Test the patients are streamed as CSV by default."""
+        patient = create_patient(1, self.church)
+
+        res, content = self.export()
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(content.splitlines()))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['code'], patient.code)
+        self.assertEqual(rows[0]['lastname'], 'Pérez')
+        self.assertEqual(rows[0]['phone_numbers'], '+5350000001')
+        self.assertEqual(rows[0]['province'], 'MTZ')
+        self.assertEqual(rows[0]['treatments'], 'Disease 1: Medicine 1')
+
+    def test_export_ndjson(self):
+        """Test each patient is a JSON document on its own line."""
+        create_patient(1, self.church)
+        create_patient(2, self.church)
+
+        res, content = self.export(output='ndjson')
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        documents = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([document['ci'] for document in documents],
+                         ['00000000001', '00000000002'])
+        self.assertEqual(documents[0]['treatments'], [
+            {'disease': 'Disease 1', 'medicines': ['Medicine 1']}
+        ])
+
+    def test_export_filters(self):
+        """Test the export follows the patient list filters."""
+        other = Church.objects.create(name='Otra',
+                                      denomination=self.church.denomination)
+        create_patient(1, self.church)
+        create_patient(2, other)
+
+        res, content = self.export(output='ndjson', church=other.id)
+
+        documents = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([document['church_id'] for document in documents],
+                         [other.id])
+
+    def test_export_invalid_output(self):
+        """Test an unknown output format is rejected."""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('output', res.data)
+
+    def test_export_queries_do_not_grow(self):
+        """Test the export reads the patients with a constant query count."""
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.export()
+            return len(queries)
+
+        create_patient(1, self.church)
+        few = count_queries()
+        for index in range(2, 8):
+            create_patient(index, self.church)
+
+        self.assertEqual(count_queries(), few)
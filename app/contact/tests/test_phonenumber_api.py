@@ -148,7 +148,7 @@ class PrivatePhoneNumberAPITests(TestCase):
         res = self.client.get(PHONE_NUMBER_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
 
     def test_update_phone_number(self):
         """Test updating a phone number."""
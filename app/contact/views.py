@@ -1,15 +1,33 @@
 """
 Viewsets for the contact APP.
 """
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
+
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework import (
+    status,
     viewsets,
 )
 
 from contact import serializers
 
+from core import filters
+from core.export import EXPORT_FORMATS, export_lines
+from core.mixins import (
+    CachedListMixin,
+    ConditionalGetMixin,
+    OptimizedQuerySetMixin,
+)
+from core.pagination import IdCursorPagination, RankedPagination
+from core.search import search_contacts
 from core.models import (
     Note,
     Contact,
@@ -21,10 +39,12 @@ from core.models import (
 )
 
 
-class BasePrivateViewSet(viewsets.ModelViewSet):
+class BasePrivateViewSet(ConditionalGetMixin, OptimizedQuerySetMixin,
+                         viewsets.ModelViewSet):
     """Base authorization classes viewset for private endpoints."""
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    pagination_class = IdCursorPagination
 
 
 class NoteViewSet(BasePrivateViewSet):
@@ -38,6 +58,32 @@ class ContactViewSet(BasePrivateViewSet):
     queryset = Contact.objects.all()
     serializer_class = serializers.ContactSerializer
 
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'search':
+            return serializers.ContactSearchSerializer
+
+        return self.serializer_class
+
+    @action(detail=False, methods=['get'], pagination_class=RankedPagination)
+    def search(self, request):
+        """
+        Search contacts whose name, last name, patient CI or phone number
+        contain every word of `q`, best matches first. With `patients=1`
+        only contacts registered as patients are returned.
+        """
+        query = filters.str_param(request, 'q')
+        if not query or len(query) < 3:
+            raise ValidationError({'q': _('Enter at least 3 characters.')})
+
+        queryset = search_contacts(self.get_queryset(), query)
+        if request.query_params.get('patients') in ('1', 'true'):
+            queryset = queryset.filter(patient__isnull=False)
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
 
 class PhoneNumberViewSet(BasePrivateViewSet):
     """Views for the phone number API."""
@@ -45,7 +91,7 @@ class PhoneNumberViewSet(BasePrivateViewSet):
     serializer_class = serializers.PhoneNumberSerializer
 
 
-class WorkingSiteViewSet(BasePrivateViewSet):
+class WorkingSiteViewSet(CachedListMixin, BasePrivateViewSet):
     """Views for the working sites."""
     queryset = WorkingSite.objects.all()
     serializer_class = serializers.WorkingSiteSerializer
@@ -67,3 +113,86 @@ class PatientViewSet(BasePrivateViewSet):
     """Views for the patient api."""
     queryset = Patient.objects.all()
     serializer_class = serializers.PatientSerializer
+
+    def get_queryset(self):
+        """
+        Filter patients by `church` ids, inscription dates between
+        `inscript_after` and `inscript_before` (inclusive) and `ci`.
+        """
+        queryset = super().get_queryset()
+        churches = filters.int_list_param(self.request, 'church')
+        if churches:
+            queryset = queryset.filter(church__in=churches)
+        inscript_after = filters.date_param(self.request, 'inscript_after')
+        if inscript_after:
+            queryset = queryset.filter(inscript__gte=inscript_after)
+        inscript_before = filters.date_param(self.request, 'inscript_before')
+        if inscript_before:
+            queryset = queryset.filter(inscript__lte=inscript_before)
+        ci = filters.str_param(self.request, 'ci')
+        if ci:
+            queryset = queryset.filter(ci=ci)
+
+        return queryset
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'bulk':
+            return serializers.PatientBulkSerializer
+
+        return self.serializer_class
+
+    @action(detail=False, methods=['post', 'patch'])
+    def bulk(self, request):
+        """
+        Create (POST) or update (PATCH) a list of patients in a single
+        transaction. Nothing is written when any item is invalid, and the
+        errors are returned in the order of the items.
+        """
+        instance = None
+        if request.method == 'PATCH':
+            ids = []
+            if isinstance(request.data, list):
+                ids = [
+                    item.get('id') for item in request.data
+                    if isinstance(item, dict) and
+                    isinstance(item.get('id'), int)
+                ]
+            instance = self.get_queryset().filter(id__in=ids)
+
+        serializer = self.get_serializer(
+            instance,
+            data=request.data,
+            many=True,
+            partial=instance is not None,
+            max_length=settings.BULK_MAX_ITEMS
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+
+        if instance is None:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every patient matching the list filters with the contact,
+        church and treatments, as CSV or, with `output=ndjson`, as one JSON
+        document per line.
+        """
+        output = filters.str_param(request, 'output') or 'csv'
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'output': _('Choose one of: %(formats)s.') % {
+                    'formats': ', '.join(EXPORT_FORMATS)}}
+            )
+
+        response = StreamingHttpResponse(
+            export_lines(self.get_queryset(), output),
+            content_type=EXPORT_FORMATS[output],
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="patients.{output}"'
+        return response
@@ -0,0 +1,119 @@
+"""
+PostgreSQL backend reusing connections from an in-process pool.
+"""
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+
+from psycopg2 import extensions, pool
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(pool.ThreadedConnectionPool):
+    """Thread safe pool opening connections the way Django expects."""
+
+    def _connect(self, key=None):
+        connection = super()._connect(key)
+        # Same dummy loads() Django registers on its own connections.
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection,
+                                               loads=lambda x: x)
+        return connection
+
+
+def is_alive(connection):
+    """
+    Return whether a pooled connection still reaches the server, which a
+    restart or an idle timeout may have closed while it sat in the pool.
+    """
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if connection.info.transaction_status != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except psycopg2.Error:
+        return False
+
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Database wrapper taking its connections from a pool shared by the
+    threads of the process and handing them back instead of closing them.
+    Pool bounds come from the `POOL` entry of the database settings; when
+    the pool is exhausted a plain connection is opened instead. Pooled
+    connections are checked on checkout and dead ones replaced.
+    """
+
+    @property
+    def pool(self):
+        """Return the pool of this database, created on first use."""
+        key = (os.getpid(), self.alias)
+        with _pools_lock:
+            if key not in _pools:
+                options = self.settings_dict.get('POOL', {})
+                _pools[key] = ConnectionPool(
+                    options.get('MIN_SIZE', 1),
+                    options.get('MAX_SIZE', 10),
+                    **self.get_connection_params()
+                )
+
+        return _pools[key]
+
+    def close_pool(self):
+        """Close every idle connection of the pool and forget the pool."""
+        with _pools_lock:
+            connection_pool = _pools.pop((os.getpid(), self.alias), None)
+        if connection_pool is not None:
+            connection_pool.closeall()
+
+    def get_new_connection(self, conn_params):
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        try:
+            connection = self.checkout()
+        except pool.PoolError:
+            self.pooled = False
+            return super().get_new_connection(conn_params)
+
+        self.pooled = True
+        if isolation_level is None:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            self.isolation_level = IsolationLevel(isolation_level)
+            connection.isolation_level = self.isolation_level
+
+        return connection
+
+    def checkout(self):
+        """
+        Return a live connection of the pool, closing the dead ones taken
+        on the way. Once every idle one is dropped the pool opens a new
+        connection.
+        """
+        for _ in range(self.pool.maxconn):
+            connection = self.pool.getconn()
+            if is_alive(connection):
+                return connection
+            self.pool.putconn(connection, close=True)
+
+        return self.pool.getconn()
+
+    def _close(self):
+        if self.connection is None or not getattr(self, 'pooled', False):
+            return super()._close()
+
+        # Broken connections are dropped, open transactions rolled back.
+        broken = self.errors_occurred and not self.is_usable()
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection, close=broken)
@@ -0,0 +1,224 @@
+"""
+Latency benchmark helpers for the API.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+def percentile(values, percent):
+    """Return the nearest rank percentile of the values."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered))
+
+    return ordered[max(rank, 1) - 1]
+
+
+def summarize(latencies):
+    """Return the request count and latency percentiles in milliseconds."""
+    return {
+        'requests': len(latencies),
+        'p50': round(percentile(latencies, 50) * 1000, 2),
+        'p99': round(percentile(latencies, 99) * 1000, 2),
+        'mean': round(sum(latencies) / len(latencies) * 1000, 2),
+        'max': round(max(latencies) * 1000, 2),
+        'throughput': round(len(latencies) / sum(latencies), 1),
+    }
+
+
+def api_client(user):
+    """Return a test client sending a JWT of the user, like API clients."""
+    hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*']
+    client = APIClient(SERVER_NAME=hosts[0] if hosts else 'localhost')
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+    )
+
+    return client
+
+
+def time_requests(send, requests, warmup, expected=200,
+                  release_connections=False):
+    """
+    Call `send(index)` for the warmup and the timed requests and return
+    the latencies of the timed ones. With `release_connections` the
+    connections are released after every request as the request handler
+    does.
+    """
+    latencies = []
+    for index in range(warmup + requests):
+        start = time.perf_counter()
+        res = send(index)
+        if release_connections:
+            close_old_connections()
+        elapsed = time.perf_counter() - start
+        if res.status_code != expected:
+            raise RuntimeError(
+                f'{res.request["REQUEST_METHOD"]} {res.request["PATH_INFO"]} '
+                f'returned {res.status_code}: {res.content[:200]!r}'
+            )
+        if index >= warmup:
+            latencies.append(elapsed)
+
+    return latencies
+
+
+def measure(path, user, requests=200, warmup=10):
+    """
+    Time GET requests to `path` authenticated with a JWT of `user`. After
+    every request the connections are released as the request handler
+    does, so the connection settings in use are part of the latency.
+    """
+    client = api_client(user)
+    return time_requests(lambda index: client.get(path), requests, warmup,
+                         release_connections=True)
+
+
+def router_endpoints():
+    """Yield the namespace, prefix, viewset and basename of every route."""
+    from church.urls import router as church_router
+    from contact.urls import router as contact_router
+    from medicine.urls import router as medicine_router
+
+    routers = {
+        'contact': contact_router,
+        'church': church_router,
+        'medicine': medicine_router,
+    }
+    for namespace, router in routers.items():
+        for prefix, viewset, basename in router.registry:
+            yield namespace, prefix, viewset, basename
+
+
+def first_id(model):
+    """Return the id of the oldest row of the model."""
+    return model.objects.order_by('id').values_list('id', flat=True).first()
+
+
+def payloads():
+    """
+    Return the create and update payload builders of each basename. Each
+    builder takes the request index, so unique fields stay unique.
+    """
+    from core.models import (
+        Church,
+        Contact,
+        Denomination,
+        Disease,
+        Medicine,
+        Patient,
+    )
+
+    contact, church = first_id(Contact), first_id(Church)
+    patient, disease = first_id(Patient), first_id(Disease)
+    medicine, denomination = first_id(Medicine), first_id(Denomination)
+
+    return {
+        'note': (lambda i: {'note': f'Benchmark note {i}'},
+                 lambda i: {'note': f'Updated note {i}'}),
+        'contact': (lambda i: {'name': 'Bench', 'lastname': f'Mark {i}'},
+                    lambda i: {'lastname': f'Updated {i}'}),
+        'phonenumber': (lambda i: {'contact': contact,
+                                   'number': f'+1{i:010d}'},
+                        lambda i: {'number': f'+2{i:010d}'}),
+        'workingsite': (lambda i: {'name': f'Benchmark site {i}'},
+                        lambda i: {'name': f'Updated site {i}'}),
+        'medic': (lambda i: {'contact': {'name': f'Medic {i}'},
+                             'specialty': 'Clínico'},
+                  lambda i: {'specialty': f'Specialty {i}'}),
+        'donor': (lambda i: {'contact': {'name': f'Donor {i}'},
+                             'country': 'US', 'city': 'Miami'},
+                  lambda i: {'city': f'City {i}'}),
+        'patient': (lambda i: {'contact': {'name': f'Patient {i}'},
+                               'ci': f'9{i:010d}', 'church': church},
+                    lambda i: {'ci': f'8{i:010d}'}),
+        'municipality': (lambda i: {'name': f'Municipality {i}',
+                                    'province': 'HAB'},
+                         lambda i: {'name': f'Updated municipality {i}'}),
+        'denomination': (lambda i: {'name': f'Denomination {i}'},
+                         lambda i: {'name': f'Updated denomination {i}'}),
+        'church': (lambda i: {'name': f'Church {i}',
+                              'denomination': denomination},
+                   lambda i: {'name': f'Updated church {i}'}),
+        'medclass': (lambda i: {'name': f'Benchmark class {i}'},
+                     lambda i: {'name': f'Updated class {i}'}),
+        'medicinepresentation': (
+            lambda i: {'name': f'Benchmark presentation {i}'},
+            lambda i: {'name': f'Updated presentation {i}'}),
+        'medicine': (lambda i: {'name': f'Medicine {i}'},
+                     lambda i: {'batch': f'B{i}'}),
+        'disease': (lambda i: {'name': f'Disease {i}'},
+                    lambda i: {'name': f'Updated disease {i}'}),
+        'treatment': (lambda i: {'patient': patient, 'disease': disease,
+                                 'medicine': [medicine]},
+                      lambda i: {'medicine': [medicine]}),
+        'stockmovement': (lambda i: {'church': church, 'medicine': medicine,
+                                     'kind': 'receipt', 'quantity': 1},
+                          None),
+    }
+
+
+ACTIONS = ('list', 'retrieve', 'create', 'update')
+
+# Viewset method serving each benchmarked action.
+ACTION_METHODS = {
+    'list': 'list',
+    'retrieve': 'retrieve',
+    'create': 'create',
+    'update': 'partial_update',
+}
+
+
+def run_suite(user, requests=50, warmup=5, basenames=None, actions=ACTIONS):
+    """
+    Benchmark the list, retrieve, create and update actions served by every
+    router viewset through the test client and return the summaries by
+    endpoint and action. Everything runs in a transaction rolled back at
+    the end, so the data stays as seeded.
+    """
+    client = api_client(user)
+    report = {}
+
+    with transaction.atomic():
+        builders = payloads()
+        for namespace, prefix, viewset, basename in router_endpoints():
+            if basenames and basename not in basenames:
+                continue
+            url = f'/{namespace}/{prefix}/'
+            ids = list(viewset.queryset.order_by('id')
+                       .values_list('id', flat=True)[:requests + warmup])
+            create, update = builders.get(basename, (None, None))
+            sends = {
+                'list': (lambda i: client.get(url), 200),
+                'retrieve': (
+                    lambda i: client.get(f'{url}{ids[i % len(ids)]}/'), 200
+                ),
+                'create': (
+                    lambda i: client.post(url, create(i), format='json'), 201
+                ),
+                'update': (
+                    lambda i: client.patch(f'{url}{ids[i % len(ids)]}/',
+                                           update(i), format='json'), 200
+                ),
+            }
+            results = {}
+            for action in actions:
+                if not hasattr(viewset, ACTION_METHODS[action]):
+                    continue
+                if action in ('retrieve', 'update') and not ids:
+                    continue
+                send, expected = sends[action]
+                results[action] = summarize(
+                    time_requests(send, requests, warmup, expected)
+                )
+            report[f'{namespace}:{basename}'] = results
+
+        transaction.set_rollback(True)
+
+    return report
@@ -0,0 +1,67 @@
+"""
+Versioned caching of reference data list responses.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def reference_cache():
+    """Return the cache backend holding the reference data."""
+    return caches[settings.REFERENCE_CACHE]
+
+
+def is_process_local():
+    """
+    Return whether the reference cache lives in the memory of the process,
+    where the changes made by other processes never reach it.
+    """
+    return isinstance(reference_cache(), LocMemCache)
+
+
+def version_key(model):
+    """Return the cache key of the data version of the model."""
+    return f'reference:{model._meta.label_lower}:version'
+
+
+def get_version(model):
+    """
+    Return the current data version of the model and when it changed. A
+    missing version, after a restart or an eviction, starts a new one, so
+    responses cached before can never be served again.
+    """
+    cache = reference_cache()
+    version = cache.get(version_key(model))
+    if version is None:
+        version = bump_version(model)
+
+    return version
+
+
+def bump_version(model):
+    """
+    Start and return a new data version of the model. A version in process
+    memory expires with the cached responses, so a change made by another
+    process is served at most that late.
+    """
+    version = {'token': uuid.uuid4().hex, 'modified': int(time.time())}
+    timeout = settings.REFERENCE_CACHE_TIMEOUT if is_process_local() else None
+    reference_cache().set(version_key(model), version, timeout)
+
+    return version
+
+
+def list_cache_key(model, version, url):
+    """Return the cache key of a list response for the version and URL."""
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f'reference:{model._meta.label_lower}:{version["token"]}:{digest}'
+
+
+def etag(key):
+    """Return a quoted ETag identifying the key."""
+    digest = hashlib.md5(key.encode(), usedforsecurity=False)
+    return f'"{digest.hexdigest()}"'
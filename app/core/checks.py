@@ -0,0 +1,22 @@
+"""
+System checks of the core app.
+"""
+from django.conf import settings
+from django.core import checks
+
+from core.cache import is_process_local
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_reference_cache(app_configs, **kwargs):
+    """Warn when the reference data cache is not shared by the processes."""
+    if settings.DEBUG or not is_process_local():
+        return []
+
+    return [checks.Warning(
+        'The reference data cache is in process memory, so a change only '
+        'invalidates the lists cached by the process that made it.',
+        hint='Set CACHE_BACKEND to a shared backend such as Redis or '
+             'Memcached.',
+        id='core.W001',
+    )]
@@ -0,0 +1,119 @@
+"""
+Streaming exports of the patients with their contact, church and
+treatments.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import Treatment
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+CSV_COLUMNS = [
+    'id', 'code', 'ci', 'inscript', 'name', 'lastname', 'gender', 'address',
+    'phone_numbers', 'church_id', 'church', 'municipality', 'province',
+    'treatments',
+]
+
+
+def export_queryset(queryset):
+    """Return the patients joined and prefetched for the export rows."""
+    treatments = Treatment.objects.select_related('disease') \
+        .prefetch_related('medicine').order_by('id')
+
+    # Drop the joins and columns of the API serializer, the rows need
+    # their own.
+    queryset = queryset.select_related(None).prefetch_related(None) \
+        .defer(None)
+    return queryset.select_related(
+        'contact', 'church__municipality'
+    ).prefetch_related(
+        'contact__phonenumber_set',
+        Prefetch('treatment_set', queryset=treatments),
+    ).order_by('id')
+
+
+def patient_rows(queryset, chunk_size=None):
+    """
+    Yield a dict per patient, reading the rows through a server side
+    cursor `chunk_size` at a time, so only one chunk and its prefetched
+    relations are held in memory.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    for patient in export_queryset(queryset).iterator(chunk_size=chunk_size):
+        contact, church = patient.contact, patient.church
+        municipality = church.municipality
+        yield {
+            'id': patient.id,
+            'code': patient.code,
+            'ci': patient.ci,
+            'inscript': patient.inscript,
+            'name': contact.name,
+            'lastname': contact.lastname,
+            'gender': contact.gender,
+            'address': contact.address,
+            'phone_numbers': [phone.number
+                              for phone in contact.phonenumber_set.all()],
+            'church_id': church.id,
+            'church': church.name,
+            'municipality': municipality.name if municipality else None,
+            'province': municipality.province if municipality else None,
+            'treatments': [
+                {
+                    'disease': treatment.disease.name,
+                    'medicines': [medicine.name
+                                  for medicine in treatment.medicine.all()],
+                }
+                for treatment in patient.treatment_set.all()
+            ],
+        }
+
+
+class Echo:
+    """File-like object returning what is written, for the CSV writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """
+    Yield the CSV lines of the rows. Phone numbers are joined by `;` and
+    treatments by `|`, each as `disease: medicine, medicine`.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        row = {
+            **row,
+            'phone_numbers': ';'.join(row['phone_numbers']),
+            'treatments': '|'.join(
+                f'{treatment["disease"]}: {", ".join(treatment["medicines"])}'
+                for treatment in row['treatments']
+            ),
+        }
+        yield writer.writerow([row[column] for column in CSV_COLUMNS])
+
+
+def ndjson_lines(rows):
+    """Yield a JSON document per row, each on its own line."""
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def export_lines(queryset, export_format, chunk_size=None):
+    """Yield the lines of the patient export in the given format."""
+    rows = patient_rows(queryset, chunk_size)
+    if export_format == 'ndjson':
+        return ndjson_lines(rows)
+
+    return csv_lines(rows)
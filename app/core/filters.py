@@ -0,0 +1,49 @@
+"""
+Helpers to read the filter query params of the list endpoints.
+"""
+from datetime import date
+
+from django.utils.translation import gettext as _
+
+from rest_framework.exceptions import ValidationError
+
+
+def int_list_param(request, name):
+    """Return the ids of a `?name=1,2` param, None when it is not sent."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return [int(item) for item in value.split(',')]
+    except ValueError:
+        raise ValidationError(
+            {name: _('Enter whole numbers separated by commas.')}
+        )
+
+
+def int_param(request, name):
+    """Return the whole number of a `?name=1` param, None when not sent."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: _('Enter a whole number.')})
+
+
+def date_param(request, name):
+    """Return the date of a `?name=YYYY-MM-DD` param, None when not sent."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: _('Enter a date as YYYY-MM-DD.')})
+
+
+def str_param(request, name):
+    """Return the stripped value of a text param, None when empty."""
+    value = request.query_params.get(name, '').strip()
+    return value or None
@@ -0,0 +1,118 @@
+"""
+Medicine stock ledger, the running balances it keeps and the stock
+expiring soon.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from core.models import ExpiringStock, Medicine, StockBalance, StockMovement
+
+
+class InsufficientStock(ValueError):
+    """The church has fewer units of the medicine than dispensed."""
+
+
+def change_balance(church_id, medicine_id, quantity):
+    """
+    Add the units to the balance of the medicine at the church. Receipts
+    upsert the balance, taking its row lock. Withdrawals only update a
+    balance holding enough units, so concurrent dispensations can never
+    take the stock below zero.
+    """
+    keys = {'church_id': church_id, 'medicine_id': medicine_id}
+    if quantity >= 0:
+        StockBalance.objects.add(keys, quantity=quantity)
+        return
+    updated = StockBalance.objects.filter(
+        **keys, quantity__gte=-quantity
+    ).update(quantity=F('quantity') + quantity)
+    if not updated:
+        raise InsufficientStock(medicine_id)
+
+
+def record_movement(**fields):
+    """
+    Write a movement to the ledger and apply it to the balance in the same
+    transaction, returning the movement.
+    """
+    with transaction.atomic():
+        movement = StockMovement(**fields)
+        change_balance(movement.church_id, movement.medicine_id,
+                       movement.quantity)
+        movement.save()
+
+    return movement
+
+
+def rebuild_stock_balances(church_ids=None):
+    """
+    Recompute the balances of the churches, all of them by default, by
+    summing their ledger.
+    """
+    movements = StockMovement.objects.all()
+    balances = StockBalance.objects.all()
+    if church_ids is not None:
+        movements = movements.filter(church__in=church_ids)
+        balances = balances.filter(church__in=church_ids)
+    totals = movements.values_list('church', 'medicine') \
+        .annotate(total=Sum('quantity')).order_by()
+
+    with transaction.atomic():
+        balances.delete()
+        StockBalance.objects.bulk_create(
+            [
+                StockBalance(church_id=church_id, medicine_id=medicine_id,
+                             quantity=total)
+                for church_id, medicine_id, total in totals
+            ],
+            batch_size=1000,
+        )
+
+
+def expiring_medicines(days=None, queryset=None):
+    """
+    Return the medicine batches expiring from today to `days` ahead, the
+    first to expire first, reading a range of their expiry index.
+    """
+    days = settings.EXPIRING_SOON_DAYS if days is None else days
+    today = timezone.localdate()
+    queryset = Medicine.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        expiry_date__gte=today,
+        expiry_date__lte=today + timedelta(days=days),
+    ).order_by('expiry_date', 'id')
+
+
+def precompute_expiring_stock(days=None, church_ids=None):
+    """
+    Replace the expiring soon stock of the churches, all of them by
+    default, with their balances of the batches expiring in `days`.
+    Return the number of rows written.
+    """
+    balances = StockBalance.objects.filter(
+        quantity__gt=0,
+        medicine__in=expiring_medicines(days).order_by().values('id'),
+    )
+    stock = ExpiringStock.objects.all()
+    if church_ids is not None:
+        balances = balances.filter(church__in=church_ids)
+        stock = stock.filter(church__in=church_ids)
+    rows = balances.values_list('church', 'medicine',
+                                'medicine__expiry_date', 'quantity')
+
+    with transaction.atomic():
+        stock.delete()
+        created = ExpiringStock.objects.bulk_create(
+            [
+                ExpiringStock(church_id=church_id, medicine_id=medicine_id,
+                              expiry_date=expiry_date, quantity=quantity)
+                for church_id, medicine_id, expiry_date, quantity in rows
+            ],
+            batch_size=1000,
+        )
+
+    return len(created)
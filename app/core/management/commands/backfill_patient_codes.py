@@ -0,0 +1,97 @@
+"""
+Django command to repair patient codes and their per church counters.
+"""
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Church, Patient, PatientCodeSequence
+
+
+def parse_code(code):
+    """Return the (church id, number) of a well formed code, else None."""
+    prefix, _, number = str(code).rpartition('-')
+    if not prefix.isdigit() or not number.isdigit():
+        return None
+
+    return int(prefix), int(number)
+
+
+class Command(BaseCommand):
+    """
+    Django command to give every patient a well formed code for its church
+    and move the church counters past the highest code in use.
+    """
+    help = 'Repair patient codes and reseed the per church code counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the codes to repair without writing them.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        dry_run = options['dry_run']
+        with transaction.atomic():
+            # Allocations wait for the repair, so no number is handed out
+            # twice, and counters only ever move up.
+            if not dry_run:
+                PatientCodeSequence.objects.lock()
+            last_values = dict(
+                PatientCodeSequence.objects.values_list('church_id',
+                                                        'last_value')
+            )
+            broken = self.repair_codes(last_values)
+            if dry_run:
+                self.stdout.write(f'{len(broken)} patient codes to repair.')
+                return
+
+            churches = set(Church.objects.values_list('id', flat=True))
+            Patient.objects.bulk_update(broken, ['code', 'updated_at'],
+                                        batch_size=1000)
+            PatientCodeSequence.objects.advance({
+                church_id: last_value
+                for church_id, last_value in last_values.items()
+                if church_id in churches
+            })
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired {len(broken)} patient codes in '
+            f'{len(last_values)} churches.'
+        ))
+
+    def repair_codes(self, last_values):
+        """
+        Renumber the patients whose code is malformed or of another church
+        after the highest number of their church, updating `last_values`,
+        and return them.
+        """
+        broken = []
+        patients = Patient.objects.only('id', 'code', 'church_id')\
+            .order_by('id')
+        for patient in patients.iterator(chunk_size=2000):
+            parsed = parse_code(patient.code)
+            if parsed is None:
+                broken.append(patient)
+                continue
+            # Numbers stay reserved under their prefix even when the patient
+            # moved church, so new codes never collide with a kept one.
+            church_id, number = parsed
+            last_values[church_id] = max(last_values.get(church_id, 0),
+                                         number)
+            if church_id != patient.church_id:
+                broken.append(patient)
+
+        for patient in broken:
+            number = last_values.get(patient.church_id, 0) + 1
+            last_values[patient.church_id] = number
+            self.stdout.write(
+                f'Patient {patient.id}: {patient.code} -> '
+                f'{patient.church_id}-{number}'
+            )
+            patient.code = f'{patient.church_id}-{number}'
+            patient.updated_at = timezone.now()
+
+        return broken
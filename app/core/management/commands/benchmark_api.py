@@ -0,0 +1,119 @@
+"""
+Django command to benchmark the latency of an API endpoint.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import measure, summarize
+
+
+# Environment of each database connection mode compared by --compare.
+CONNECTION_MODES = {
+    'direct': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '60'},
+    'pool': {'DB_POOL': '1', 'DB_CONN_MAX_AGE': '0'},
+}
+
+
+class Command(BaseCommand):
+    """
+    Django command reporting p50/p99 latency of GET requests to an endpoint,
+    optionally once per database connection mode.
+    """
+    help = 'Benchmark the latency of an API endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/contact/patients/',
+            help='Endpoint to request.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Timed requests.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Untimed requests sent first.',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user to authenticate as, the first by default.',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Run once per connection mode in a new process each.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the results as JSON.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['compare']:
+            results = {
+                mode: self.run_mode(environment, options)
+                for mode, environment in CONNECTION_MODES.items()
+            }
+        else:
+            latencies = measure(options['path'], self.get_user(options),
+                                options['requests'], options['warmup'])
+            results = {'current': summarize(latencies)}
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+
+        self.stdout.write(f"GET {options['path']}")
+        for mode, summary in results.items():
+            self.stdout.write(
+                f"{mode:<12} p50 {summary['p50']:>8.2f}ms  "
+                f"p99 {summary['p99']:>8.2f}ms  "
+                f"({summary['requests']} requests)"
+            )
+
+    def get_user(self, options):
+        """Return the user the requests authenticate as."""
+        users = get_user_model().objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to authenticate the requests as.')
+
+        return user
+
+    def run_mode(self, environment, options):
+        """Benchmark in a process using the given connection settings."""
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_api', '--json',
+            '--path', options['path'],
+            '--requests', str(options['requests']),
+            '--warmup', str(options['warmup']),
+        ]
+        if options['user']:
+            command += ['--user', options['user']]
+        result = subprocess.run(
+            command,
+            env={**os.environ, **environment,
+                 'PYTHONPATH': str(settings.BASE_DIR)},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip())
+
+        return json.loads(result.stdout)['current']
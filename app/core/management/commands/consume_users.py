@@ -0,0 +1,150 @@
+"""
+Django command to consume the user sync events from RabbitMQ.
+"""
+import asyncio
+import json
+import os
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.rabbitmq import ConsumerStatus, secure_start_consuming
+
+
+class Command(BaseCommand):
+    """
+    Django command running the user sync consumer in its own process, so
+    it scales apart from the web workers. SIGINT and SIGTERM stop it after
+    the in flight batches are committed and acked.
+    """
+    help = 'Consume user_created and user_modified events from RabbitMQ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.RABBITMQ_WORKERS,
+            help='Batches written to the database at the same time.',
+        )
+        parser.add_argument(
+            '--prefetch',
+            type=int,
+            default=settings.RABBITMQ_PREFETCH_COUNT,
+            help='Unacked messages RabbitMQ delivers ahead.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RABBITMQ_BATCH_SIZE,
+            help='Most messages written in a single batch.',
+        )
+        parser.add_argument(
+            '--batch-timeout',
+            type=float,
+            default=settings.RABBITMQ_BATCH_TIMEOUT,
+            help='Seconds to wait while a batch fills.',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=settings.RABBITMQ_MAX_ATTEMPTS,
+            help='Consecutive failed connection attempts before giving up, '
+                 '0 retries forever.',
+        )
+        parser.add_argument(
+            '--health-file',
+            default=settings.RABBITMQ_HEALTH_FILE,
+            help='File the consumer status is written to as JSON.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error unless a running consumer reported '
+                 'its status recently, for container health checks.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['check']:
+            self.check_health(options['health_file'])
+            return
+
+        self.stdout.write('Starting user sync consumer...')
+        status = asyncio.run(self.consume(options))
+        if status.state == 'failed':
+            raise CommandError(
+                f'User sync consumer gave up: {status.last_error}'
+            )
+        self.stdout.write(self.style.SUCCESS('User sync consumer stopped.'))
+
+    async def consume(self, options):
+        """Run the consumer until a stop signal arrives or it gives up."""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        status = ConsumerStatus()
+        heartbeat = asyncio.create_task(
+            self.report_health(options['health_file'], status)
+        )
+        try:
+            await secure_start_consuming(
+                stop=stop,
+                status=status,
+                max_attempts=options['max_attempts'],
+                prefetch_count=options['prefetch'],
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                batch_timeout=options['batch_timeout'],
+            )
+        finally:
+            heartbeat.cancel()
+            self.write_health(options['health_file'], status)
+
+        return status
+
+    async def report_health(self, health_file, status):
+        """Write the consumer status every health interval."""
+        while True:
+            self.write_health(health_file, status)
+            await asyncio.sleep(settings.RABBITMQ_HEALTH_INTERVAL)
+
+    def write_health(self, health_file, status):
+        """Atomically replace the health file with the current status."""
+        if not health_file:
+            return
+        temporary = f'{health_file}.tmp'
+        with open(temporary, 'w') as health:
+            json.dump(status.as_dict(), health)
+        os.replace(temporary, health_file)
+
+    def check_health(self, health_file):
+        """Fail unless the health file is fresh and the consumer is up."""
+        try:
+            with open(health_file) as health:
+                status = json.load(health)
+        except (OSError, ValueError):
+            raise CommandError('User sync consumer status unavailable.')
+
+        age = time.time() - status['updated_at']
+        if age > settings.RABBITMQ_HEALTH_INTERVAL * 3:
+            raise CommandError(
+                f'User sync consumer status is {int(age)}s old.'
+            )
+        if status['state'] in ('stopped', 'failed'):
+            raise CommandError(f"User sync consumer is {status['state']}.")
+        if status['state'] in ('backoff', 'reconnecting'):
+            raise CommandError(
+                f"User sync consumer disconnected after "
+                f"{status['failures']} failed attempts: "
+                f"{status['last_error']}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"User sync consumer {status['state']}, "
+            f"{status['processed']} processed, "
+            f"{status['rejected']} rejected."
+        ))
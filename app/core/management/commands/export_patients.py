@@ -0,0 +1,44 @@
+"""
+Django command to export the patients with contact, church and treatments.
+"""
+from django.core.management.base import BaseCommand
+
+from core.export import EXPORT_FORMATS, export_lines
+from core.models import Patient
+
+
+class Command(BaseCommand):
+    """
+    Django command writing every patient, optionally of some churches, as
+    CSV or NDJSON. Rows are read in chunks through a server side cursor
+    and written as they come, so memory stays flat for any row count.
+    """
+    help = 'Export the patients with contact, church and treatments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-format', choices=list(EXPORT_FORMATS),
+                            default='csv')
+        parser.add_argument('--output', default='-',
+                            help='File to write, - for standard output.')
+        parser.add_argument('--church', type=int, action='append',
+                            help='Only export the patients of the church.')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Rows read per database round trip.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        queryset = Patient.objects.all()
+        if options['church']:
+            queryset = queryset.filter(church__in=options['church'])
+        lines = export_lines(queryset, options['output_format'],
+                             options['chunk_size'])
+
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
+        self.stderr.write(f'Exported patients to {options["output"]}.')
@@ -0,0 +1,30 @@
+"""
+Django command to precompute the stock expiring soon at every church.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.inventory import precompute_expiring_stock
+
+
+class Command(BaseCommand):
+    """
+    Django command listing, per church, the medicine batches in stock that
+    expire within the next days. Meant to run nightly, so the expiring
+    stock of a church is read without scanning the batches.
+    """
+    help = 'Precompute the medicine stock expiring soon at every church.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.EXPIRING_SOON_DAYS,
+                            help='Days ahead a batch counts as expiring.')
+        parser.add_argument('--church', type=int, action='append',
+                            help='Only precompute the church with this id.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        count = precompute_expiring_stock(options['days'], options['church'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} expiring stock rows precomputed.'
+        ))
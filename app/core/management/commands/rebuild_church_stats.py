@@ -0,0 +1,24 @@
+"""
+Django command to recompute the church statistics from scratch.
+"""
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_church_stats
+
+
+class Command(BaseCommand):
+    """
+    Django command recounting the patients, treatments, diseases and
+    medicines of the churches, to repair the statistics after writes that
+    skip the model signals, such as raw SQL or queryset updates.
+    """
+    help = 'Recompute the statistics of the churches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', type=int, action='append',
+                            help='Only recompute the church with this id.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rebuild_church_stats(options['church'])
+        self.stdout.write(self.style.SUCCESS('Church statistics rebuilt.'))
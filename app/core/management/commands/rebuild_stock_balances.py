@@ -0,0 +1,23 @@
+"""
+Django command to recompute the medicine stock balances from the ledger.
+"""
+from django.core.management.base import BaseCommand
+
+from core.inventory import rebuild_stock_balances
+
+
+class Command(BaseCommand):
+    """
+    Django command summing the stock ledger of the churches, to repair the
+    balances after movements written without the inventory service.
+    """
+    help = 'Recompute the medicine stock balances from the ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', type=int, action='append',
+                            help='Only recompute the church with this id.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rebuild_stock_balances(options['church'])
+        self.stdout.write(self.style.SUCCESS('Stock balances rebuilt.'))
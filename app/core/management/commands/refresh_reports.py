@@ -0,0 +1,48 @@
+"""
+Django command to refresh the precomputed reports.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from core.reports import REPORT_MODELS, refresh_reports
+
+
+class Command(BaseCommand):
+    """
+    Django command recomputing the report views from the transactional
+    tables, once or every `--interval` seconds when run as a scheduler.
+    """
+    help = 'Refresh the materialized views of the reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report', action='append',
+                            choices=list(REPORT_MODELS),
+                            help='Only refresh this report.')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep refreshing every this many seconds.')
+        parser.add_argument('--blocking', action='store_true',
+                            help='Lock the reports while they refresh, '
+                                 'which is faster than a concurrent '
+                                 'refresh.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        while True:
+            try:
+                names = refresh_reports(options['report'],
+                                        concurrently=not options['blocking'])
+            except DatabaseError as error:
+                if not options['interval']:
+                    raise
+                self.stderr.write(f'Report refresh failed: {error}')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Refreshed reports: {", ".join(names)}.'
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+            # Reconnect when the server dropped the idle connection.
+            close_old_connections()
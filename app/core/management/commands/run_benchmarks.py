@@ -0,0 +1,106 @@
+"""
+Django command to benchmark every endpoint of the API routers.
+"""
+import json
+import platform
+import subprocess
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import ACTIONS, run_suite
+from core.models import Church, Medicine, Patient, Treatment
+
+
+class Command(BaseCommand):
+    """
+    Django command timing list, retrieve, create and update of each router
+    viewset through the test client and writing a JSON report to diff
+    between releases. Run it on data from seed_benchmark_data.
+    """
+    help = 'Benchmark the API endpoints and write a JSON report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Timed requests per endpoint and action.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Untimed requests sent first.',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            metavar='BASENAME',
+            help='Router basenames to benchmark, such as patient.',
+        )
+        parser.add_argument(
+            '--actions',
+            nargs='+',
+            choices=ACTIONS,
+            default=list(ACTIONS),
+            help='Actions to benchmark.',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user to authenticate as, the first by default.',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write the report to instead of the output.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        users = get_user_model().objects.order_by('id')
+        if options['user']:
+            users = users.filter(email=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to authenticate the requests as.')
+
+        report = {
+            'generated_at': datetime.now(timezone.utc).isoformat(),
+            'revision': self.revision(),
+            'python': platform.python_version(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'requests': options['requests'],
+            'warmup': options['warmup'],
+            'rows': {
+                model._meta.label: model.objects.count()
+                for model in (Church, Patient, Treatment, Medicine)
+            },
+            'endpoints': run_suite(user, options['requests'],
+                                   options['warmup'], options['only'],
+                                   options['actions']),
+        }
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if not options['output']:
+            self.stdout.write(output)
+            return
+
+        with open(options['output'], 'w') as report_file:
+            report_file.write(output + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmark report written to {options['output']}."
+        ))
+
+    def revision(self):
+        """Return the git commit of the code benchmarked, if known."""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
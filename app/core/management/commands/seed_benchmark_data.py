@@ -0,0 +1,264 @@
+"""
+Django command to fill the database with synthetic data for benchmarks.
+"""
+import random
+
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_church_stats
+from core.utils import PROVINCES_CUBA
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    Donor,
+    MedClass,
+    Medic,
+    Medicine,
+    MedicinePresentation,
+    Municipality,
+    Patient,
+    PatientCodeSequence,
+    PhoneNumber,
+    Treatment,
+    WorkingSite,
+)
+
+
+NAMES = ['María', 'José', 'Ana', 'Luis', 'Yanelis', 'Carlos', 'Daniela',
+         'Jorge', 'Lázaro', 'Yuliet', 'Pedro', 'Rosa', 'Ernesto', 'Odalys']
+LASTNAMES = ['González', 'Rodríguez', 'Pérez', 'Hernández', 'García',
+             'Fernández', 'Díaz', 'Martínez', 'Álvarez', 'Ramírez']
+DENOMINATIONS = ['Metodista', 'Bautista', 'Presbiteriana', 'Episcopal',
+                 'Pentecostal', 'Católica']
+PRESENTATIONS = ['Tableta', 'Cápsula', 'Jarabe', 'Inyectable', 'Crema',
+                 'Gotas']
+CLASSES = ['Analgésico', 'Antibiótico', 'Antihipertensivo', 'Antiácido',
+           'Vitamina', 'Antialérgico']
+
+
+def next_offset():
+    """
+    Return a number past the unique values of every earlier run, drawn
+    from the contact id sequence, which deleted contacts never set back.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval(pg_get_serial_sequence(%s, 'id'))",
+                       [Contact._meta.db_table])
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    """
+    Django command generating churches per municipality in every province,
+    patients per church with treatments and medicines, donors and medics.
+    Rows are bulk inserted and the values are reproducible with --seed.
+    """
+    help = 'Fill the database with synthetic data for the benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--municipalities-per-province', type=int,
+                            default=3)
+        parser.add_argument('--churches-per-municipality', type=int,
+                            default=4)
+        parser.add_argument('--patients-per-church', type=int, default=40)
+        parser.add_argument('--treatments-per-patient', type=int, default=2)
+        parser.add_argument('--medicines', type=int, default=300)
+        parser.add_argument('--diseases', type=int, default=80)
+        parser.add_argument('--donors', type=int, default=500)
+        parser.add_argument('--medics', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the random values.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.random = random.Random(options['seed'])
+        # Unique values continue after the ones of earlier runs.
+        self.offset = next_offset()
+
+        with transaction.atomic():
+            churches = self.create_churches(options)
+            patients = self.create_patients(churches, options)
+            medicines = self.create_medicines(options)
+            self.create_treatments(patients, medicines, options)
+            self.create_donors(options)
+            self.create_medics(options)
+            # Bulk inserts skip the signals keeping the church statistics.
+            rebuild_church_stats([church.id for church in churches])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(churches)} churches, {len(patients)} patients '
+            f'and {len(medicines)} medicines.'
+        ))
+
+    def create_contacts(self, count):
+        """Bulk create and return contacts with a phone number each."""
+        contacts = Contact.objects.bulk_create(
+            [
+                Contact(
+                    name=self.random.choice(NAMES),
+                    lastname=self.random.choice(LASTNAMES),
+                    gender=self.random.choice('MF'),
+                    address=f'Calle {self.random.randint(1, 300)}',
+                )
+                for _ in range(count)
+            ],
+            batch_size=1000,
+        )
+        PhoneNumber.objects.bulk_create(
+            [
+                PhoneNumber(contact=contact,
+                            number=f'+53{self.offset + index:08d}')
+                for index, contact in enumerate(contacts)
+            ],
+            batch_size=1000,
+        )
+        self.offset += count
+
+        return contacts
+
+    def create_churches(self, options):
+        """Bulk create municipalities per province and their churches."""
+        denominations = Denomination.objects.bulk_create(
+            [Denomination(name=f'{name} {self.offset}')
+             for name in DENOMINATIONS]
+        )
+        municipalities = Municipality.objects.bulk_create([
+            Municipality(name=f'{province_name} {index + 1}',
+                         province=province)
+            for province, province_name in PROVINCES_CUBA
+            if province != 'UNK'
+            for index in range(options['municipalities_per_province'])
+        ])
+
+        count = len(municipalities) * options['churches_per_municipality']
+        priests = self.create_contacts(count)
+        return Church.objects.bulk_create(
+            [
+                Church(
+                    name=f'Iglesia {self.offset + index}',
+                    denomination=self.random.choice(denominations),
+                    municipality=municipalities[
+                        index // options['churches_per_municipality']
+                    ],
+                    priest=priest,
+                )
+                for index, priest in enumerate(priests)
+            ],
+            batch_size=1000,
+        )
+
+    def create_patients(self, churches, options):
+        """Bulk create patients per church with sequential codes."""
+        count = len(churches) * options['patients_per_church']
+        contacts = self.create_contacts(count)
+        church_of = [
+            church for church in churches
+            for _ in range(options['patients_per_church'])
+        ]
+
+        per_church = Counter(church.id for church in church_of)
+        next_number = {
+            church_id: PatientCodeSequence.objects.allocate(church_id, total)
+            - total + 1
+            for church_id, total in per_church.items()
+        }
+        patients = []
+        for contact, church in zip(contacts, church_of):
+            number = next_number[church.id]
+            next_number[church.id] += 1
+            patients.append(Patient(
+                contact=contact,
+                church=church,
+                code=f'{church.id}-{number}',
+                ci=f'{self.offset + len(patients):011d}',
+                inscript=date.today() - timedelta(
+                    days=self.random.randint(0, 3650)
+                ),
+            ))
+
+        return Patient.objects.bulk_create(patients, batch_size=1000)
+
+    def create_medicines(self, options):
+        """Bulk create medicines with a classification and presentation."""
+        classes = MedClass.objects.bulk_create(
+            [MedClass(name=f'{name} {self.offset}') for name in CLASSES]
+        )
+        presentations = MedicinePresentation.objects.bulk_create(
+            [MedicinePresentation(name=f'{name} {self.offset}')
+             for name in PRESENTATIONS]
+        )
+        return Medicine.objects.bulk_create(
+            [
+                Medicine(
+                    name=f'Medicamento {index}',
+                    classification=self.random.choice(classes),
+                    presentation=self.random.choice(presentations),
+                    batch=f'L{self.random.randint(1000, 9999)}',
+                    measurement=self.random.choice([5, 10, 250, 500]),
+                    measurement_units=self.random.choice(['mg', 'mL', 'g']),
+                )
+                for index in range(options['medicines'])
+            ],
+            batch_size=1000,
+        )
+
+    def create_treatments(self, patients, medicines, options):
+        """Bulk create treatments with one to three medicines each."""
+        diseases = Disease.objects.bulk_create(
+            [Disease(name=f'Enfermedad {index}')
+             for index in range(options['diseases'])]
+        )
+        treatments = Treatment.objects.bulk_create(
+            [
+                Treatment(patient=patient,
+                          disease=self.random.choice(diseases))
+                for patient in patients
+                for _ in range(options['treatments_per_patient'])
+            ],
+            batch_size=1000,
+        )
+        Link = Treatment.medicine.through
+        Link.objects.bulk_create(
+            [
+                Link(treatment_id=treatment.id, medicine_id=medicine.id)
+                for treatment in treatments
+                for medicine in self.random.sample(medicines,
+                                                   self.random.randint(1, 3))
+            ],
+            batch_size=1000,
+        )
+
+    def create_donors(self, options):
+        """Bulk create donors from several countries."""
+        contacts = self.create_contacts(options['donors'])
+        Donor.objects.bulk_create(
+            [
+                Donor(contact=contact,
+                      country=self.random.choice(['US', 'ES', 'CA', 'MX']),
+                      city=self.random.choice(['Miami', 'Madrid', 'Toronto']))
+                for contact in contacts
+            ],
+            batch_size=1000,
+        )
+
+    def create_medics(self, options):
+        """Bulk create medics spread over a few working sites."""
+        sites = WorkingSite.objects.bulk_create(
+            [WorkingSite(name=f'Hospital {index + 1}') for index in range(10)]
+        )
+        contacts = self.create_contacts(options['medics'])
+        Medic.objects.bulk_create(
+            [
+                Medic(contact=contact,
+                      workingsite=self.random.choice(sites),
+                      specialty=self.random.choice(['Clínico', 'Pediatra']))
+                for contact in contacts
+            ],
+            batch_size=1000,
+        )
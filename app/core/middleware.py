@@ -1,24 +1,131 @@
 """
 Custom Middleware for Main API.
 """
-from django.utils.deprecation import MiddlewareMixin
+import json
+import logging
+import time
 
-from .rabbitmq import secure_start_consuming
+from contextlib import ExitStack
 
-import threading
-import asyncio
+from django.conf import settings
+from django.db import connections
 
 
-class RabbitMQConsumerMiddleware(MiddlewareMixin):
+logger = logging.getLogger('core.metrics')
+
+
+class RequestMetrics:
+    """SQL queries, DB, serialization and render time of a request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        self.view_start = None
+        self.view_db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time a query, used as a database execute wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+def view_key(request):
+    """Return the URL name of the view that handled the request."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+
+    return match.url_name or match.view_name
+
+
+def query_budget(key):
+    """Return the most queries the view may run, None when unbounded."""
+    return settings.QUERY_BUDGETS.get(key, settings.DEFAULT_QUERY_BUDGET)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Measure the SQL queries, DB time, serialization time and response
+    render time of each request, keyed by the URL name of its view such as
+    `patient-list`. The figures are returned as X- headers in debug and
+    logged as JSON on the `core.metrics` logger otherwise; requests over
+    their query budget are logged as warnings.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
-        self.start_consumer_thread()
 
-    def start_consumer_thread(self):
-        consumer_thread = threading.Thread(target=self.run_consumer)
-        consumer_thread.start()
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        total_time = time.perf_counter() - start
+
+        key = view_key(request)
+        if key is None:
+            return response
+
+        budget = query_budget(key)
+        over_budget = budget is not None and metrics.queries > budget
+        if settings.DEBUG:
+            response['X-DB-Queries'] = metrics.queries
+            response['X-DB-Time'] = f'{metrics.db_time * 1000:.2f}'
+            response['X-Serialize-Time'] = \
+                f'{metrics.serialize_time * 1000:.2f}'
+            response['X-Render-Time'] = f'{metrics.render_time * 1000:.2f}'
+            response['X-Total-Time'] = f'{total_time * 1000:.2f}'
+            if over_budget:
+                response['X-Query-Budget'] = budget
+
+        record = {
+            'view': key,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serialize_ms': round(metrics.serialize_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'total_ms': round(total_time * 1000, 2),
+        }
+        if over_budget:
+            logger.warning(json.dumps({**record, 'budget': budget}))
+        elif not settings.DEBUG:
+            logger.info(json.dumps(record))
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Mark the start of the view."""
+        request.metrics.view_start = time.perf_counter()
+        request.metrics.view_db_time = request.metrics.db_time
+
+    def process_template_response(self, request, response):
+        """
+        Take the time the view spent outside the database as its
+        serialization time, as the serializers building the response data
+        are where the API views spend it, then time the rendering that
+        turns the data into bytes.
+        """
+        metrics = request.metrics
+        start = time.perf_counter()
+        if metrics.view_start is not None:
+            metrics.serialize_time = max(
+                start - metrics.view_start
+                - (metrics.db_time - metrics.view_db_time), 0.0
+            )
+
+        def rendered(response):
+            request.metrics.render_time += time.perf_counter() - start
 
-    def run_consumer(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(secure_start_consuming())
+        response.add_post_render_callback(rendered)
+        return response
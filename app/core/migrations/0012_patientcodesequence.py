@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_sequences(apps, schema_editor):
+    """Start every church counter at its highest existing code number."""
+    Church = apps.get_model('core', 'Church')
+    Patient = apps.get_model('core', 'Patient')
+    PatientCodeSequence = apps.get_model('core', 'PatientCodeSequence')
+
+    last_values = {}
+    for code in Patient.objects.values_list('code', flat=True):
+        prefix, _, number = code.rpartition('-')
+        if not prefix.isdigit() or not number.isdigit():
+            continue
+        last_values[int(prefix)] = max(last_values.get(int(prefix), 0),
+                                       int(number))
+
+    churches = set(Church.objects.values_list('id', flat=True))
+    PatientCodeSequence.objects.bulk_create([
+        PatientCodeSequence(church_id=church_id, last_value=last_value)
+        for church_id, last_value in last_values.items()
+        if church_id in churches
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_alter_treatment_medicine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientCodeSequence',
+            fields=[
+                ('church', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='patient_code_sequence', serialize=False, to='core.church')),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
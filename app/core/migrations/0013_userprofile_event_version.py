@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_patientcodesequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='event_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:18
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_userprofile_event_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='medicine_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='municipality',
+            index=models.Index(fields=['province'], name='municipality_province_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['church', 'inscript'], name='patient_church_inscript_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['inscript'], name='patient_inscript_idx'),
+        ),
+    ]
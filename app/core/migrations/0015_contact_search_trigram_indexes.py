@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:22
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+INDEXES = [
+    ('contact', django.contrib.postgres.indexes.GinIndex(fields=['name'], name='contact_name_trgm_idx', opclasses=['gin_trgm_ops'])),
+    ('contact', django.contrib.postgres.indexes.GinIndex(fields=['lastname'], name='contact_lastname_trgm_idx', opclasses=['gin_trgm_ops'])),
+    ('patient', django.contrib.postgres.indexes.GinIndex(fields=['ci'], name='patient_ci_trgm_idx', opclasses=['gin_trgm_ops'])),
+    ('phonenumber', django.contrib.postgres.indexes.GinIndex(fields=['number'], name='phonenumber_number_trgm_idx', opclasses=['gin_trgm_ops'])),
+]
+
+
+def trigram_available(schema_editor):
+    """Return whether the server can install the pg_trgm extension."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        return cursor.fetchone() is not None
+
+
+def add_trigram_indexes(apps, schema_editor):
+    """Install pg_trgm and the search indexes where the server has it."""
+    if not trigram_available(schema_editor):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for model_name, index in INDEXES:
+        schema_editor.add_index(apps.get_model('core', model_name), index)
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    """Drop the search indexes, keeping the extension."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index.name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, index in INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(add_trigram_indexes,
+                                     remove_trigram_indexes),
+            ],
+        ),
+    ]
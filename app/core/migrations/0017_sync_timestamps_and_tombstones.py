@@ -0,0 +1,109 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_updated_at_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=40)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='denomination',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='disease',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='medclass',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='medicinepresentation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='phonenumber',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='treatment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='church',
+            index=models.Index(fields=['updated_at', 'id'], name='church_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['updated_at', 'id'], name='contact_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='denomination',
+            index=models.Index(fields=['updated_at', 'id'], name='denomination_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disease',
+            index=models.Index(fields=['updated_at', 'id'], name='disease_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medclass',
+            index=models.Index(fields=['updated_at', 'id'], name='medclass_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['updated_at', 'id'], name='medicine_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicinepresentation',
+            index=models.Index(fields=['updated_at', 'id'], name='presentation_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='municipality',
+            index=models.Index(fields=['updated_at', 'id'], name='municipality_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['updated_at', 'id'], name='note_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['updated_at', 'id'], name='patient_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phonenumber',
+            index=models.Index(fields=['updated_at', 'id'], name='phonenumber_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(fields=['updated_at', 'id'], name='treatment_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_idx'),
+        ),
+    ]
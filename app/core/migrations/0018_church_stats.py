@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_stats(apps, schema_editor):
+    """Count the patients, treatments and medicines of every church."""
+    Church = apps.get_model('core', 'Church')
+    Patient = apps.get_model('core', 'Patient')
+    Treatment = apps.get_model('core', 'Treatment')
+    ChurchStats = apps.get_model('core', 'ChurchStats')
+    ChurchDiseaseStats = apps.get_model('core', 'ChurchDiseaseStats')
+    ChurchMedicineStats = apps.get_model('core', 'ChurchMedicineStats')
+    Link = Treatment.medicine.through
+
+    patients = dict(Patient.objects.values_list('church')
+                    .annotate(count=models.Count('id')).order_by())
+    treatments = dict(Treatment.objects.values_list('patient__church')
+                      .annotate(count=models.Count('id')).order_by())
+    ChurchStats.objects.bulk_create([
+        ChurchStats(church_id=church_id,
+                    patients=patients.get(church_id, 0),
+                    treatments=treatments.get(church_id, 0))
+        for church_id in Church.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+    ChurchDiseaseStats.objects.bulk_create([
+        ChurchDiseaseStats(church_id=church_id, disease_id=disease_id,
+                           treatments=count)
+        for church_id, disease_id, count in Treatment.objects.values_list(
+            'patient__church', 'disease'
+        ).annotate(count=models.Count('id')).order_by()
+    ], batch_size=1000)
+    ChurchMedicineStats.objects.bulk_create([
+        ChurchMedicineStats(church_id=church_id, medicine_id=medicine_id,
+                            prescriptions=count)
+        for church_id, medicine_id, count in Link.objects.values_list(
+            'treatment__patient__church', 'medicine'
+        ).annotate(count=models.Count('id')).order_by()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_sync_timestamps_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChurchStats',
+            fields=[
+                ('church', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.church')),
+                ('patients', models.IntegerField(default=0)),
+                ('treatments', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChurchDiseaseStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('treatments', models.IntegerField(default=0)),
+                ('church', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disease_stats', to='core.church')),
+                ('disease', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.disease')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChurchMedicineStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prescriptions', models.IntegerField(default=0)),
+                ('church', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='medicine_stats', to='core.church')),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.medicine')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['church', '-prescriptions'], name='church_medicine_stats_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='churchmedicinestats',
+            constraint=models.UniqueConstraint(fields=('church', 'medicine'), name='church_medicine_stats_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='churchdiseasestats',
+            index=models.Index(fields=['church', '-treatments'], name='church_disease_stats_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='churchdiseasestats',
+            constraint=models.UniqueConstraint(fields=('church', 'disease'), name='church_disease_stats_unique'),
+        ),
+        migrations.RunPython(seed_stats, migrations.RunPython.noop),
+    ]
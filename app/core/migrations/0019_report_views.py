@@ -0,0 +1,138 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:37
+
+from django.db import migrations, models
+
+
+REPORTS = {
+    'core_report_province_patients': """
+        SELECT row_number() OVER (ORDER BY province) AS id, totals.*
+        FROM (
+            SELECT COALESCE(m.province, 'UNK') AS province,
+                   COUNT(DISTINCT ch.id) AS churches,
+                   COUNT(DISTINCT p.id) AS patients,
+                   COUNT(t.id) AS treatments
+            FROM core_church ch
+            LEFT JOIN core_municipality m ON m.id = ch.municipality_id
+            LEFT JOIN core_patient p ON p.church_id = ch.id
+            LEFT JOIN core_treatment t ON t.patient_id = p.id
+            GROUP BY COALESCE(m.province, 'UNK')
+        ) AS totals
+    """,
+    'core_report_municipality_diseases': """
+        SELECT row_number() OVER (ORDER BY m.id, d.id) AS id,
+               m.id AS municipality_id, m.name AS municipality, m.province,
+               d.id AS disease_id, d.name AS disease,
+               COUNT(t.id) AS treatments,
+               COUNT(DISTINCT t.patient_id) AS patients
+        FROM core_treatment t
+        JOIN core_disease d ON d.id = t.disease_id
+        JOIN core_patient p ON p.id = t.patient_id
+        JOIN core_church ch ON ch.id = p.church_id
+        JOIN core_municipality m ON m.id = ch.municipality_id
+        GROUP BY m.id, m.name, m.province, d.id, d.name
+    """,
+    'core_report_medicine_demand': """
+        SELECT row_number() OVER (ORDER BY c.id IS NULL, c.id) AS id,
+               c.id AS classification_id, c.name AS classification,
+               COUNT(DISTINCT md.id) AS medicines,
+               COUNT(tm.id) AS prescriptions,
+               COUNT(DISTINCT t.patient_id) AS patients
+        FROM core_treatment_medicine tm
+        JOIN core_treatment t ON t.id = tm.treatment_id
+        JOIN core_medicine md ON md.id = tm.medicine_id
+        LEFT JOIN core_medclass c ON c.id = md.classification_id
+        GROUP BY c.id, c.name
+    """,
+}
+
+# Columns the report endpoints filter on.
+INDEXES = {
+    'core_report_municipality_diseases': ['province', 'municipality_id',
+                                          'disease_id'],
+}
+
+
+def create_report_views(apps, schema_editor):
+    """
+    Create the reports as materialized views on PostgreSQL, with the
+    unique index their concurrent refresh needs, and as plain views on
+    other databases.
+    """
+    postgres = schema_editor.connection.vendor == 'postgresql'
+    for view, query in REPORTS.items():
+        if not postgres:
+            schema_editor.execute(f'CREATE VIEW {view} AS {query}')
+            continue
+        schema_editor.execute(f'CREATE MATERIALIZED VIEW {view} AS {query}')
+        schema_editor.execute(
+            f'CREATE UNIQUE INDEX {view}_id_idx ON {view} (id)'
+        )
+        for column in INDEXES.get(view, []):
+            schema_editor.execute(
+                f'CREATE INDEX {view}_{column}_idx ON {view} ({column})'
+            )
+
+
+def drop_report_views(apps, schema_editor):
+    """Drop the report views."""
+    kind = 'MATERIALIZED VIEW' \
+        if schema_editor.connection.vendor == 'postgresql' else 'VIEW'
+    for view in REPORTS:
+        schema_editor.execute(f'DROP {kind} IF EXISTS {view}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_church_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicineDemandReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('classification_id', models.BigIntegerField(null=True)),
+                ('classification', models.CharField(max_length=60, null=True)),
+                ('medicines', models.IntegerField()),
+                ('prescriptions', models.IntegerField()),
+                ('patients', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'core_report_medicine_demand',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MunicipalityDiseaseReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('municipality_id', models.BigIntegerField()),
+                ('municipality', models.CharField()),
+                ('province', models.CharField(choices=[('PRI', 'Pinar del Río'), ('ART', 'Artemisa'), ('HAB', 'La Habana'), ('MAY', 'Mayabeque'), ('MTZ', 'Matanzas'), ('CFG', 'Cienfuegos'), ('VCL', 'Villa Clara'), ('SSP', 'Sancti Spíritus'), ('CAV', 'Ciego de Ávila'), ('CMG', 'Camagüey'), ('LTU', 'Las Tunas'), ('GRA', 'Granma'), ('HOL', 'Holguín'), ('SCU', 'Santiago'), ('GTM', 'Guantánamo'), ('IJV', 'Isla de la Juventud'), ('UNK', 'UNKNOWN')], max_length=3)),
+                ('disease_id', models.BigIntegerField()),
+                ('disease', models.CharField(max_length=80)),
+                ('treatments', models.IntegerField()),
+                ('patients', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'core_report_municipality_diseases',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ProvincePatientsReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('province', models.CharField(choices=[('PRI', 'Pinar del Río'), ('ART', 'Artemisa'), ('HAB', 'La Habana'), ('MAY', 'Mayabeque'), ('MTZ', 'Matanzas'), ('CFG', 'Cienfuegos'), ('VCL', 'Villa Clara'), ('SSP', 'Sancti Spíritus'), ('CAV', 'Ciego de Ávila'), ('CMG', 'Camagüey'), ('LTU', 'Las Tunas'), ('GRA', 'Granma'), ('HOL', 'Holguín'), ('SCU', 'Santiago'), ('GTM', 'Guantánamo'), ('IJV', 'Isla de la Juventud'), ('UNK', 'UNKNOWN')], max_length=3)),
+                ('churches', models.IntegerField()),
+                ('patients', models.IntegerField()),
+                ('treatments', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'core_report_province_patients',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_report_views, drop_report_views),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_report_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Receipt'), ('dispensation', 'Dispensation'), ('adjustment', 'Adjustment')], max_length=12)),
+                ('quantity', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('church', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.church')),
+                ('donor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.donor')),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.medicine')),
+                ('treatment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.treatment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['church', 'medicine', 'created_at'], name='stock_movement_history_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('church', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock', to='core.church')),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock', to='core.medicine')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('quantity__gt', 0)), fields=['church', 'medicine'], name='stock_balance_in_stock_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.UniqueConstraint(fields=('church', 'medicine'), name='stock_balance_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.CheckConstraint(check=models.Q(('quantity__gte', 0)), name='stock_balance_not_negative'),
+        ),
+    ]
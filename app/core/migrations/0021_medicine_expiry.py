@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_medicine_stock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpiringStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expiry_date', models.DateField()),
+                ('quantity', models.IntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('expiry_date__isnull', False)), fields=['expiry_date', 'id'], name='medicine_expiry_idx'),
+        ),
+        migrations.AddField(
+            model_name='expiringstock',
+            name='church',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expiring_stock', to='core.church'),
+        ),
+        migrations.AddField(
+            model_name='expiringstock',
+            name='medicine',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.medicine'),
+        ),
+        migrations.AddIndex(
+            model_name='expiringstock',
+            index=models.Index(fields=['church', 'expiry_date'], name='expiring_stock_church_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='expiringstock',
+            constraint=models.UniqueConstraint(fields=('church', 'medicine'), name='expiring_stock_unique'),
+        ),
+    ]
@@ -0,0 +1,236 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+SYNCED_TABLES = [
+    'core_church', 'core_contact', 'core_denomination', 'core_disease',
+    'core_medclass', 'core_medicine', 'core_medicinepresentation',
+    'core_municipality', 'core_note', 'core_patient', 'core_phonenumber',
+    'core_treatment',
+]
+
+# Stamps a written row with its transaction and, on updates that left it
+# unchanged such as queryset updates and SET_NULL cascades, its time.
+STAMP_FUNCTION = """
+    CREATE OR REPLACE FUNCTION core_sync_stamp() RETURNS trigger AS $$
+    BEGIN
+        NEW.sync_txid := txid_current();
+        IF TG_OP = 'UPDATE' THEN
+            IF NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+                NEW.updated_at := clock_timestamp();
+            END IF;
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def create_sync_triggers(apps, schema_editor):
+    """Stamp the rows of the synced tables and the tombstones on write."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(STAMP_FUNCTION)
+    for table in SYNCED_TABLES:
+        schema_editor.execute(
+            f'CREATE TRIGGER {table}_sync_stamp '
+            f'BEFORE INSERT OR UPDATE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION core_sync_stamp()'
+        )
+    schema_editor.execute(
+        'CREATE TRIGGER core_tombstone_sync_stamp '
+        'BEFORE INSERT ON core_tombstone '
+        'FOR EACH ROW EXECUTE FUNCTION core_sync_stamp()'
+    )
+
+
+def drop_sync_triggers(apps, schema_editor):
+    """Drop the triggers stamping the synced rows."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in SYNCED_TABLES + ['core_tombstone']:
+        schema_editor.execute(
+            f'DROP TRIGGER IF EXISTS {table}_sync_stamp ON {table}'
+        )
+    schema_editor.execute('DROP FUNCTION IF EXISTS core_sync_stamp()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_medicine_expiry'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='church',
+            name='church_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='contact',
+            name='contact_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='denomination',
+            name='denomination_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='disease',
+            name='disease_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medclass',
+            name='medclass_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='medicinepresentation',
+            name='presentation_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='municipality',
+            name='municipality_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patient_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='phonenumber',
+            name='phonenumber_updated_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='tombstone',
+            name='tombstone_deleted_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='treatment',
+            name='treatment_updated_idx',
+        ),
+        migrations.AddField(
+            model_name='church',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='denomination',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='disease',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medclass',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='medicinepresentation',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='municipality',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='phonenumber',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='treatment',
+            name='sync_txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='church',
+            index=models.Index(fields=['sync_txid', 'id'], name='church_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['sync_txid', 'id'], name='contact_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='denomination',
+            index=models.Index(fields=['sync_txid', 'id'], name='denomination_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disease',
+            index=models.Index(fields=['sync_txid', 'id'], name='disease_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medclass',
+            index=models.Index(fields=['sync_txid', 'id'], name='medclass_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['sync_txid', 'id'], name='medicine_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicinepresentation',
+            index=models.Index(fields=['sync_txid', 'id'], name='presentation_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='municipality',
+            index=models.Index(fields=['sync_txid', 'id'], name='municipality_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['sync_txid', 'id'], name='note_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['sync_txid', 'id'], name='patient_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='phonenumber',
+            index=models.Index(fields=['sync_txid', 'id'], name='phonenumber_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['sync_txid', 'id'], name='tombstone_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='treatment',
+            index=models.Index(fields=['sync_txid', 'id'], name='treatment_sync_idx'),
+        ),
+        migrations.RunPython(create_sync_triggers, drop_sync_triggers),
+    ]
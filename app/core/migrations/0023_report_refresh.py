@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_sync_transaction_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRefresh',
+            fields=[
+                ('model', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
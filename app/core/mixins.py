@@ -0,0 +1,130 @@
+"""
+Reusable viewset mixins for the API apps.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core import cache
+from core.prefetch import optimize_queryset, version_fields
+
+
+class OptimizedQuerySetMixin:
+    """
+    Build the queryset with the joins and prefetches the serializer of the
+    current action renders, so list endpoints cost a constant number of
+    queries.
+    """
+
+    def get_queryset(self):
+        """Return the queryset prepared for the action serializer."""
+        queryset = super().get_queryset()
+        return optimize_queryset(queryset, self.get_serializer())
+
+
+class CachedListMixin:
+    """
+    Serve the list responses of a rarely changing model from the cache.
+    Responses are stored under the data version of the model, which the
+    model signals renew on every change, and carry an ETag and a
+    Last-Modified date so clients can revalidate them for a 304.
+    """
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list response or build and cache it."""
+        model = self.queryset.model
+        version = self.get_data_version()
+        # The absolute URI, as the page links in the response are absolute.
+        key = cache.list_cache_key(model, version,
+                                   request.build_absolute_uri())
+        etag = cache.etag(key)
+
+        if self.not_modified(request, etag, version['modified']):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            data = cache.reference_cache().get(key)
+            if data is None:
+                data = super().list(request, *args, **kwargs).data
+                cache.reference_cache().set(
+                    key, data, settings.REFERENCE_CACHE_TIMEOUT
+                )
+            response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version['modified'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_data_version(self):
+        """Return the data version of the listed model."""
+        return cache.get_version(self.queryset.model)
+
+    def not_modified(self, request, etag, modified):
+        """Return whether the client copy is still current."""
+        if request.headers.get('If-None-Match'):
+            return etag_matches(request, etag)
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since'))
+        return since is not None and modified <= since
+
+
+class ConditionalGetMixin:
+    """
+    Answer detail requests with an ETag built from the `updated_at` of the
+    row and of the related rows its serializer renders, read in a single
+    indexed query. A client sending the current ETag in If-None-Match gets
+    a 304 before the object is loaded or serialized.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return 304 for a current client copy or the serialized object."""
+        etag = self.get_etag()
+        if etag and etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+
+        if etag:
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_etag(self):
+        """Return the ETag of the requested object, None without one."""
+        serializer = self.get_serializer()
+        fields = version_fields(serializer)
+        if not fields:
+            return None
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            versions = self.queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).values_list(*fields).first()
+        except (TypeError, ValueError, ValidationError):
+            # Left for the object lookup to answer with a 404.
+            return None
+        if versions is None:
+            return None
+
+        key = f'{type(serializer).__name__}:{self.kwargs[lookup_url_kwarg]}'
+        # Each sparse fieldset is a different representation.
+        if getattr(serializer, 'requested_fields', None):
+            key += f':{",".join(serializer.requested_fields)}'
+        for version in versions:
+            key += f':{version.timestamp() if version else None}'
+        return cache.etag(key)
+
+
+def etag_matches(request, etag):
+    """
+    Return whether the request If-None-Match header lists the ETag. Tags
+    are compared weakly, since GZipMiddleware makes the ETags of compressed
+    responses weak.
+    """
+    if_none_match = request.headers.get('If-None-Match', '')
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in tags or '*' in tags
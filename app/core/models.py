@@ -3,7 +3,9 @@ Models for the pandevida app API.
 """
 from django.utils import timezone
 from django.conf import settings
-from django.db import models
+from django.db import connections, models
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
@@ -56,6 +58,8 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Version of the last auth service event applied to the user.
+    event_version = models.BigIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -74,6 +78,14 @@ class MedClass(models.Model):
                             unique=True,
                             null=False,
                             blank=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='medclass_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -85,6 +97,14 @@ class MedicinePresentation(models.Model):
                             unique=True,
                             null=False,
                             blank=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='presentation_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -116,6 +136,22 @@ class Medicine(models.Model):
                                          choices=measurement_choices,
                                          default='-'
                                          )
+    expiry_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='medicine_sync_idx'),
+            # Serves the batches expiring within a number of days.
+            models.Index(fields=['expiry_date', 'id'],
+                         condition=models.Q(expiry_date__isnull=False),
+                         name='medicine_expiry_idx'),
+            # Serves the case insensitive name prefix filter.
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'),
+                         name='medicine_name_prefix_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'Name: {self.name}, Batch: {self.batch}'
@@ -126,6 +162,14 @@ class Disease(models.Model):
     name = models.CharField(max_length=80,
                             blank=False,
                             null=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='disease_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -143,6 +187,14 @@ class Treatment(models.Model):
                                 on_delete=models.CASCADE)
     medicine = models.ManyToManyField(Medicine,
                                       blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='treatment_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{str(self.patient)}, {self.disease.name}'
@@ -153,6 +205,14 @@ class Treatment(models.Model):
 class Note(models.Model):
     """Notes and observation for object instances in the DB."""
     note = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='note_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'Note No.: {self.id}.'
@@ -176,6 +236,19 @@ class Contact(models.Model):
                              on_delete=models.SET_NULL,
                              blank=True,
                              null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='contact_sync_idx'),
+            # Trigram indexes of the contact search, see core.search.
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'],
+                     name='contact_name_trgm_idx'),
+            GinIndex(fields=['lastname'], opclasses=['gin_trgm_ops'],
+                     name='contact_lastname_trgm_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.name} {self.lastname}'
@@ -191,6 +264,16 @@ class PhoneNumber(models.Model):
                               unique=True,
                               blank=False,
                               null=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='phonenumber_sync_idx'),
+            GinIndex(fields=['number'], opclasses=['gin_trgm_ops'],
+                     name='phonenumber_number_trgm_idx'),
+        ]
 
 
 class WorkingSite(models.Model):
@@ -249,29 +332,99 @@ class Patient(models.Model):
                                blank=False,
                                null=False,
                                on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='patient_sync_idx'),
+            models.Index(fields=['church', 'inscript'],
+                         name='patient_church_inscript_idx'),
+            models.Index(fields=['inscript'], name='patient_inscript_idx'),
+            GinIndex(fields=['ci'], opclasses=['gin_trgm_ops'],
+                     name='patient_ci_trgm_idx'),
+        ]
 
     def generate_code(self):
         """Generate unique code for pacient from church id."""
-        last_patient = \
-            Patient.objects.filter(church=self.church)\
-            .order_by('-code').first()
-        if last_patient:
-            try:
-                last_specific_id = str(last_patient.code).split('-')[-1]
-                code = f'{self.church.id}-{int(last_specific_id) + 1}'
-            except (ValueError, IndexError):
-                code = f'{self.church.id}-1'
-        else:
-            code = f'{self.church.id}-1'
-
-        return code
+        number = PatientCodeSequence.objects.allocate(self.church_id)
+        return f'{self.church_id}-{number}'
 
     def save(self, *args, **kwargs):
-        self.code = self.generate_code()
+        # Codes are stable identifiers, only new patients get one.
+        if self._state.adding and not self.code:
+            self.code = self.generate_code()
         super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         return f'Patient: {self.code}'
+
+
+class PatientCodeSequenceManager(models.Manager):
+    """Manager for the per church patient code counters."""
+
+    def allocate(self, church_id, count=1):
+        """
+        Reserve `count` consecutive code numbers for the church in a single
+        round trip and return the last number reserved. The upsert locks the
+        church counter row, so concurrent registrations never share a number.
+        """
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (church_id, last_value) '
+                f'VALUES (%s, %s) '
+                f'ON CONFLICT (church_id) DO UPDATE '
+                f'SET last_value = {table}.last_value + EXCLUDED.last_value '
+                f'RETURNING last_value',
+                [church_id, count]
+            )
+            return cursor.fetchone()[0]
+
+    def lock(self):
+        """
+        Lock the counters against allocations until the transaction ends,
+        leaving them readable.
+        """
+        table = self.model._meta.db_table
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+
+    def advance(self, last_values, batch_size=1000):
+        """
+        Move the counters of the churches, keyed by church id, up to the
+        numbers. A counter already past its number is kept, so a number
+        handed out is never allocated again.
+        """
+        table = self.model._meta.db_table
+        items = list(last_values.items())
+        with connections[self.db].cursor() as cursor:
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                rows = ', '.join(['(%s, %s)'] * len(batch))
+                cursor.execute(
+                    f'INSERT INTO {table} (church_id, last_value) '
+                    f'VALUES {rows} '
+                    f'ON CONFLICT (church_id) DO UPDATE '
+                    f'SET last_value = GREATEST({table}.last_value, '
+                    f'EXCLUDED.last_value)',
+                    [value for item in batch for value in item]
+                )
+
+
+class PatientCodeSequence(models.Model):
+    """Last patient code number allocated in each church."""
+    church = models.OneToOneField('Church',
+                                  primary_key=True,
+                                  on_delete=models.CASCADE,
+                                  related_name='patient_code_sequence')
+    last_value = models.PositiveIntegerField(default=0)
+
+    objects = PatientCodeSequenceManager()
+
+    def __str__(self) -> str:
+        return f'Church {self.church_id}: {self.last_value}'
 # -----------------------------------------------------------------------
 
 
@@ -283,6 +436,16 @@ class Municipality(models.Model):
         max_length=3,
         choices=PROVINCES_CUBA,
         default='UNK')
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='municipality_sync_idx'),
+            models.Index(fields=['province'],
+                         name='municipality_province_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.name}, {self.province}'
@@ -294,6 +457,14 @@ class Denomination(models.Model):
                             unique=True,
                             blank=False,
                             null=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='denomination_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -327,6 +498,305 @@ class Church(models.Model):
                                      null=True,
                                      on_delete=models.SET_NULL)
     inscript = models.DateField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='church_sync_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.name}, {self.denomination.name}'
+
+
+class CounterManager(models.Manager):
+    """Manager for the rows holding running counts."""
+
+    def add(self, keys, **counts):
+        """Add the counts to the row identified by `keys`."""
+        for name, count in counts.items():
+            self.add_many(list(keys), name, [(*keys.values(), count)])
+
+    def add_many(self, key_names, field, rows):
+        """
+        Add the last value of each row to `field` of the counter row with
+        the key values before it, with one statement for the increments
+        and one for the decrements. Increments create missing rows through
+        an upsert that locks them, so concurrent writers never lose a
+        count. Decrements only update existing rows, as the rows of a
+        church being deleted may already be gone. Keys must not repeat.
+        """
+        table = self.model._meta.db_table
+        increments = [row for row in rows if row[-1] >= 0]
+        decrements = [row for row in rows if row[-1] < 0]
+        # A new row starts every other counter at zero.
+        others = [
+            model_field.attname
+            for model_field in self.model._meta.concrete_fields
+            if isinstance(model_field, models.IntegerField) and
+            not model_field.primary_key and
+            model_field.attname not in (field, *key_names)
+        ]
+
+        with connections[self.db].cursor() as cursor:
+            if increments:
+                columns = [*key_names, field, *others]
+                row_sql = f'({", ".join(["%s"] * len(columns))})'
+                cursor.execute(
+                    f'INSERT INTO {table} ({", ".join(columns)}) '
+                    f'VALUES {", ".join([row_sql] * len(increments))} '
+                    f'ON CONFLICT ({", ".join(key_names)}) DO UPDATE '
+                    f'SET {field} = {table}.{field} + EXCLUDED.{field}',
+                    [value for row in increments
+                     for value in (*row, *[0] * len(others))]
+                )
+            if decrements:
+                columns = [*key_names, 'delta']
+                row_sql = f'({", ".join(["%s"] * len(columns))})'
+                matches = ' AND '.join(
+                    f'{table}.{name} = changes.{name}' for name in key_names
+                )
+                cursor.execute(
+                    f'UPDATE {table} SET {field} = {table}.{field} + '
+                    f'changes.delta FROM (VALUES '
+                    f'{", ".join([row_sql] * len(decrements))}) '
+                    f'AS changes ({", ".join(columns)}) WHERE {matches}',
+                    [value for row in decrements for value in row]
+                )
+
+
+class ChurchStats(models.Model):
+    """Running patient and treatment counts of a church."""
+    church = models.OneToOneField('Church',
+                                  primary_key=True,
+                                  on_delete=models.CASCADE,
+                                  related_name='stats')
+    patients = models.IntegerField(default=0)
+    treatments = models.IntegerField(default=0)
+
+    objects = CounterManager()
+
+    def __str__(self) -> str:
+        return f'Church {self.church_id}: {self.patients} patients'
+
+
+class ChurchDiseaseStats(models.Model):
+    """Running count of the treatments of a disease in a church."""
+    church = models.ForeignKey('Church',
+                               on_delete=models.CASCADE,
+                               related_name='disease_stats')
+    disease = models.ForeignKey(Disease, on_delete=models.CASCADE)
+    treatments = models.IntegerField(default=0)
+
+    objects = CounterManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['church', 'disease'],
+                                    name='church_disease_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['church', '-treatments'],
+                         name='church_disease_stats_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Church {self.church_id}: disease {self.disease_id}'
+
+
+class ChurchMedicineStats(models.Model):
+    """Running count of the treatments prescribing a medicine in a church."""
+    church = models.ForeignKey('Church',
+                               on_delete=models.CASCADE,
+                               related_name='medicine_stats')
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE)
+    prescriptions = models.IntegerField(default=0)
+
+    objects = CounterManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['church', 'medicine'],
+                                    name='church_medicine_stats_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['church', '-prescriptions'],
+                         name='church_medicine_stats_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Church {self.church_id}: medicine {self.medicine_id}'
+# -----------------------------------------------------------------------
+
+
+# SYNC RELATED MODELS
+class Tombstone(models.Model):
+    """Deleted row of a synced model, reported by the delta sync."""
+    model = models.CharField(max_length=40)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    sync_txid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_txid', 'id'],
+                         name='tombstone_sync_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.model} {self.object_id}'
+# -----------------------------------------------------------------------
+
+
+# REPORT RELATED MODELS
+class ProvincePatientsReport(models.Model):
+    """Churches, patients and treatments per province."""
+    province = models.CharField(max_length=3, choices=PROVINCES_CUBA)
+    churches = models.IntegerField()
+    patients = models.IntegerField()
+    treatments = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'core_report_province_patients'
+
+    def __str__(self) -> str:
+        return f'{self.province}: {self.patients}'
+
+
+class MunicipalityDiseaseReport(models.Model):
+    """Treatments and patients per disease in every municipality."""
+    municipality_id = models.BigIntegerField()
+    municipality = models.CharField()
+    province = models.CharField(max_length=3, choices=PROVINCES_CUBA)
+    disease_id = models.BigIntegerField()
+    disease = models.CharField(max_length=80)
+    treatments = models.IntegerField()
+    patients = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'core_report_municipality_diseases'
+
+    def __str__(self) -> str:
+        return f'{self.municipality}, {self.disease}: {self.treatments}'
+
+
+class MedicineDemandReport(models.Model):
+    """Prescriptions of the medicines of every classification."""
+    classification_id = models.BigIntegerField(null=True)
+    classification = models.CharField(max_length=60, null=True)
+    medicines = models.IntegerField()
+    prescriptions = models.IntegerField()
+    patients = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'core_report_medicine_demand'
+
+    def __str__(self) -> str:
+        return f'{self.classification}: {self.prescriptions}'
+
+
+class ReportRefresh(models.Model):
+    """Last refresh of a report, the version of its cached responses."""
+    model = models.CharField(max_length=100, primary_key=True)
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f'{self.model}: {self.refreshed_at}'
+# -----------------------------------------------------------------------
+
+
+# INVENTORY RELATED MODELS
+class StockMovement(models.Model):
+    """Entry of the medicine stock ledger of a church."""
+    RECEIPT = 'receipt'
+    DISPENSATION = 'dispensation'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (RECEIPT, 'Receipt'),
+        (DISPENSATION, 'Dispensation'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    church = models.ForeignKey('Church', on_delete=models.CASCADE)
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    # Units received are positive, dispensed ones negative.
+    quantity = models.IntegerField()
+    donor = models.ForeignKey(Donor,
+                              null=True,
+                              blank=True,
+                              on_delete=models.SET_NULL)
+    treatment = models.ForeignKey(Treatment,
+                                  null=True,
+                                  blank=True,
+                                  on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['church', 'medicine', 'created_at'],
+                         name='stock_movement_history_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.kind} of {self.quantity}: medicine {self.medicine_id}'
+
+
+class StockBalance(models.Model):
+    """Units of a medicine in stock at a church, kept by the ledger."""
+    church = models.ForeignKey('Church',
+                               on_delete=models.CASCADE,
+                               related_name='stock')
+    medicine = models.ForeignKey(Medicine,
+                                 on_delete=models.CASCADE,
+                                 related_name='stock')
+    quantity = models.IntegerField(default=0)
+
+    objects = CounterManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['church', 'medicine'],
+                                    name='stock_balance_unique'),
+            models.CheckConstraint(check=models.Q(quantity__gte=0),
+                                   name='stock_balance_not_negative'),
+        ]
+        indexes = [
+            # Serves the medicines in stock at a church.
+            models.Index(fields=['church', 'medicine'],
+                         condition=models.Q(quantity__gt=0),
+                         name='stock_balance_in_stock_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Church {self.church_id}: {self.quantity} of ' \
+            f'medicine {self.medicine_id}'
+
+
+class ExpiringStock(models.Model):
+    """Stock of a medicine batch at a church expiring soon, precomputed."""
+    church = models.ForeignKey('Church',
+                               on_delete=models.CASCADE,
+                               related_name='expiring_stock')
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE)
+    expiry_date = models.DateField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['church', 'medicine'],
+                                    name='expiring_stock_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['church', 'expiry_date'],
+                         name='expiring_stock_church_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Church {self.church_id}: {self.quantity} of ' \
+            f'medicine {self.medicine_id} by {self.expiry_date}'
@@ -0,0 +1,115 @@
+"""
+Pagination classes for the API list endpoints.
+"""
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination with a stable ordering on the primary key, so every
+    page costs an indexed range scan no matter how deep the client goes.
+    """
+    ordering = 'id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class RankedPagination(PageNumberPagination):
+    """
+    Page numbers for results ordered by relevance, where there is no
+    stable key a cursor could follow.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class KeysetCursorPagination(IdCursorPagination):
+    """
+    Keyset pagination on a composite key such as (`expiry_date`, `id`).
+    The cursor holds the key of the row to continue from, so rows sharing
+    the leading value are skipped by the index however many there are,
+    where CursorPagination counts them as an offset capped at 1000.
+    """
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the page of rows past the key of the cursor."""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        if self.cursor is not None:
+            key = self.decode_key(queryset.model, self.cursor.position)
+            queryset = queryset.filter(self.past_key(key, reverse))
+        ordering = [f'-{name}' if reverse else name for name in self.ordering]
+
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        self.has_next = has_more or reverse
+        self.has_previous = has_more if reverse else self.cursor is not None
+        return self.page
+
+    def past_key(self, key, reverse):
+        """Return the filter of the rows after the key, before it reversed."""
+        lookup = 'lt' if reverse else 'gt'
+        past = Q()
+        for index, name in enumerate(self.ordering):
+            past |= Q(**dict(zip(self.ordering[:index], key[:index])),
+                      **{f'{name}__{lookup}': key[index]})
+        # The bound on the leading column keeps the scan on the index.
+        return Q(**{f'{self.ordering[0]}__{lookup}e': key[0]}) & past
+
+    def encode_key(self, row):
+        """Return the key of the row as a cursor position."""
+        return json.dumps([str(getattr(row, name)) for name in self.ordering])
+
+    def decode_key(self, model, position):
+        """Return the key of a cursor position, 404 when malformed."""
+        try:
+            values = json.loads(position)
+            return [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.ordering, values, strict=True)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        """Return the link to the rows after the page."""
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=self.encode_key(self.page[-1])
+        ))
+
+    def get_previous_link(self):
+        """Return the link to the rows before the page."""
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=True, position=self.encode_key(self.page[0])
+        ))
+
+
+class ExpiryCursorPagination(KeysetCursorPagination):
+    """Keyset pagination of medicine batches, the first to expire first."""
+    ordering = ('expiry_date', 'id')
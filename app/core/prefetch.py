@@ -0,0 +1,136 @@
+"""
+Helpers to build querysets with the joins their serializers need.
+"""
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework.relations import ManyRelatedField
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+
+def get_model_field(model, name):
+    """Return the field or the reverse relation reached by `name`."""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for relation in model._meta.related_objects:
+            if relation.get_accessor_name() == name:
+                return relation
+        raise
+
+
+def related_lookups(serializer, prefix=''):
+    """
+    Walk the declared fields of a model serializer and return the
+    select_related and prefetch_related lookups its representation reads.
+    """
+    select, prefetch = [], []
+    model = serializer.Meta.model
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = get_model_field(model, field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        path = f'{prefix}{field.source}'
+        nested = field.child if isinstance(field, ListSerializer) else field
+
+        if model_field.many_to_many or model_field.one_to_many:
+            if isinstance(field, ManyRelatedField) or \
+                    isinstance(nested, BaseSerializer):
+                prefetch.append(path)
+            if isinstance(nested, BaseSerializer):
+                sub_select, sub_prefetch = related_lookups(nested, f'{path}__')
+                prefetch += sub_select + sub_prefetch
+        elif isinstance(nested, BaseSerializer):
+            select.append(path)
+            sub_select, sub_prefetch = related_lookups(nested, f'{path}__')
+            select += sub_select
+            prefetch += sub_prefetch
+
+    return select, prefetch
+
+
+def selected_columns(serializer, prefix=''):
+    """
+    Return the `only` lookups of the columns the representation of a
+    model serializer reads, or None when a field reads something other
+    than a model field, such as a method or a property.
+    """
+    model = serializer.Meta.model
+    columns = [f'{prefix}{model._meta.pk.name}']
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = get_model_field(model, field.source)
+        except FieldDoesNotExist:
+            return None
+        if model_field.many_to_many or model_field.one_to_many:
+            # Prefetched, only the primary key is needed to match them.
+            continue
+        if not model_field.concrete:
+            return None
+
+        path = f'{prefix}{field.source}'
+        columns.append(path)
+        nested = field.child if isinstance(field, ListSerializer) else field
+        if model_field.is_relation and isinstance(nested, BaseSerializer):
+            nested = selected_columns(nested, f'{path}__')
+            if nested is None:
+                return None
+            columns += nested
+
+    return columns
+
+
+def optimize_queryset(queryset, serializer):
+    """
+    Return the queryset joined and prefetched for the given serializer,
+    selecting only the columns it renders when its fields were trimmed.
+    """
+    select, prefetch = related_lookups(serializer)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if getattr(serializer, 'requested_fields', None):
+        columns = selected_columns(serializer)
+        if columns is not None:
+            queryset = queryset.only(*columns)
+
+    return queryset
+
+
+def version_fields(serializer):
+    """
+    Return the `updated_at` lookups of the model of the serializer and of
+    the related rows it joins, whose values change whenever the rendered
+    representation does. Rows rendered through prefetched relations are
+    not covered, and no lookups are returned when the model itself has no
+    `updated_at`, as its own changes could not be told apart.
+    """
+    model = serializer.Meta.model
+    select, prefetch = related_lookups(serializer)
+    fields = []
+
+    for path in [''] + [f'{lookup}__' for lookup in select]:
+        target = model
+        for name in path.split('__')[:-1]:
+            target = get_model_field(target, name).related_model
+        try:
+            target._meta.get_field('updated_at')
+        except FieldDoesNotExist:
+            if not path:
+                return []
+            continue
+        fields.append(f'{path}updated_at')
+
+    return fields
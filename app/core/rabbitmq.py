@@ -1,127 +1,490 @@
 """
-RabbitMQ middlewares for the API
+RabbitMQ user sync consumer for the API.
 """
 import aio_pika
 import logging
 import asyncio
 import json
+import random
+import time
 
-from django.http import Http404
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
 
 from django.contrib.auth import get_user_model
 
-from app.settings import RABBITMQ_URL
 
-from asgiref.sync import sync_to_async
+USER_UPSERT_COLUMNS = ('email', 'password', 'is_superuser', 'is_staff')
+# Columns set by user_created events only.
+CREATE_ONLY_COLUMNS = ('is_superuser', 'is_staff')
+# Domain of the emails of the inactive users held for early modify events.
+PENDING_EMAIL_DOMAIN = 'pending.invalid'
+
+
+def event_version(user_info):
+    """
+    Return the ordering version of a user event: its explicit `version`,
+    else its `timestamp` in microseconds, else 0 for unversioned events.
+    """
+    if user_info.get('version') is not None:
+        return int(user_info['version'])
+
+    timestamp = user_info.get('timestamp')
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp * 1_000_000)
+    if timestamp:
+        parsed = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        return int(parsed.timestamp() * 1_000_000)
+
+    return 0
+
+
+def created_fields(user_info):
+    """Map a user_created event to the user columns it sets."""
+    superuser = bool(user_info.get('is_superuser'))
+    fields = {
+        'id': user_info['id'],
+        'email': user_info['email'],
+        'is_superuser': superuser,
+        'is_staff': superuser,
+        'event_version': event_version(user_info),
+    }
+    if superuser:
+        fields['password'] = user_info['password']
+
+    return fields
+
+
+def modified_fields(user_info):
+    """Map a user_modified event to the user columns it sets."""
+    fields = {
+        'id': user_info['id'],
+        'event_version': event_version(user_info),
+    }
+    for column in ('email', 'password'):
+        if user_info.get(column):
+            fields[column] = user_info[column]
+
+    return fields
+
+
+def pending_email(user_id):
+    """Return the email of a user held until its create arrives."""
+    return f'{user_id}@{PENDING_EMAIL_DOMAIN}'
+
+
+def upsert_users(rows):
+    """
+    Syncronusly insert or update users keyed on their id. Rows of the same
+    user are merged in version order and a column of an existing user only
+    changes when the event is not older than the last one applied, so
+    redelivered and out of order events are absorbed. A late create still
+    fills the email, password and flags a newer event left unset. Rows
+    without email of unknown users are kept in an inactive user with a
+    pending email until their create arrives. Rows setting the same
+    columns are written with a single INSERT ... ON CONFLICT.
+    """
+    table = get_user_model()._meta.db_table
+
+    merged = {}
+    for row in sorted(rows, key=lambda row: row['event_version']):
+        merged.setdefault(row['id'], {}).update(row)
+
+    groups = defaultdict(list)
+    for row in merged.values():
+        columns = tuple(c for c in USER_UPSERT_COLUMNS if c in row)
+        groups[columns].append(row)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for columns, group in groups.items():
+            upsert_user_rows(cursor, table, columns, group)
+
+
+def upsert_assignment(table, column):
+    """
+    Return the SET clause of a column for the rows conflicting with an
+    existing user. Events not older than the user overwrite the column.
+    Older ones still fill an email or password the user has not got, and
+    grant the flags only creates carry, which later events never set.
+    """
+    newer = f'{table}.event_version <= EXCLUDED.event_version'
+    if column in CREATE_ONLY_COLUMNS:
+        return (f'{column} = CASE WHEN {newer} THEN EXCLUDED.{column} '
+                f'ELSE {table}.{column} OR EXCLUDED.{column} END')
+    if column == 'email':
+        newer += f" OR {pending_user(table)}"
+    if column == 'password':
+        newer += f" OR {table}.password = ''"
+
+    return (f'{column} = CASE WHEN {newer} THEN EXCLUDED.{column} '
+            f'ELSE {table}.{column} END')
+
+
+def pending_user(table):
+    """Return the SQL condition of a user held for its create."""
+    return f"{table}.email LIKE '%%@{PENDING_EMAIL_DOMAIN}'"
+
+
+def upsert_user_rows(cursor, table, columns, rows):
+    """Insert the rows or update the users they conflict with."""
+    params = []
+    for row in rows:
+        email = row.get('email') or pending_email(row['id'])
+        params += [
+            row['id'],
+            get_user_model().objects.normalize_email(email),
+            row.get('password', ''),
+            row.get('is_superuser', False),
+            row.get('is_staff', False),
+            'email' in row,
+            row['event_version'],
+        ]
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows))
+    updates = [upsert_assignment(table, column) for column in columns]
+    if 'email' in columns:
+        updates.append(f'is_active = {table}.is_active OR '
+                       f'{pending_user(table)}')
+    updates.append(f'event_version = GREATEST({table}.event_version, '
+                   f'EXCLUDED.event_version)')
+    cursor.execute(
+        f'INSERT INTO {table} (id, email, password, is_superuser, '
+        f'is_staff, is_active, event_version) VALUES {values} '
+        f'ON CONFLICT (id) DO UPDATE SET {", ".join(updates)}',
+        params
+    )
 
 
 def create_user(user_info):
-    """Syncronusly creates a new user."""
-    superuser = user_info.pop('is_superuser', None)
-    if not superuser:
-        get_user_model().objects.create_user(
-             id=user_info["id"],
-             email=user_info["email"]
-        )
-    else:
-        get_user_model().objects.create_superuser(
-            id=user_info["id"],
-            email=user_info["email"],
-            password=user_info["password"]
-        )
+    """Syncronusly creates or refreshes a user."""
+    upsert_users([created_fields(user_info)])
 
 
 def update_user(user_info):
-    """Syncronusly updates a existing user."""
+    """Syncronusly updates a user, creating it if its create is late."""
+    upsert_users([modified_fields(user_info)])
+
+
+def create_users(users_info):
+    """Syncronusly creates or refreshes a batch of users."""
+    upsert_users([created_fields(user_info) for user_info in users_info])
+
+
+def update_users(users_info):
+    """Syncronusly updates a batch of users."""
+    upsert_users([modified_fields(user_info) for user_info in users_info])
+
+
+class ConsumerStatus:
+    """State and counters of the consumer, exposed for health reporting."""
+
+    def __init__(self):
+        self.state = 'starting'
+        self.processed = 0
+        self.rejected = 0
+        self.last_batch_at = None
+        self.attempts = 0
+        self.failures = 0
+        self.last_error = None
+        self.connected_at = None
+        self.next_attempt_at = None
+        self.started_at = time.time()
+
+    def connected(self, *args):
+        """Record a successful connection, resetting the failure streak."""
+        self.state = 'consuming'
+        self.failures = 0
+        self.next_attempt_at = None
+        self.connected_at = time.time()
+
+    def connection_lost(self, sender=None, error=None):
+        """Record a dropped connection the robust connection restores."""
+        if self.state != 'consuming':
+            return
+        self.state = 'reconnecting'
+        if error:
+            self.last_error = repr(error)
+
+    def as_dict(self):
+        """Return the status as a JSON serializable dict."""
+        return {
+            'state': self.state,
+            'processed': self.processed,
+            'rejected': self.rejected,
+            'last_batch_at': self.last_batch_at,
+            'attempts': self.attempts,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'connected_at': self.connected_at,
+            'next_attempt_at': self.next_attempt_at,
+            'started_at': self.started_at,
+            'updated_at': time.time(),
+        }
+
+
+def run_in_worker(func, *args):
+    """Run a DB handler in a worker thread with a healthy connection."""
+    close_old_connections()
     try:
-        user = get_user_model().objects.get(id=user_info["id"])
-    except get_user_model().DoesNotExist:
-        raise Http404("Item does not exist")
+        return func(*args)
+    finally:
+        close_old_connections()
 
-    password = user_info.pop("password", None)
-    email = user_info.get("email", None)
 
-    if password:
-        user.password = password
-    if email != user.email:
-        user.email = email
+class BatchConsumer:
+    """
+    Collect the messages of a queue in micro batches and hand each batch to
+    a worker thread. Messages are acked only after their batch commits; if
+    a batch fails it is retried one message at a time, so a single bad
+    message is rejected without dropping the rest.
+    """
 
-    user.save()
+    def __init__(self, queue_name, handle_batch, handle_one, executor,
+                 batch_size=None, batch_timeout=None, workers=None,
+                 status=None):
+        self.queue_name = queue_name
+        self.handle_batch = handle_batch
+        self.handle_one = handle_one
+        self.executor = executor
+        self.batch_size = batch_size or settings.RABBITMQ_BATCH_SIZE
+        self.batch_timeout = batch_timeout or settings.RABBITMQ_BATCH_TIMEOUT
+        self.slots = asyncio.Semaphore(workers or settings.RABBITMQ_WORKERS)
+        self.buffer = asyncio.Queue()
+        self.tasks = set()
+        self.closed = False
+        self.status = status or ConsumerStatus()
 
+    async def on_message(self, message):
+        """Buffer a delivered message until its batch is flushed."""
+        await self.buffer.put(message)
 
-create_user_async = sync_to_async(
-    create_user,
-    thread_sensitive=True)
+    async def next_batch(self):
+        """Wait for a message and gather more until full or timed out."""
+        loop = asyncio.get_running_loop()
+        batch = []
+        while len(batch) < self.batch_size:
+            if not batch:
+                message = await self.buffer.get()
+                deadline = loop.time() + self.batch_timeout
+            else:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(self.buffer.get(),
+                                                     remaining)
+                except asyncio.TimeoutError:
+                    break
+            if message is None:
+                self.closed = True
+                break
+            batch.append(message)
 
+        return batch
 
-update_user_async = sync_to_async(
-    update_user,
-    thread_sensitive=True)
+    async def run(self):
+        """
+        Flush batches, at most `workers` at the same time, until closed;
+        then wait for the running batches to be committed and acked.
+        """
+        while not self.closed:
+            await self.slots.acquire()
+            batch = await self.next_batch()
+            if not batch:
+                self.slots.release()
+                continue
+            task = asyncio.create_task(self.process(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            task.add_done_callback(lambda _: self.slots.release())
 
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
 
-async def start_consuming():
-    """Starts consuming from both 'user_created' and 'user_modified' queues."""
-    connection = await aio_pika.connect_robust(RABBITMQ_URL)
-    channel = await connection.channel()
+    async def close(self):
+        """Make `run` return once every buffered message is processed."""
+        await self.buffer.put(None)
 
-    user_created_queue = await channel.declare_queue(
-        'user_created',
-        durable=True
-    )
-    user_modified_queue = await channel.declare_queue(
-        'user_modified',
-        durable=True
-    )
+    async def process(self, batch):
+        """Process a batch in a worker thread and ack it after commit."""
+        loop = asyncio.get_running_loop()
+        messages, payloads = [], []
+        for message in batch:
+            try:
+                payload = json.loads(message.body.decode())
+                if getattr(message, 'timestamp', None):
+                    payload.setdefault('timestamp',
+                                       message.timestamp.isoformat())
+                payloads.append(payload)
+                messages.append(message)
+            except ValueError:
+                logging.exception(
+                    f'Invalid message in {self.queue_name}, rejected.'
+                )
+                await message.reject(requeue=False)
+                self.status.rejected += 1
 
-    user_created_iter = user_created_queue.iterator()
-    user_modified_iter = user_modified_queue.iterator()
-
-    async def process_user_created():
-        async with user_created_iter:
-            async for message in user_created_iter:
-                async with message.process():
-                    user_info = message.body.decode()
-                    user_info = json.loads(user_info)
-                    print(f"MAIN API Received {user_info['email']}.")
-                    await create_user_async(user_info)
-                    print(f"User {user_info['email']} created")
-
-    async def process_user_modified():
-        async with user_modified_iter:
-            async for message in user_modified_iter:
-                async with message.process():
-                    user_info = message.body.decode()
-                    user_info = json.loads(user_info)
-                    print(f"MAIN API Received {user_info['email']}.")
-                    await update_user_async(user_info)
-                    print(f"User {user_info['email']} updated")
-
-    await asyncio.gather(
-        process_user_created(),
-        process_user_modified()
-    )
+        if not messages:
+            return
+
+        try:
+            await loop.run_in_executor(
+                self.executor, run_in_worker, self.handle_batch, payloads
+            )
+        except Exception:
+            logging.exception(
+                f'Batch of {len(messages)} from {self.queue_name} failed, '
+                'processing messages one by one.'
+            )
+            await self.process_one_by_one(messages, payloads)
+            return
 
-    await connection.close()
+        for message in messages:
+            await message.ack()
+        self.status.processed += len(messages)
+        self.status.last_batch_at = time.time()
+        logging.info(f'Processed {len(messages)} from {self.queue_name}.')
 
+    async def process_one_by_one(self, messages, payloads):
+        """Process each message alone, rejecting the ones that fail."""
+        loop = asyncio.get_running_loop()
+        for message, payload in zip(messages, payloads):
+            try:
+                await loop.run_in_executor(
+                    self.executor, run_in_worker, self.handle_one, payload
+                )
+            except Exception:
+                logging.exception(
+                    f'Message from {self.queue_name} failed, rejected.'
+                )
+                await message.reject(requeue=False)
+                self.status.rejected += 1
+            else:
+                await message.ack()
+                self.status.processed += 1
+        self.status.last_batch_at = time.time()
 
-async def secure_start_consuming():
-    """Try to start RabbitMQ consumer handling errors."""
-    rabbitmq_up = False
-    counter = 0
 
-    while rabbitmq_up is False and counter < 2:
+async def start_consuming(stop=None, status=None, prefetch_count=None,
+                          workers=None, batch_size=None, batch_timeout=None):
+    """
+    Starts consuming from both 'user_created' and 'user_modified' queues
+    until the `stop` event is set. On stop the subscriptions are cancelled
+    and the messages already delivered are processed and acked before the
+    connection closes.
+    """
+    status = status or ConsumerStatus()
+    workers = workers or settings.RABBITMQ_WORKERS
+    connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
+    connection.close_callbacks.add(status.connection_lost)
+    connection.reconnect_callbacks.add(status.connected)
+
+    async with connection:
+        channel = await connection.channel()
+        await channel.set_qos(
+            prefetch_count=prefetch_count or settings.RABBITMQ_PREFETCH_COUNT
+        )
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            options = {
+                'batch_size': batch_size,
+                'batch_timeout': batch_timeout,
+                'workers': workers,
+                'status': status,
+            }
+            consumers = [
+                BatchConsumer('user_created', create_users, create_user,
+                              executor, **options),
+                BatchConsumer('user_modified', update_users, update_user,
+                              executor, **options),
+            ]
+            subscriptions = []
+            for consumer in consumers:
+                queue = await channel.declare_queue(
+                    consumer.queue_name,
+                    durable=True
+                )
+                tag = await queue.consume(consumer.on_message)
+                subscriptions.append((queue, tag))
+
+            status.connected()
+            runners = [
+                asyncio.create_task(consumer.run()) for consumer in consumers
+            ]
+            stopping = asyncio.create_task((stop or asyncio.Event()).wait())
+            await asyncio.wait(
+                runners + [stopping],
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            status.state = 'stopping'
+            stopping.cancel()
+            for queue, tag in subscriptions:
+                await queue.cancel(tag)
+            for consumer in consumers:
+                await consumer.close()
+            await asyncio.gather(*runners)
+
+    status.state = 'stopped'
+
+
+def backoff_delay(failures, base=None, maximum=None):
+    """
+    Return the seconds to wait after `failures` consecutive failed attempts:
+    exponential from `base` up to `maximum`, randomized over its upper half
+    so restarted consumers do not reconnect in lockstep.
+    """
+    base = settings.RABBITMQ_RETRY_BASE if base is None else base
+    maximum = settings.RABBITMQ_RETRY_MAX if maximum is None else maximum
+    delay = min(maximum, base * 2 ** (failures - 1))
+
+    return random.uniform(delay / 2, delay)
+
+
+async def secure_start_consuming(stop=None, status=None, max_attempts=None,
+                                 **options):
+    """
+    Start the RabbitMQ consumer right away and restart it whenever it fails,
+    waiting a jittered exponential backoff between attempts. Retries never
+    end unless `max_attempts` consecutive attempts fail; waits are cut
+    short when the `stop` event is set.
+    """
+    stop = stop or asyncio.Event()
+    status = status or ConsumerStatus()
+    if max_attempts is None:
+        max_attempts = settings.RABBITMQ_MAX_ATTEMPTS
+
+    while not stop.is_set():
+        status.state = 'connecting'
+        status.attempts += 1
         try:
-            logging.info('RabbitMQ consummer will start in 30s...')
-            await asyncio.sleep(30)
-            logging.info('Starting RabbitMQ consummer...')
-            await start_consuming()
-            rabbitmq_up = True
+            logging.info('Starting RabbitMQ consumer...')
+            await start_consuming(stop=stop, status=status, **options)
         except Exception as e:
+            status.failures += 1
+            status.last_error = repr(e)
             logging.exception(f'Error starting RabbitMQ consumer: {e}')
-            logging.info('Retrying connection...')
-            counter += 1
+        else:
+            continue
+
+        if max_attempts and status.failures >= max_attempts:
+            status.state = 'failed'
+            logging.critical(
+                f'Unable to connect to RabbitMQ after {status.failures} '
+                'attempts.'
+            )
+            return
+
+        delay = backoff_delay(status.failures)
+        status.state = 'backoff'
+        status.next_attempt_at = time.time() + delay
+        logging.info(f'Retrying RabbitMQ connection in {delay:.1f}s...')
+        try:
+            await asyncio.wait_for(stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
 
-    if rabbitmq_up is True:
-        logging.info('RabbitMQ connection success!')
-    else:
-        logging.critical('Unable to connect to RabbitMQ')
+    status.state = 'stopped'
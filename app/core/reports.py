@@ -0,0 +1,61 @@
+"""
+Precomputed aggregates read by the reporting API.
+"""
+from django.db import connections
+from django.utils import timezone
+
+from core import cache
+from core.models import (
+    MedicineDemandReport,
+    MunicipalityDiseaseReport,
+    ProvincePatientsReport,
+    ReportRefresh,
+)
+
+
+REPORT_MODELS = {
+    'provinces': ProvincePatientsReport,
+    'diseases': MunicipalityDiseaseReport,
+    'medicines': MedicineDemandReport,
+}
+
+
+def refresh_reports(names=None, concurrently=True, using='default'):
+    """
+    Recompute the materialized views of the reports, all of them by
+    default, and record the refresh, which renews their cached responses.
+    A concurrent refresh keeps the old rows readable while it runs. Other
+    databases keep the reports as plain views, so only the refresh is
+    recorded.
+    """
+    connection = connections[using]
+    names = names or list(REPORT_MODELS)
+    option = 'CONCURRENTLY ' if concurrently else ''
+    for name in names:
+        model = REPORT_MODELS[name]
+        if connection.vendor == 'postgresql':
+            view = connection.ops.quote_name(model._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(f'REFRESH MATERIALIZED VIEW {option}{view}')
+        ReportRefresh.objects.using(using).update_or_create(
+            model=model._meta.label_lower,
+            defaults={'refreshed_at': timezone.now()},
+        )
+
+    return names
+
+
+def report_version(model):
+    """
+    Return the data version of a report from its last refresh. It is read
+    from the database, as the refresh runs in another process whose cache
+    the API processes may not share.
+    """
+    refreshed_at = ReportRefresh.objects.filter(
+        model=model._meta.label_lower
+    ).values_list('refreshed_at', flat=True).first()
+    if refreshed_at is None:
+        return cache.get_version(model)
+
+    return {'token': refreshed_at.isoformat(),
+            'modified': int(refreshed_at.timestamp())}
@@ -0,0 +1,73 @@
+"""
+Ranked search over contacts by name, last name, patient CI and phone.
+"""
+import re
+
+from functools import lru_cache
+
+from django.contrib.postgres.search import (
+    TrigramSimilarity,
+    TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import Case, FloatField, Value, When
+from django.db.models.functions import Coalesce, Concat, Greatest
+
+from core.models import Contact, Patient, PhoneNumber
+
+
+@lru_cache
+def trigram_enabled(alias):
+    """Return whether the pg_trgm extension is installed in the database."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def matching_contact_ids(term):
+    """
+    Return a query of the ids of the contacts matching a search term in
+    any searched column. Each branch is served by the trigram index of its
+    column and the branches are combined with UNION, so no branch forces
+    a sequential scan of the contacts.
+    """
+    pattern = re.escape(term)
+    return Contact.objects.filter(name__iregex=pattern).values('id').union(
+        Contact.objects.filter(lastname__iregex=pattern).values('id'),
+        Patient.objects.filter(ci__contains=term).values('contact_id'),
+        PhoneNumber.objects.filter(number__contains=term)
+        .values('contact_id'),
+    )
+
+
+def search_contacts(queryset, query):
+    """
+    Filter the contacts to those matching every term of the query and
+    order them by relevance: trigram similarity of the query to the full
+    name or the patient CI where pg_trgm is installed, name prefix matches
+    first elsewhere, such as SQLite in local setups.
+    """
+    for term in query.split():
+        queryset = queryset.filter(id__in=matching_contact_ids(term))
+
+    full_name = Concat('name', Value(' '), Coalesce('lastname', Value('')))
+    if trigram_enabled(queryset.db):
+        rank = Greatest(
+            TrigramWordSimilarity(query, full_name),
+            Coalesce(TrigramSimilarity('patient__ci', query), Value(0.0)),
+        )
+    else:
+        first_term = query.split()[0]
+        queryset = queryset.annotate(full_name=full_name)
+        rank = Case(
+            When(full_name__istartswith=query, then=Value(1.0)),
+            When(lastname__istartswith=first_term, then=Value(0.5)),
+            When(patient__ci__startswith=first_term, then=Value(0.5)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    return queryset.annotate(rank=rank).order_by('-rank', 'id')
@@ -0,0 +1,45 @@
+"""
+Serializer mixins shared by the API apps.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+class DynamicFieldsMixin:
+    """
+    Render only the fields named in the `fields` query param of a read,
+    such as `?fields=id,name`, or in the `fields` argument. The querysets
+    built for the serializer then select only the columns and joins of
+    those fields. Nested serializers always render in full. Unknown field
+    names are rejected with a 400.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            request = self._context.get('request')
+            if request is not None and request.method in SAFE_METHODS:
+                fields = request.query_params.get('fields')
+                fields = fields.split(',') if fields else None
+        self.requested_fields = [
+            name.strip() for name in fields if name.strip()
+        ] if fields else None
+        if self.requested_fields:
+            # Build the fields now so unknown names fail even on no rows.
+            self.fields
+
+    def get_fields(self):
+        """Return the declared fields, trimmed to the requested ones."""
+        fields = super().get_fields()
+        if not self.requested_fields:
+            return fields
+
+        unknown = [name for name in self.requested_fields
+                   if name not in fields]
+        if unknown:
+            raise ValidationError(
+                {'fields': [f'Unknown fields: {", ".join(unknown)}.']}
+            )
+
+        return {name: field for name, field in fields.items()
+                if name in self.requested_fields}
@@ -0,0 +1,101 @@
+"""
+Signal receivers of the core models.
+"""
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.utils import timezone
+
+from core import stats
+from core.cache import bump_version
+from core.models import (
+    Church,
+    Denomination,
+    Disease,
+    MedClass,
+    MedicinePresentation,
+    Municipality,
+    Patient,
+    Tombstone,
+    Treatment,
+    WorkingSite,
+)
+from core.sync import SYNC_MODELS
+
+
+# Lookup tables whose list responses are cached by version.
+REFERENCE_MODELS = [
+    Denomination,
+    Disease,
+    MedClass,
+    MedicinePresentation,
+    Municipality,
+    WorkingSite,
+]
+
+
+def reference_data_changed(sender, **kwargs):
+    """
+    Invalidate the cached list responses of the changed model once the
+    change commits, so no request caches the rows it replaced meanwhile.
+    """
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+def synced_row_deleted(sender, instance, **kwargs):
+    """Record the deleted row for the delta sync."""
+    Tombstone.objects.create(model=sender._meta.model_name,
+                             object_id=instance.pk)
+
+
+def treatment_medicines_changed(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Touch the treatments whose medicines changed, so they sync again."""
+    if reverse and action == 'pre_clear':
+        pk_set = instance.treatment_set.values_list('pk', flat=True)
+    elif action not in ('post_add', 'post_remove') and \
+            not (action == 'post_clear' and not reverse):
+        return
+    treatment_ids = pk_set if reverse else [instance.pk]
+    Treatment.objects.filter(pk__in=treatment_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def connect_signals():
+    """Connect the receivers to the model signals."""
+    for model in REFERENCE_MODELS:
+        post_save.connect(reference_data_changed, sender=model,
+                          dispatch_uid=f'{model._meta.label}-saved')
+        post_delete.connect(reference_data_changed, sender=model,
+                            dispatch_uid=f'{model._meta.label}-deleted')
+    for model in SYNC_MODELS:
+        post_delete.connect(synced_row_deleted, sender=model,
+                            dispatch_uid=f'{model._meta.label}-tombstone')
+    m2m_changed.connect(treatment_medicines_changed,
+                        sender=Treatment.medicine.through,
+                        dispatch_uid='treatment-medicines-changed')
+    m2m_changed.connect(stats.treatment_medicines_changing,
+                        sender=Treatment.medicine.through,
+                        dispatch_uid='treatment-medicines-stats')
+
+    # Church statistics.
+    post_save.connect(stats.church_created, sender=Church,
+                      dispatch_uid='church-stats-created')
+    pre_save.connect(stats.patient_changing, sender=Patient,
+                     dispatch_uid='patient-stats-changing')
+    post_save.connect(stats.patient_saved, sender=Patient,
+                      dispatch_uid='patient-stats-saved')
+    post_delete.connect(stats.patient_deleted, sender=Patient,
+                        dispatch_uid='patient-stats-deleted')
+    pre_save.connect(stats.treatment_changing, sender=Treatment,
+                     dispatch_uid='treatment-stats-changing')
+    post_save.connect(stats.treatment_saved, sender=Treatment,
+                      dispatch_uid='treatment-stats-saved')
+    pre_delete.connect(stats.treatment_deleting, sender=Treatment,
+                       dispatch_uid='treatment-stats-deleting')
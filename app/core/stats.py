@@ -0,0 +1,211 @@
+"""
+Per church statistics kept up to date as patients and treatments change.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import (
+    Church,
+    ChurchDiseaseStats,
+    ChurchMedicineStats,
+    ChurchStats,
+    Patient,
+    Treatment,
+)
+
+
+def rebuild_church_stats(church_ids=None):
+    """
+    Recompute the statistics of the churches, all of them by default, from
+    the patients and treatments with one aggregate query per table.
+    """
+    churches = Church.objects.all()
+    patients = Patient.objects.all()
+    treatments = Treatment.objects.all()
+    links = Treatment.medicine.through.objects.all()
+    if church_ids is not None:
+        churches = churches.filter(id__in=church_ids)
+        patients = patients.filter(church__in=church_ids)
+        treatments = treatments.filter(patient__church__in=church_ids)
+        links = links.filter(treatment__patient__church__in=church_ids)
+
+    patient_counts = dict(
+        patients.values_list('church').annotate(count=Count('id'))
+        .order_by()
+    )
+    treatment_counts = dict(
+        treatments.values_list('patient__church').annotate(count=Count('id'))
+        .order_by()
+    )
+    disease_counts = treatments.values_list(
+        'patient__church', 'disease'
+    ).annotate(count=Count('id')).order_by()
+    medicine_counts = links.values_list(
+        'treatment__patient__church', 'medicine'
+    ).annotate(count=Count('id')).order_by()
+
+    with transaction.atomic():
+        ids = list(churches.values_list('id', flat=True))
+        for model in (ChurchStats, ChurchDiseaseStats, ChurchMedicineStats):
+            model.objects.filter(church__in=ids).delete()
+        ChurchStats.objects.bulk_create(
+            [
+                ChurchStats(church_id=church_id,
+                            patients=patient_counts.get(church_id, 0),
+                            treatments=treatment_counts.get(church_id, 0))
+                for church_id in ids
+            ],
+            batch_size=1000,
+        )
+        ChurchDiseaseStats.objects.bulk_create(
+            [
+                ChurchDiseaseStats(church_id=church_id, disease_id=disease_id,
+                                   treatments=count)
+                for church_id, disease_id, count in disease_counts
+            ],
+            batch_size=1000,
+        )
+        ChurchMedicineStats.objects.bulk_create(
+            [
+                ChurchMedicineStats(church_id=church_id,
+                                    medicine_id=medicine_id,
+                                    prescriptions=count)
+                for church_id, medicine_id, count in medicine_counts
+            ],
+            batch_size=1000,
+        )
+
+
+def add_patients(counts):
+    """Add patient counts by church id, for writes skipping the signals."""
+    for church_id, count in counts.items():
+        ChurchStats.objects.add({'church_id': church_id}, patients=count)
+
+
+def church_created(sender, instance, created, raw=False, **kwargs):
+    """Start the statistics of a new church at zero."""
+    if created and not raw:
+        ChurchStats.objects.add({'church_id': instance.id}, patients=0)
+
+
+def patient_changing(sender, instance, raw=False, **kwargs):
+    """Remember the church of a patient being updated."""
+    if not raw and not instance._state.adding:
+        instance._stats_church_id = next(iter(
+            Patient.objects.filter(pk=instance.pk)
+            .values_list('church_id', flat=True)[:1]
+        ), instance.church_id)
+
+
+def patient_saved(sender, instance, created, raw=False, **kwargs):
+    """Count a new patient, or recount the churches of a moved one."""
+    if raw:
+        return
+    if created:
+        add_patients({instance.church_id: 1})
+        return
+    previous = getattr(instance, '_stats_church_id', instance.church_id)
+    if previous != instance.church_id:
+        rebuild_church_stats([previous, instance.church_id])
+
+
+def patient_deleted(sender, instance, **kwargs):
+    """Uncount a deleted patient."""
+    add_patients({instance.church_id: -1})
+
+
+def treatment_changing(sender, instance, raw=False, **kwargs):
+    """Remember the church and disease of a treatment being updated."""
+    if not raw and not instance._state.adding:
+        instance._stats_previous = next(iter(
+            Treatment.objects.filter(pk=instance.pk)
+            .values_list('patient__church_id', 'disease_id')[:1]
+        ), None)
+
+
+def treatment_saved(sender, instance, created, raw=False, **kwargs):
+    """Count a new treatment or move the count of its changed disease."""
+    if raw:
+        return
+    church_id = instance.patient.church_id
+    if created:
+        ChurchStats.objects.add({'church_id': church_id}, treatments=1)
+        ChurchDiseaseStats.objects.add(
+            {'church_id': church_id, 'disease_id': instance.disease_id},
+            treatments=1
+        )
+        return
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is None:
+        return
+    previous_church_id, previous_disease_id = previous
+    if previous_church_id != church_id:
+        rebuild_church_stats([previous_church_id, church_id])
+    elif previous_disease_id != instance.disease_id:
+        ChurchDiseaseStats.objects.add(
+            {'church_id': church_id, 'disease_id': previous_disease_id},
+            treatments=-1
+        )
+        ChurchDiseaseStats.objects.add(
+            {'church_id': church_id, 'disease_id': instance.disease_id},
+            treatments=1
+        )
+
+
+def treatment_deleting(sender, instance, **kwargs):
+    """
+    Uncount a treatment about to be deleted, while its medicine links,
+    removed without signals, can still be read.
+    """
+    church_id = next(iter(
+        Patient.objects.filter(pk=instance.patient_id)
+        .values_list('church_id', flat=True)[:1]
+    ), None)
+    if church_id is None:
+        return
+    ChurchStats.objects.add({'church_id': church_id}, treatments=-1)
+    ChurchDiseaseStats.objects.add(
+        {'church_id': church_id, 'disease_id': instance.disease_id},
+        treatments=-1
+    )
+    ChurchMedicineStats.objects.add_many(
+        ['church_id', 'medicine_id'], 'prescriptions',
+        [(church_id, medicine_id, -1)
+         for medicine_id in instance.medicine.values_list('id', flat=True)]
+    )
+
+
+def treatment_medicines_changing(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """Count the medicines linked to or unlinked from treatments."""
+    Link = sender
+    if action == 'post_add':
+        links = [(instance.pk, pk) for pk in pk_set] if not reverse \
+            else [(pk, instance.pk) for pk in pk_set]
+        sign = 1
+    elif action in ('pre_remove', 'pre_clear'):
+        field = 'medicine_id' if reverse else 'treatment_id'
+        linked = Link.objects.filter(**{field: instance.pk})
+        if action == 'pre_remove':
+            other = 'treatment_id' if reverse else 'medicine_id'
+            linked = linked.filter(**{f'{other}__in': pk_set})
+        links = list(linked.values_list('treatment_id', 'medicine_id'))
+        sign = -1
+    else:
+        return
+
+    churches = dict(
+        Treatment.objects.filter(pk__in={link[0] for link in links})
+        .values_list('id', 'patient__church_id')
+    )
+    counts = Counter(
+        (churches[treatment_id], medicine_id)
+        for treatment_id, medicine_id in links
+    )
+    ChurchMedicineStats.objects.add_many(
+        ['church_id', 'medicine_id'], 'prescriptions',
+        [(church_id, medicine_id, sign * count)
+         for (church_id, medicine_id), count in counts.items()]
+    )
@@ -0,0 +1,197 @@
+"""
+Delta sync of the core models for offline clients.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    MedClass,
+    Medicine,
+    MedicinePresentation,
+    Municipality,
+    Note,
+    Patient,
+    PhoneNumber,
+    Tombstone,
+    Treatment,
+)
+
+
+# Models sent by the sync, parents before the rows referencing them.
+SYNC_MODELS = [
+    Note,
+    Municipality,
+    Denomination,
+    Contact,
+    PhoneNumber,
+    Church,
+    Patient,
+    MedClass,
+    MedicinePresentation,
+    Medicine,
+    Disease,
+    Treatment,
+]
+
+
+class InvalidCursor(ValueError):
+    """The sync cursor cannot be decoded."""
+
+
+def encode_cursor(position):
+    """Return the opaque cursor of a sync position."""
+    data = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor):
+    """Return the sync position of a cursor."""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values = [position['since'], position['until'], position['stage']]
+        if position['after'] is not None:
+            values += [position['after'][0], position['after'][1]]
+        for value in values:
+            if value is not None and not isinstance(value, int):
+                raise TypeError(value)
+    except (binascii.Error, ValueError, TypeError, KeyError, IndexError):
+        raise InvalidCursor(cursor)
+
+    return position
+
+
+def oldest_running_txid():
+    """
+    Return the id of the oldest transaction still running. Every earlier
+    transaction has committed or rolled back, so its rows are final.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def start_position(since=None):
+    """
+    Return the first position of a sync of the changes written from the
+    transaction `since`. Rows are stamped by a trigger with the transaction
+    that wrote them, and the sync covers the transactions before the
+    oldest one still running, so rows of transactions committing later
+    are picked up by the next sync however long they take.
+    """
+    until = oldest_running_txid()
+    if since is not None:
+        until = max(until, since)
+
+    return {
+        'since': since,
+        'until': until,
+        'stage': 0,
+        'after': None,
+    }
+
+
+def stages(position):
+    """
+    Return the name, queryset and transaction field of every step of the
+    sync. Deletions are only sent to clients holding earlier data.
+    """
+    steps = [(model._meta.model_name, model.objects.all(), 'sync_txid')
+             for model in SYNC_MODELS]
+    if position['since'] is not None:
+        steps.append(('tombstone', Tombstone.objects.all(), 'sync_txid'))
+
+    return steps
+
+
+def changed_rows(queryset, field, position, limit):
+    """
+    Return up to `limit` rows changed in the sync window after the
+    position, in (transaction, id) order to follow the index of the model.
+    """
+    queryset = queryset.filter(**{f'{field}__lt': position['until']})
+    if position['since'] is not None:
+        queryset = queryset.filter(**{f'{field}__gte': position['since']})
+    if position['after'] is not None:
+        txid, last_id = position['after']
+        queryset = queryset.filter(
+            Q(**{f'{field}__gt': txid}) |
+            Q(**{field: txid, 'id__gt': last_id})
+        )
+    model = queryset.model
+    fields = [model_field.attname
+              for model_field in model._meta.concrete_fields]
+
+    rows = list(queryset.order_by(field, 'id').values(*fields)[:limit])
+    add_related_ids(model, rows)
+    return rows
+
+
+def add_related_ids(model, rows):
+    """Add the ids of the many to many relations of the model to the rows."""
+    ids = [row['id'] for row in rows]
+    for field in model._meta.many_to_many:
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        related = {}
+        links = field.remote_field.through.objects.filter(
+            **{f'{source}__in': ids}
+        ).values_list(source, target)
+        for source_id, target_id in links:
+            related.setdefault(source_id, []).append(target_id)
+        for row in rows:
+            row[field.name] = sorted(related.get(row['id'], []))
+
+
+def sync_page(cursor=None, limit=None):
+    """
+    Return up to `limit` rows created, updated or deleted since the cursor,
+    grouped by model, with the cursor to continue from. Once `more` is
+    false the cursor marks the end of the sync and is kept by the client
+    to ask for the next changes.
+    """
+    limit = limit or settings.SYNC_PAGE_SIZE
+    position = decode_cursor(cursor) if cursor else {'since': None,
+                                                     'until': None}
+    if position['until'] is None:
+        position = start_position(position['since'])
+    steps = stages(position)
+    changes, deleted, remaining = {}, {}, limit
+
+    while position['stage'] < len(steps) and remaining:
+        name, queryset, field = steps[position['stage']]
+        rows = changed_rows(queryset, field, position, remaining)
+        if name == 'tombstone':
+            for row in rows:
+                deleted.setdefault(row['model'], []).append(row['object_id'])
+        elif rows:
+            changes[name] = rows
+        remaining -= len(rows)
+
+        if remaining:
+            position = {**position, 'stage': position['stage'] + 1,
+                        'after': None}
+        else:
+            position = {**position,
+                        'after': [rows[-1][field], rows[-1]['id']]}
+
+    more = position['stage'] < len(steps)
+    if not more:
+        # The window of the next sync is fixed when it starts.
+        position = {'since': position['until'], 'until': None,
+                    'stage': 0, 'after': None}
+
+    return {
+        'changes': changes,
+        'deleted': deleted,
+        'cursor': encode_cursor(position),
+        'more': more,
+    }
@@ -1,13 +1,38 @@
 """
 Tests custom Django management commands.
 """
-from unittest.mock import patch
+import json
+import os
+import tempfile
+import time
+
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import AsyncMock, patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.inventory import record_movement
+from core.models import (
+    Church,
+    ChurchStats,
+    Contact,
+    Denomination,
+    Disease,
+    ExpiringStock,
+    Medicine,
+    Patient,
+    PatientCodeSequence,
+    ProvincePatientsReport,
+    Treatment,
+)
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +57,341 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BackfillPatientCodesTests(TestCase):
+    """Test the patient code repair command."""
+
+    def setUp(self):
+        denomination = Denomination.objects.create(name="Metodista")
+        self.church = Church.objects.create(name="Iglesia",
+                                            denomination=denomination)
+
+    def create_patient(self, ci):
+        """Create and return a patient in the test church."""
+        return Patient.objects.create(
+            contact=Contact.objects.create(name=f'Contact {ci}'),
+            ci=ci,
+            church=self.church,
+        )
+
+    def test_backfill_repairs_codes_and_counter(self):
+        """Test malformed codes are renumbered after the highest code."""
+        self.create_patient('00000000001')
+        broken = self.create_patient('00000000002')
+        Patient.objects.filter(id=broken.id).update(code='broken')
+        PatientCodeSequence.objects.all().delete()
+
+        call_command('backfill_patient_codes', stdout=StringIO())
+
+        broken.refresh_from_db()
+        self.assertEqual(broken.code, f'{self.church.id}-2')
+        patient = self.create_patient('00000000003')
+        self.assertEqual(patient.code, f'{self.church.id}-3')
+
+    def test_backfill_keeps_counter_ahead(self):
+        """Test the counter never moves below a number handed out."""
+        self.create_patient('00000000001')
+        broken = self.create_patient('00000000002')
+        Patient.objects.filter(id=broken.id).update(code='broken')
+        PatientCodeSequence.objects.filter(church=self.church)\
+            .update(last_value=10)
+
+        call_command('backfill_patient_codes', stdout=StringIO())
+
+        broken.refresh_from_db()
+        self.assertEqual(broken.code, f'{self.church.id}-11')
+        self.assertEqual(
+            PatientCodeSequence.objects.get(church=self.church).last_value,
+            11
+        )
+
+    def test_backfill_dry_run(self):
+        """Test dry run leaves the codes untouched."""
+        patient = self.create_patient('00000000001')
+        Patient.objects.filter(id=patient.id).update(code='broken')
+
+        call_command('backfill_patient_codes', '--dry-run', stdout=StringIO())
+
+        patient.refresh_from_db()
+        self.assertEqual(patient.code, 'broken')
+
+
+class ConsumeUsersCommandTests(SimpleTestCase):
+    """Test the user sync consumer command."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.health_file = os.path.join(directory.name, 'health.json')
+
+    def write_status(self, **status):
+        """Write a consumer status to the health file."""
+        status = {'state': 'consuming', 'processed': 3, 'rejected': 0,
+                  'updated_at': time.time(), **status}
+        with open(self.health_file, 'w') as health:
+            json.dump(status, health)
+
+    @patch('core.management.commands.consume_users.secure_start_consuming',
+           new_callable=AsyncMock)
+    def test_consume_users_options(self, patched_consuming):
+        """Test the consumer runs with the command options."""
+        call_command('consume_users', '--workers', '2', '--prefetch', '20',
+                     '--health-file', self.health_file, stdout=StringIO())
+
+        kwargs = patched_consuming.await_args.kwargs
+        self.assertEqual(kwargs['workers'], 2)
+        self.assertEqual(kwargs['prefetch_count'], 20)
+        with open(self.health_file) as health:
+            self.assertIn('state', json.load(health))
+
+    def test_check_healthy_consumer(self):
+        """Test the health check passes for a fresh status."""
+        self.write_status()
+        out = StringIO()
+
+        call_command('consume_users', '--check',
+                     '--health-file', self.health_file, stdout=out)
+
+        self.assertIn('consuming', out.getvalue())
+
+    def test_check_stale_consumer(self):
+        """Test the health check fails for an old status."""
+        self.write_status(updated_at=time.time() - 3600)
+
+        with self.assertRaises(CommandError):
+            call_command('consume_users', '--check',
+                         '--health-file', self.health_file)
+
+    def test_check_missing_status(self):
+        """Test the health check fails without a status file."""
+        with self.assertRaises(CommandError):
+            call_command('consume_users', '--check',
+                         '--health-file', self.health_file)
+
+    def test_check_disconnected_consumer(self):
+        """Test the health check fails while the consumer backs off."""
+        self.write_status(state='backoff', failures=2,
+                          last_error="ConnectionError('refused')")
+
+        with self.assertRaisesMessage(CommandError, 'refused'):
+            call_command('consume_users', '--check',
+                         '--health-file', self.health_file)
+
+
+class BenchmarkApiCommandTests(TestCase):
+    """Test the API latency benchmark command."""
+
+    @patch('core.benchmark.close_old_connections')
+    def test_benchmark_reports_percentiles(self, _):
+        """Test the benchmark times the requests to the endpoint."""
+        get_user_model().objects.create_user(id=1, email='test@example.com')
+        out = StringIO()
+
+        call_command('benchmark_api', '--requests', '3', '--warmup', '1',
+                     '--json', stdout=out)
+
+        result = json.loads(out.getvalue())['current']
+        self.assertEqual(result['requests'], 3)
+        self.assertLessEqual(result['p50'], result['p99'])
+
+    def test_benchmark_without_users(self):
+        """Test the benchmark needs a user to authenticate as."""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', '--requests', '1')
+
+    @patch('core.management.commands.benchmark_api.subprocess.run')
+    def test_compare_connection_modes(self, patched_run):
+        """Test compare runs a process per connection mode."""
+        summary = {'requests': 1, 'p50': 1.0, 'p99': 2.0,
+                   'mean': 1.0, 'max': 2.0}
+        patched_run.return_value.returncode = 0
+        patched_run.return_value.stdout = json.dumps({'current': summary})
+        out = StringIO()
+
+        call_command('benchmark_api', '--compare', stdout=out)
+
+        modes = [call.kwargs['env']['DB_POOL']
+                 for call in patched_run.call_args_list]
+        self.assertEqual(modes, ['0', '0', '1'])
+        self.assertIn('pool', out.getvalue())
+
+
+class BenchmarkSuiteCommandTests(TestCase):
+    """Test the synthetic data generator and the benchmark runner."""
+
+    def test_seed_benchmark_data(self):
+        """Test the generator creates the requested volumes."""
+        call_command('seed_benchmark_data', '--municipalities-per-province',
+                     '1', '--churches-per-municipality', '2',
+                     '--patients-per-church', '3', '--medicines', '5',
+                     '--donors', '2', '--medics', '2', stdout=StringIO())
+
+        churches = Church.objects.count()
+        self.assertEqual(Patient.objects.count(), churches * 3)
+        self.assertEqual(Treatment.objects.count(), churches * 3 * 2)
+        patient = Patient.objects.order_by('id').last()
+        self.assertEqual(patient.code, f'{patient.church_id}-3')
+        new = Patient.objects.create(
+            contact=Contact.objects.create(name='New'),
+            ci='99999999999',
+            church=patient.church,
+        )
+        self.assertEqual(new.code, f'{patient.church_id}-4')
+
+    def test_seed_benchmark_data_twice(self):
+        """Test a second run adds to the data of the first one."""
+        args = ('seed_benchmark_data', '--municipalities-per-province', '1',
+                '--churches-per-municipality', '1', '--patients-per-church',
+                '1', '--medicines', '5', '--donors', '2', '--medics', '2')
+        call_command(*args, stdout=StringIO())
+        churches = Church.objects.count()
+        # Deleted contacts do not bring back the values of the first run.
+        Contact.objects.order_by('id')[0].delete()
+
+        call_command(*args, stdout=StringIO())
+
+        self.assertEqual(Church.objects.count(), churches * 2)
+
+    def test_run_benchmarks_report(self):
+        """Test the runner reports every action of the endpoints."""
+        get_user_model().objects.create_user(id=1, email='test@example.com')
+        call_command('seed_benchmark_data', '--municipalities-per-province',
+                     '1', '--churches-per-municipality', '1',
+                     '--patients-per-church', '1', stdout=StringIO())
+        patients = Patient.objects.count()
+        out = StringIO()
+
+        call_command('run_benchmarks', '--requests', '2', '--warmup', '0',
+                     '--only', 'patient', 'church', stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['endpoints']),
+                         {'contact:patient', 'church:church'})
+        self.assertEqual(set(report['endpoints']['contact:patient']),
+                         {'list', 'retrieve', 'create', 'update'})
+        self.assertEqual(Patient.objects.count(), patients)
+
+
+class ExportPatientsCommandTests(TestCase):
+    """Test the patient export command."""
+
+    def setUp(self):
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(name='Iglesia',
+                                            denomination=denomination)
+        for index in range(3):
+            patient = Patient.objects.create(
+                contact=Contact.objects.create(name=f'Patient {index}'),
+                ci=f'{index:011d}',
+                church=self.church,
+            )
+            Treatment.objects.create(
+                patient=patient,
+                disease=Disease.objects.create(name=f'Disease {index}'),
+            )
+
+    def test_export_to_stdout(self):
+        """Test the patients are written as NDJSON in small chunks."""
+        out = StringIO()
+
+        call_command('export_patients', '--output-format', 'ndjson',
+                     '--chunk-size', '2', stdout=out)
+
+        documents = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([document['name'] for document in documents],
+                         ['Patient 0', 'Patient 1', 'Patient 2'])
+        self.assertEqual(documents[2]['treatments'][0]['disease'],
+                         'Disease 2')
+
+    def test_export_to_file(self):
+        """Test the CSV export is written to the output file."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'patients.csv')
+
+        call_command('export_patients', '--output', path,
+                     '--church', str(self.church.id), stderr=StringIO())
+
+        with open(path, encoding='utf-8') as export:
+            lines = export.read().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[0].startswith('id,code,ci'))
+
+
+class RebuildChurchStatsCommandTests(TestCase):
+    """Test the church statistics rebuild command."""
+
+    def test_rebuild_church_stats(self):
+        """Test the statistics are recounted from the patients."""
+        church = Church.objects.create(
+            name='Iglesia',
+            denomination=Denomination.objects.create(name='Metodista'),
+        )
+        Patient.objects.create(contact=Contact.objects.create(name='Ana'),
+                               ci='00000000001', church=church)
+        ChurchStats.objects.filter(church=church).update(patients=5)
+
+        call_command('rebuild_church_stats', '--church', str(church.id),
+                     stdout=StringIO())
+
+        self.assertEqual(ChurchStats.objects.get(church=church).patients, 1)
+
+
+class RefreshReportsCommandTests(TestCase):
+    """Test the report refresh command."""
+
+    def test_refresh_reports(self):
+        """Test the report views are recomputed."""
+        Church.objects.create(
+            name='Iglesia',
+            denomination=Denomination.objects.create(name='Metodista'),
+        )
+        out = StringIO()
+
+        call_command('refresh_reports', '--report', 'provinces', stdout=out)
+
+        self.assertIn('provinces', out.getvalue())
+        self.assertEqual(
+            ProvincePatientsReport.objects.get(province='UNK').churches, 1
+        )
+
+    @patch('core.management.commands.refresh_reports.time.sleep')
+    @patch('core.management.commands.refresh_reports.refresh_reports')
+    def test_refresh_reports_interval(self, patched_refresh, patched_sleep):
+        """Test the reports keep refreshing on an interval after errors."""
+        patched_refresh.side_effect = [OperationalError('down'),
+                                       ['provinces']]
+        patched_sleep.side_effect = [None, KeyboardInterrupt]
+        err = StringIO()
+
+        with self.assertRaises(KeyboardInterrupt):
+            call_command('refresh_reports', '--interval', '60',
+                         stdout=StringIO(), stderr=err)
+
+        self.assertEqual(patched_refresh.call_count, 2)
+        patched_sleep.assert_called_with(60)
+        self.assertIn('down', err.getvalue())
+
+
+class PrecomputeExpiringStockCommandTests(TestCase):
+    """Test the expiring stock command."""
+
+    def test_precompute_expiring_stock(self):
+        """Test the stock expiring within the days is precomputed."""
+        church = Church.objects.create(
+            name='Iglesia',
+            denomination=Denomination.objects.create(name='Metodista'),
+        )
+        medicine = Medicine.objects.create(
+            name='Salbutamol',
+            expiry_date=timezone.localdate() + timedelta(days=5),
+        )
+        record_movement(church=church, medicine=medicine, kind='receipt',
+                        quantity=3)
+        out = StringIO()
+
+        call_command('precompute_expiring_stock', '--days', '7', stdout=out)
+
+        self.assertIn('1 expiring', out.getvalue())
+        self.assertEqual(ExpiringStock.objects.get().quantity, 3)
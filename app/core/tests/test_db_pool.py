@@ -0,0 +1,70 @@
+"""
+Tests for the pooled PostgreSQL backend.
+"""
+from django.db import connection, connections
+from django.test import TestCase
+
+from core.backends.postgresql_pool.base import DatabaseWrapper
+
+
+class PooledDatabaseWrapperTests(TestCase):
+    """Test connections are reused from the pool."""
+
+    def setUp(self):
+        settings_dict = {**connection.settings_dict,
+                         'POOL': {'MIN_SIZE': 1, 'MAX_SIZE': 1}}
+        self.wrapper = DatabaseWrapper(settings_dict, alias='pool_test')
+        connections['pool_test'] = self.wrapper
+        self.addCleanup(connections.__delitem__, 'pool_test')
+        self.addCleanup(self.wrapper.close_pool)
+
+    def query(self):
+        """Run a query on the wrapper and return its connection."""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        return self.wrapper.connection
+
+    def test_connection_returned_to_pool(self):
+        """Test closing hands the connection back for the next request."""
+        first = self.query()
+        self.wrapper.close()
+
+        self.assertFalse(first.closed)
+        self.assertIs(self.query(), first)
+        self.wrapper.close()
+
+    def test_exhausted_pool_opens_connection(self):
+        """Test a plain connection is opened when the pool is empty."""
+        pooled = self.wrapper.pool.getconn()
+        self.addCleanup(self.wrapper.pool.putconn, pooled)
+
+        extra = self.query()
+        self.wrapper.close()
+
+        self.assertIsNot(extra, pooled)
+        self.assertTrue(extra.closed)
+
+    def test_dead_connection_replaced(self):
+        """Test a pooled connection the server dropped is not handed out."""
+        first = self.query()
+        pid = first.get_backend_pid()
+        self.wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s, 5000)', [pid])
+
+        second = self.query()
+        self.wrapper.close()
+
+        self.assertTrue(first.closed)
+        self.assertNotEqual(second.get_backend_pid(), pid)
+
+    def test_closed_connection_replaced(self):
+        """Test a closed connection left in the pool is not handed out."""
+        first = self.query()
+        self.wrapper.close()
+        first.close()
+
+        self.assertIsNot(self.query(), first)
+        self.wrapper.close()
@@ -0,0 +1,139 @@
+"""
+Tests for the sparse fieldsets of the API serializers.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    MedClass,
+    Medicine,
+    MedicinePresentation,
+    Municipality,
+    Note,
+    Patient,
+)
+from medicine.serializers import MedicineDetailSerializer
+
+
+CHURCH_URL = reverse('church:church-list')
+MEDICINE_URL = reverse('medicine:medicine-list')
+PATIENT_URL = reverse('contact:patient-list')
+
+
+class DynamicFieldsTests(TestCase):
+    """Test the `fields` param trims the output and the queries."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        self.church = Church.objects.create(
+            name='Iglesia',
+            denomination=Denomination.objects.create(name='Metodista'),
+            municipality=Municipality.objects.create(name='Playa',
+                                                     province='HAB'),
+            priest=Contact.objects.create(name='Priest'),
+            note=Note.objects.create(note='Note'),
+        )
+        self.medicine = Medicine.objects.create(
+            name='Salbutamol',
+            batch='B1',
+            classification=MedClass.objects.create(name='Broncodilatador'),
+            presentation=MedicinePresentation.objects.create(name='Spray'),
+        )
+
+    def get(self, url, **params):
+        """Return the response and the SQL of a GET request."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, [query['sql'] for query in queries]
+
+    def test_list_fields(self):
+        """Test a list renders and selects only the requested fields."""
+        res, queries = self.get(MEDICINE_URL, fields='id,name')
+
+        self.assertEqual(res.data['results'],
+                         [{'id': self.medicine.id, 'name': 'Salbutamol'}])
+        sql = next(query for query in queries
+                   if 'FROM "core_medicine"' in query)
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"batch"', sql)
+
+    def test_detail_fields(self):
+        """Test a detail with a nested field keeps only its join."""
+        url = reverse('church:church-detail', args=[self.church.id])
+
+        res, queries = self.get(url, fields='id,municipality')
+
+        self.assertEqual(set(res.data), {'id', 'municipality'})
+        self.assertEqual(res.data['municipality']['name'], 'Playa')
+        sql = next(query for query in queries
+                   if 'FROM "core_church"' in query and
+                   '"core_church"."name"' not in query)
+        self.assertIn('"core_municipality"', sql)
+        self.assertNotIn('"core_contact"', sql)
+        self.assertNotIn('"core_note"', sql)
+
+    def test_detail_etag_per_fieldset(self):
+        """Test each fieldset of a detail has its own ETag."""
+        url = reverse('church:church-detail', args=[self.church.id])
+
+        full = self.client.get(url)
+        sparse = self.client.get(url, {'fields': 'id,name'},
+                                 HTTP_IF_NONE_MATCH=full['ETag'])
+
+        self.assertEqual(sparse.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(sparse['ETag'], full['ETag'])
+
+    def test_method_fields(self):
+        """Test fields read by methods are rendered with every column."""
+        Patient.objects.create(contact=Contact.objects.create(name='Ana'),
+                               ci='00000000001', church=self.church)
+
+        res, _ = self.get(PATIENT_URL, fields='id,code,church')
+
+        self.assertEqual(set(res.data['results'][0]),
+                         {'id', 'code', 'church'})
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown field names are rejected."""
+        res = self.client.get(CHURCH_URL, {'fields': 'name,unknown'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['fields'], ['Unknown fields: unknown.'])
+
+    def test_unknown_fields_rejected_without_rows(self):
+        """Test unknown field names are rejected on an empty list."""
+        Church.objects.all().delete()
+
+        res = self.client.get(CHURCH_URL, {'fields': 'unknown'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_writes_keep_all_fields(self):
+        """Test the fields param does not trim the validated input."""
+        url = reverse('medicine:medicine-detail', args=[self.medicine.id])
+
+        res = self.client.patch(f'{url}?fields=id', {'batch': 'B2'},
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['batch'], 'B2')
+
+    def test_fields_argument(self):
+        """Test the fields are also trimmed by the serializer argument."""
+        data = MedicineDetailSerializer(self.medicine,
+                                        fields=['name', 'batch']).data
+
+        self.assertEqual(data, {'name': 'Salbutamol', 'batch': 'B1'})
@@ -0,0 +1,84 @@
+"""
+Tests for the query instrumentation middleware.
+"""
+import json
+import time
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from church.serializers import DenominationSerializer
+from core.models import Denomination
+
+
+DENOMINATION_URL = reverse('church:denomination-list')
+
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+    """Test the per request query metrics."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            id=999999,
+            email='test@example.com'
+        )
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Denomination.objects.create(name='Metodista')
+
+    @override_settings(DEBUG=True)
+    def test_metrics_headers_in_debug(self):
+        """Test the query count and timings are returned as headers."""
+        with self.assertNumQueries(1):
+            res = self.client.get(DENOMINATION_URL)
+
+        self.assertEqual(res['X-DB-Queries'], '1')
+        for header in ('X-DB-Time', 'X-Serialize-Time', 'X-Render-Time',
+                       'X-Total-Time'):
+            self.assertGreaterEqual(float(res[header]), 0)
+        self.assertNotIn('X-Query-Budget', res)
+
+    def test_metrics_logged_without_debug(self):
+        """Test the metrics are logged as JSON and not sent as headers."""
+        with self.assertLogs('core.metrics', level='INFO') as logs:
+            res = self.client.get(DENOMINATION_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'denomination-list')
+        self.assertEqual(record['queries'], 1)
+        self.assertEqual(record['status'], 200)
+        self.assertNotIn('X-DB-Queries', res)
+
+    def test_serialize_time_of_serializer(self):
+        """Test the serialize time covers any serializer of the view."""
+        to_representation = DenominationSerializer.to_representation
+
+        def slow_representation(serializer, instance):
+            time.sleep(0.01)
+            return to_representation(serializer, instance)
+
+        with mock.patch.object(DenominationSerializer, 'to_representation',
+                               slow_representation), \
+                self.assertLogs('core.metrics', level='INFO') as logs:
+            self.client.get(DENOMINATION_URL)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreaterEqual(record['serialize_ms'], 10)
+        self.assertLess(record['serialize_ms'], record['total_ms'])
+        self.assertIn('render_ms', record)
+
+    @override_settings(DEBUG=True, QUERY_BUDGETS={'denomination-list': 0})
+    def test_query_budget_exceeded(self):
+        """Test a view running more queries than its budget is flagged."""
+        with self.assertLogs('core.metrics', level='WARNING') as logs:
+            res = self.client.get(DENOMINATION_URL)
+
+        self.assertEqual(res['X-Query-Budget'], '0')
+        self.assertEqual(json.loads(logs.records[0].getMessage())['budget'],
+                         0)
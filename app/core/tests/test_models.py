@@ -150,3 +150,17 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(treatment), f'{str(patient)}, {disease.name}')
+
+    def test_allocate_patient_code_sequence(self):
+        """Test code numbers are reserved per church in ranges."""
+        denomination = models.Denomination.objects.create(name="Metodista")
+        church = models.Church.objects.create(name="Iglesia",
+                                              denomination=denomination)
+        other = models.Church.objects.create(name="Otra",
+                                             denomination=denomination)
+        sequences = models.PatientCodeSequence.objects
+
+        self.assertEqual(sequences.allocate(church.id), 1)
+        self.assertEqual(sequences.allocate(church.id, count=5), 6)
+        self.assertEqual(sequences.allocate(other.id), 1)
+        self.assertEqual(sequences.get(church=church).last_value, 6)
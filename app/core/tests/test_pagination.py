@@ -0,0 +1,63 @@
+"""
+Tests for the cursor pagination of the list endpoints.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Disease
+from core.pagination import IdCursorPagination
+
+
+DISEASE_URL = reverse('medicine:disease-list')
+
+
+class CursorPaginationTests(TestCase):
+    """Test list endpoints are paginated with a cursor over the id."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            id=999999,
+            email='test@example.com'
+        )
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            Disease.objects.create(name=f'Disease {i}')
+
+    def test_list_is_paginated(self):
+        """Test list response holds results and cursor links."""
+        res = self.client.get(DISEASE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('next', res.data)
+        self.assertIn('previous', res.data)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_walk_pages_with_cursor(self):
+        """Test following next links returns every row once, by id."""
+        ids = []
+        url = f'{DISEASE_URL}?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            ids += [row['id'] for row in res.data['results']]
+            url = res.data['next']
+
+        expected = list(
+            Disease.objects.order_by('id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    @patch.object(IdCursorPagination, 'max_page_size', 2)
+    def test_page_size_is_capped(self):
+        """Test requested page size cannot exceed the configured max."""
+        res = self.client.get(f'{DISEASE_URL}?page_size=100')
+
+        self.assertEqual(len(res.data['results']), 2)
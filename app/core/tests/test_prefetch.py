@@ -0,0 +1,45 @@
+"""
+Tests for the serializer driven queryset optimization.
+"""
+from django.test import SimpleTestCase
+
+from contact.serializers import (
+    PatientSerializer,
+    MedicSerializer,
+    DonorSerializer,
+)
+from core.models import Patient
+from core.prefetch import related_lookups, optimize_queryset
+
+
+class RelatedLookupsTests(SimpleTestCase):
+    """Test lookups are derived from the serializer declared fields."""
+
+    def test_patient_lookups(self):
+        """Test patient joins its contact and the contact note."""
+        select, prefetch = related_lookups(PatientSerializer())
+
+        self.assertEqual(select, ['contact', 'contact__note'])
+        self.assertEqual(prefetch, [])
+
+    def test_medic_lookups(self):
+        """Test medic joins contact and working site."""
+        select, prefetch = related_lookups(MedicSerializer())
+
+        self.assertIn('contact', select)
+        self.assertIn('contact__note', select)
+        self.assertIn('workingsite', select)
+
+    def test_primary_key_relations_are_not_joined(self):
+        """Test relations rendered as primary keys need no join."""
+        select, prefetch = related_lookups(DonorSerializer())
+
+        self.assertNotIn('contact__user', select)
+
+    def test_optimize_queryset(self):
+        """Test the queryset gets the select related lookups."""
+        queryset = optimize_queryset(Patient.objects.all(),
+                                     PatientSerializer())
+
+        self.assertEqual(queryset.query.select_related,
+                         {'contact': {'note': {}}})
@@ -0,0 +1,121 @@
+"""
+Query budget guardrail for every endpoint registered in the API routers.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APIClient
+
+from core.benchmark import router_endpoints
+from core.inventory import record_movement
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    Donor,
+    MedClass,
+    Medic,
+    Medicine,
+    MedicinePresentation,
+    Municipality,
+    Note,
+    Patient,
+    PhoneNumber,
+    Treatment,
+    WorkingSite,
+)
+
+
+def seed(start, count):
+    """Create `count` rows of every model, related to one another."""
+    for i in range(start, start + count):
+        note = Note.objects.create(note=f'Note {i}')
+        priest = Contact.objects.create(name=f'Priest {i}')
+        PhoneNumber.objects.create(contact=priest, number=f'+5350{i:06d}')
+        Medic.objects.create(
+            contact=priest,
+            workingsite=WorkingSite.objects.create(name=f'Hospital {i}'),
+        )
+        Donor.objects.create(contact=priest, country='CU', city='Habana')
+        church = Church.objects.create(
+            name=f'Church {i}',
+            denomination=Denomination.objects.create(name=f'Denomination {i}'),
+            municipality=Municipality.objects.create(name=f'Municipality {i}',
+                                                     province='HAB'),
+            priest=priest,
+            facilitator=Contact.objects.create(name=f'Facilitator {i}'),
+            note=note,
+        )
+        patient = Patient.objects.create(
+            contact=Contact.objects.create(name=f'Patient {i}'),
+            ci=f'{i:011d}',
+            church=church,
+        )
+        medicine = Medicine.objects.create(
+            name=f'Medicine {i}',
+            classification=MedClass.objects.create(name=f'Class {i}'),
+            presentation=MedicinePresentation.objects.create(
+                name=f'Presentation {i}'
+            ),
+        )
+        treatment = Treatment.objects.create(
+            patient=patient,
+            disease=Disease.objects.create(name=f'Disease {i}'),
+        )
+        treatment.medicine.add(medicine)
+        record_movement(church=church, medicine=medicine, kind='receipt',
+                        quantity=10)
+
+
+class RouterQueryBudgetTests(TestCase):
+    """
+    Hit the list and detail endpoint of every router with few and with many
+    rows and fail if the number of queries grows with the rows, catching
+    N+1 queries in the serializers.
+    """
+    few = 2
+    many = 8
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            id=999999,
+            email='test@example.com'
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def count_queries(self):
+        """Return the queries run by each endpoint, keyed by its URL."""
+        counts = {}
+        for namespace, prefix, viewset, _ in router_endpoints():
+            urls = [f'/{namespace}/{prefix}/']
+            if hasattr(viewset, 'retrieve'):
+                first = viewset.queryset.order_by('id').first()
+                urls.append(f'/{namespace}/{prefix}/{first.pk}/')
+            for url in urls:
+                with CaptureQueriesContext(connection) as queries:
+                    res = self.client.get(url)
+                self.assertEqual(res.status_code, 200, url)
+                counts[url] = len(queries)
+
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Test no endpoint runs more queries when there are more rows."""
+        with self.captureOnCommitCallbacks(execute=True):
+            seed(0, self.few)
+        few_counts = self.count_queries()
+        with self.captureOnCommitCallbacks(execute=True):
+            seed(self.few, self.many - self.few)
+        many_counts = self.count_queries()
+
+        for url, count in few_counts.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    many_counts[url], count,
+                    f'{url} ran {count} queries for {self.few} rows and '
+                    f'{many_counts[url]} for {self.many}.'
+                )
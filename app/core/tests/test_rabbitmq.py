@@ -0,0 +1,406 @@
+"""
+Tests for the RabbitMQ user sync consumer.
+"""
+import asyncio
+import json
+
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core import rabbitmq
+
+
+class FakeMessage:
+    """Minimal stand in for an aio_pika incoming message."""
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload).encode()
+        self.acked = False
+        self.rejected = False
+
+    async def ack(self):
+        self.acked = True
+
+    async def reject(self, requeue=False):
+        self.rejected = True
+
+
+def consume(consumer, messages):
+    """Feed messages to the consumer and process the batches they form."""
+    async def run():
+        for message in messages:
+            await consumer.on_message(message)
+        batches = []
+        while not consumer.buffer.empty():
+            batch = await consumer.next_batch()
+            batches.append(len(batch))
+            await consumer.process(batch)
+        return batches
+
+    return asyncio.run(run())
+
+
+class BatchConsumerTests(SimpleTestCase):
+    """Test the micro batching of queue messages."""
+
+    def test_messages_grouped_in_batches(self):
+        """Test messages are handled in batches and acked after commit."""
+        handled = []
+        consumer = rabbitmq.BatchConsumer(
+            'user_created', handled.append, None, None,
+            batch_size=3, batch_timeout=0.01, workers=1
+        )
+        messages = [FakeMessage({'id': i}) for i in range(7)]
+
+        batches = consume(consumer, messages)
+
+        self.assertEqual(batches, [3, 3, 1])
+        self.assertEqual([len(batch) for batch in handled], [3, 3, 1])
+        self.assertTrue(all(message.acked for message in messages))
+
+    def test_failed_batch_processed_one_by_one(self):
+        """Test only the failing message of a failed batch is rejected."""
+        handled = []
+
+        def handle_batch(payloads):
+            raise ValueError('Batch failed')
+
+        def handle_one(payload):
+            if payload['id'] == 1:
+                raise ValueError('Message failed')
+            handled.append(payload['id'])
+
+        consumer = rabbitmq.BatchConsumer(
+            'user_created', handle_batch, handle_one, None,
+            batch_size=3, batch_timeout=0.01, workers=1
+        )
+        messages = [FakeMessage({'id': i}) for i in range(3)]
+
+        with self.assertLogs(level='ERROR'):
+            consume(consumer, messages)
+
+        self.assertEqual(handled, [0, 2])
+        self.assertTrue(messages[0].acked)
+        self.assertTrue(messages[1].rejected)
+        self.assertTrue(messages[2].acked)
+
+    def test_invalid_json_rejected(self):
+        """Test a message that is not JSON is rejected on its own."""
+        handled = []
+        consumer = rabbitmq.BatchConsumer(
+            'user_created', handled.append, None, None,
+            batch_size=3, batch_timeout=0.01, workers=1
+        )
+        invalid = FakeMessage({})
+        invalid.body = b'not json'
+        valid = FakeMessage({'id': 1})
+
+        with self.assertLogs(level='ERROR'):
+            consume(consumer, [invalid, valid])
+
+        self.assertTrue(invalid.rejected)
+        self.assertTrue(valid.acked)
+        self.assertEqual(handled, [[{'id': 1}]])
+
+
+class FakeQueue:
+    """Queue recording its consumer callback."""
+
+    def __init__(self):
+        self.callback = None
+        self.cancelled = False
+
+    async def consume(self, callback):
+        self.callback = callback
+        return 'tag'
+
+    async def cancel(self, tag):
+        self.cancelled = True
+
+
+class FakeChannel:
+    """Channel declaring fake queues."""
+
+    def __init__(self):
+        self.queues = {}
+        self.prefetch_count = None
+
+    async def set_qos(self, prefetch_count):
+        self.prefetch_count = prefetch_count
+
+    async def declare_queue(self, name, durable):
+        return self.queues.setdefault(name, FakeQueue())
+
+
+class FakeConnection:
+    """Connection handing out a single fake channel."""
+
+    def __init__(self):
+        self.fake_channel = FakeChannel()
+        self.close_callbacks = set()
+        self.reconnect_callbacks = set()
+
+    async def channel(self):
+        return self.fake_channel
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class StartConsumingTests(SimpleTestCase):
+    """Test the consumer lifecycle."""
+
+    @patch('core.rabbitmq.update_users', MagicMock())
+    @patch('core.rabbitmq.create_users')
+    @patch('core.rabbitmq.aio_pika.connect_robust')
+    def test_stop_drains_buffered_messages(self, patched_connect,
+                                           patched_create):
+        """Test stopping acks the messages already delivered."""
+        connection = FakeConnection()
+        patched_connect.return_value = connection
+        messages = [FakeMessage({'id': i}) for i in range(3)]
+        status = rabbitmq.ConsumerStatus()
+
+        async def run():
+            stop = asyncio.Event()
+            consuming = asyncio.create_task(rabbitmq.start_consuming(
+                stop=stop, status=status, prefetch_count=10, workers=1,
+                batch_size=10, batch_timeout=10
+            ))
+            while 'user_modified' not in connection.fake_channel.queues:
+                await asyncio.sleep(0)
+            queue = connection.fake_channel.queues['user_created']
+            for message in messages:
+                await queue.callback(message)
+            stop.set()
+            await consuming
+            return queue
+
+        queue = asyncio.run(run())
+
+        self.assertTrue(queue.cancelled)
+        self.assertEqual(connection.fake_channel.prefetch_count, 10)
+        self.assertTrue(all(message.acked for message in messages))
+        self.assertEqual(
+            sum(len(call.args[0]) for call in patched_create.call_args_list),
+            3
+        )
+        self.assertEqual(status.state, 'stopped')
+        self.assertEqual(status.processed, 3)
+
+
+class SecureStartConsumingTests(SimpleTestCase):
+    """Test the consumer reconnect loop."""
+
+    @patch('core.rabbitmq.start_consuming')
+    def test_first_attempt_is_immediate(self, patched_start):
+        """Test the consumer starts without waiting when RabbitMQ is up."""
+        async def start(stop, status, **options):
+            status.connected()
+            stop.set()
+
+        patched_start.side_effect = start
+        status = rabbitmq.ConsumerStatus()
+
+        with patch('core.rabbitmq.backoff_delay') as patched_delay:
+            asyncio.run(rabbitmq.secure_start_consuming(status=status))
+
+        patched_delay.assert_not_called()
+        self.assertEqual(status.attempts, 1)
+        self.assertEqual(status.state, 'stopped')
+
+    @patch('core.rabbitmq.backoff_delay', return_value=0)
+    @patch('core.rabbitmq.start_consuming')
+    def test_retries_until_connected(self, patched_start, patched_delay):
+        """Test failed attempts are retried with a growing backoff."""
+        async def start(stop, status, **options):
+            if patched_start.await_count < 4:
+                raise ConnectionError('refused')
+            status.connected()
+            stop.set()
+
+        patched_start.side_effect = start
+        status = rabbitmq.ConsumerStatus()
+
+        with self.assertLogs(level='ERROR'):
+            asyncio.run(rabbitmq.secure_start_consuming(status=status,
+                                                        max_attempts=0))
+
+        self.assertEqual(
+            [call.args[0] for call in patched_delay.call_args_list],
+            [1, 2, 3]
+        )
+        self.assertEqual(status.attempts, 4)
+        self.assertEqual(status.failures, 0)
+        self.assertIn('refused', status.last_error)
+
+    @patch('core.rabbitmq.backoff_delay', return_value=0)
+    @patch('core.rabbitmq.start_consuming',
+           side_effect=ConnectionError('refused'))
+    def test_gives_up_after_max_attempts(self, patched_start, _):
+        """Test the loop ends after the consecutive attempts allowed."""
+        status = rabbitmq.ConsumerStatus()
+
+        with self.assertLogs(level='CRITICAL'):
+            asyncio.run(rabbitmq.secure_start_consuming(status=status,
+                                                        max_attempts=3))
+
+        self.assertEqual(patched_start.await_count, 3)
+        self.assertEqual(status.state, 'failed')
+
+    @patch('core.rabbitmq.backoff_delay', return_value=3600)
+    @patch('core.rabbitmq.start_consuming',
+           side_effect=ConnectionError('refused'))
+    def test_stop_interrupts_backoff(self, patched_start, _):
+        """Test a stop during the backoff ends the loop right away."""
+        status = rabbitmq.ConsumerStatus()
+
+        async def run():
+            stop = asyncio.Event()
+            consuming = asyncio.create_task(
+                rabbitmq.secure_start_consuming(stop=stop, status=status)
+            )
+            while status.state != 'backoff':
+                await asyncio.sleep(0)
+            stop.set()
+            await asyncio.wait_for(consuming, 1)
+
+        with self.assertLogs(level='ERROR'):
+            asyncio.run(run())
+
+        self.assertEqual(status.state, 'stopped')
+        self.assertIsNotNone(status.next_attempt_at)
+
+    def test_backoff_delay(self):
+        """Test the delay doubles, is capped and keeps its jitter bounds."""
+        for failures, expected in [(1, 1), (2, 2), (4, 8), (10, 60)]:
+            delay = rabbitmq.backoff_delay(failures, base=1, maximum=60)
+            self.assertGreaterEqual(delay, expected / 2)
+            self.assertLessEqual(delay, expected)
+
+
+class SyncUsersTests(TestCase):
+    """Test the idempotent user sync handlers."""
+
+    def test_create_users(self):
+        """Test a batch of users is created with one insert per shape."""
+        with self.assertNumQueries(4):
+            rabbitmq.create_users([
+                {'id': 1, 'email': 'one@example.com'},
+                {'id': 2, 'email': 'two@example.com',
+                 'is_superuser': True, 'password': 'hashed'},
+                {'id': 3, 'email': 'three@example.com'},
+            ])
+
+        users = get_user_model().objects.in_bulk()
+        self.assertEqual(users[1].email, 'one@example.com')
+        self.assertFalse(users[1].is_superuser)
+        self.assertTrue(users[2].is_superuser)
+        self.assertEqual(users[2].password, 'hashed')
+        self.assertEqual(users[3].email, 'three@example.com')
+
+    def test_update_users(self):
+        """Test a batch of users is updated."""
+        get_user_model().objects.create_user(id=1, email='one@example.com')
+        get_user_model().objects.create_user(id=2, email='two@example.com')
+
+        rabbitmq.update_users([
+            {'id': 1, 'email': 'new@example.com'},
+            {'id': 2, 'password': 'hashed'},
+        ])
+
+        users = get_user_model().objects.in_bulk()
+        self.assertEqual(users[1].email, 'new@example.com')
+        self.assertEqual(users[2].email, 'two@example.com')
+        self.assertEqual(users[2].password, 'hashed')
+
+    def test_redelivered_create_is_absorbed(self):
+        """Test creating an existing user does not raise."""
+        user_info = {'id': 1, 'email': 'one@example.com', 'version': 1}
+
+        rabbitmq.create_user(dict(user_info))
+        rabbitmq.create_user(dict(user_info))
+
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_modify_before_create(self):
+        """
+        Test a late create does not undo an earlier applied modify, but
+        sets the fields the modify left unset.
+        """
+        rabbitmq.update_user(
+            {'id': 1, 'email': 'new@example.com', 'version': 2}
+        )
+        rabbitmq.create_user(
+            {'id': 1, 'email': 'old@example.com', 'is_superuser': True,
+             'password': 'hashed', 'version': 1}
+        )
+
+        user = get_user_model().objects.get(id=1)
+        self.assertEqual(user.email, 'new@example.com')
+        self.assertEqual(user.event_version, 2)
+        # Fields only the create carries still apply.
+        self.assertTrue(user.is_superuser)
+        self.assertTrue(user.is_staff)
+        self.assertEqual(user.password, 'hashed')
+
+    def test_late_create_keeps_newer_password(self):
+        """Test a late create does not undo a newer password change."""
+        rabbitmq.update_user(
+            {'id': 1, 'email': 'new@example.com', 'password': 'changed',
+             'version': 2}
+        )
+        rabbitmq.create_user(
+            {'id': 1, 'email': 'old@example.com', 'is_superuser': True,
+             'password': 'hashed', 'version': 1}
+        )
+
+        user = get_user_model().objects.get(id=1)
+        self.assertEqual(user.password, 'changed')
+        self.assertTrue(user.is_superuser)
+
+    def test_batch_merges_events_in_version_order(self):
+        """Test events of a user in one batch apply in version order."""
+        rabbitmq.update_users([
+            {'id': 1, 'email': 'last@example.com', 'version': 3},
+            {'id': 1, 'email': 'first@example.com', 'version': 2},
+        ])
+
+        user = get_user_model().objects.get(id=1)
+        self.assertEqual(user.email, 'last@example.com')
+
+    def test_modify_unknown_user_without_email(self):
+        """Test a modify without email is kept until the user is created."""
+        rabbitmq.update_user({'id': 1, 'password': 'changed', 'version': 2})
+
+        user = get_user_model().objects.get(id=1)
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.password, 'changed')
+
+        rabbitmq.create_user(
+            {'id': 1, 'email': 'one@example.com', 'is_superuser': True,
+             'password': 'hashed', 'version': 1}
+        )
+
+        user.refresh_from_db()
+        self.assertTrue(user.is_active)
+        self.assertEqual(user.email, 'one@example.com')
+        self.assertEqual(user.password, 'changed')
+        self.assertTrue(user.is_superuser)
+        self.assertEqual(user.event_version, 2)
+
+    def test_event_version(self):
+        """Test versions come from the version or the timestamp."""
+        self.assertEqual(rabbitmq.event_version({'version': 7}), 7)
+        self.assertEqual(
+            rabbitmq.event_version({'timestamp': '1970-01-01T00:00:01Z'}),
+            1_000_000
+        )
+        self.assertEqual(rabbitmq.event_version({'timestamp': 2.5}),
+                         2_500_000)
+        self.assertEqual(rabbitmq.event_version({}), 0)
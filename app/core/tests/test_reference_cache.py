@@ -0,0 +1,143 @@
+"""
+Tests for the cached reference data list endpoints.
+"""
+import time
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import get_version
+from core.checks import check_reference_cache
+from core.models import MedClass
+
+
+MEDCLASS_URL = reverse('medicine:medclass-list')
+
+
+def detail_url(medclass_id):
+    """Create and return a medicine classification detail URL."""
+    return reverse('medicine:medclass-detail', args=[medclass_id])
+
+
+class CachedListTests(TestCase):
+    """Test the reference data lists are cached and revalidated."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medclass = MedClass.objects.create(name='Analgésico')
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list does not query the database."""
+        first = self.client.get(MEDCLASS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(MEDCLASS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, first.data)
+        self.assertEqual(res['ETag'], first['ETag'])
+
+    def test_query_params_cached_apart(self):
+        """Test lists with other query params are cached separately."""
+        MedClass.objects.create(name='Antibiótico')
+        self.client.get(MEDCLASS_URL)
+
+        res = self.client.get(MEDCLASS_URL, {'page_size': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_changes_invalidate_cache(self):
+        """Test creating, updating and deleting renew the cached list."""
+        etag = self.client.get(MEDCLASS_URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(MEDCLASS_URL, {'name': 'Vitamina'})
+        res = self.client.get(MEDCLASS_URL)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertNotEqual(res['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url(self.medclass.id),
+                              {'name': 'Nuevo'})
+        res = self.client.get(MEDCLASS_URL)
+        self.assertIn('Nuevo', [item['name'] for item in res.data['results']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(detail_url(self.medclass.id))
+        res = self.client.get(MEDCLASS_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_if_none_match_not_modified(self):
+        """Test a current ETag gets a 304 without querying the database."""
+        etag = self.client.get(MEDCLASS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(MEDCLASS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MedClass.objects.create(name='Vitamina')
+        res = self.client.get(MEDCLASS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_cache_renewed_on_commit(self):
+        """Test the cached list is only renewed once the change commits."""
+        version = get_version(MedClass)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            MedClass.objects.create(name='Vitamina')
+        self.assertEqual(get_version(MedClass), version)
+
+        callbacks[0]()
+        self.assertNotEqual(get_version(MedClass), version)
+
+    def test_local_version_expires(self):
+        """Test a version in process memory expires with the responses."""
+        version = get_version(MedClass)
+        later = time.time() + 61
+
+        with mock.patch('django.core.cache.backends.locmem.time.time',
+                        return_value=later):
+            self.assertNotEqual(get_version(MedClass), version)
+
+    def test_local_cache_check(self):
+        """Test a cache in process memory is reported outside debug."""
+        self.assertEqual([warning.id for warning in
+                          check_reference_cache(None)], ['core.W001'])
+
+        with override_settings(DEBUG=True):
+            self.assertEqual(check_reference_cache(None), [])
+
+    def test_if_modified_since_not_modified(self):
+        """Test a date after the last change gets a 304."""
+        modified = self.client.get(MEDCLASS_URL)['Last-Modified']
+
+        res = self.client.get(MEDCLASS_URL, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(MEDCLASS_URL,
+                              HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_anonymous_list_not_served(self):
+        """Test the cached list still requires authentication."""
+        self.client.get(MEDCLASS_URL)
+
+        res = APIClient().get(MEDCLASS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
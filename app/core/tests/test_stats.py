@@ -0,0 +1,144 @@
+"""
+Tests for the church statistics kept up to date by the signals.
+"""
+from django.test import TestCase
+
+from core.models import (
+    Church,
+    ChurchDiseaseStats,
+    ChurchMedicineStats,
+    ChurchStats,
+    Contact,
+    Denomination,
+    Disease,
+    Medicine,
+    Patient,
+    Treatment,
+)
+from core.stats import rebuild_church_stats
+
+
+def snapshot():
+    """Return every statistic row as comparable tuples."""
+    return (
+        sorted(ChurchStats.objects.values_list(
+            'church', 'patients', 'treatments')),
+        sorted(ChurchDiseaseStats.objects.filter(treatments__gt=0)
+               .values_list('church', 'disease', 'treatments')),
+        sorted(ChurchMedicineStats.objects.filter(prescriptions__gt=0)
+               .values_list('church', 'medicine', 'prescriptions')),
+    )
+
+
+class ChurchStatsTests(TestCase):
+    """Test the incremental maintenance of the church statistics."""
+
+    def setUp(self):
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(name='Iglesia',
+                                            denomination=denomination)
+        self.other = Church.objects.create(name='Otra',
+                                           denomination=denomination)
+        self.asma = Disease.objects.create(name='Asma')
+        self.gripe = Disease.objects.create(name='Gripe')
+        self.salbutamol = Medicine.objects.create(name='Salbutamol')
+        self.dipirona = Medicine.objects.create(name='Dipirona')
+
+    def create_patient(self, ci, church=None):
+        """Create and return a patient of the church."""
+        return Patient.objects.create(
+            contact=Contact.objects.create(name=f'Patient {ci}'),
+            ci=ci, church=church or self.church,
+        )
+
+    def stats(self, church=None):
+        """Return the patient and treatment counts of the church."""
+        return ChurchStats.objects.values_list(
+            'patients', 'treatments'
+        ).get(church=church or self.church)
+
+    def test_new_church_stats(self):
+        """Test a new church starts with empty statistics."""
+        self.assertEqual(self.stats(), (0, 0))
+
+    def test_patients_counted(self):
+        """Test creating and deleting patients updates the count."""
+        first = self.create_patient('00000000001')
+        self.create_patient('00000000002')
+        self.assertEqual(self.stats(), (2, 0))
+
+        first.delete()
+
+        self.assertEqual(self.stats(), (1, 0))
+
+    def test_treatments_counted(self):
+        """Test treatments, diseases and medicines are counted."""
+        patient = self.create_patient('00000000001')
+        treatment = Treatment.objects.create(patient=patient,
+                                             disease=self.asma)
+        treatment.medicine.add(self.salbutamol, self.dipirona)
+        Treatment.objects.create(patient=patient, disease=self.asma)
+
+        self.assertEqual(self.stats(), (1, 2))
+        self.assertEqual(ChurchDiseaseStats.objects.get(
+            church=self.church, disease=self.asma).treatments, 2)
+        self.assertEqual(ChurchMedicineStats.objects.get(
+            church=self.church, medicine=self.dipirona).prescriptions, 1)
+
+        treatment.medicine.remove(self.dipirona)
+        self.salbutamol.treatment_set.clear()
+        treatment.disease = self.gripe
+        treatment.save()
+
+        self.assertEqual(ChurchDiseaseStats.objects.get(
+            church=self.church, disease=self.asma).treatments, 1)
+        self.assertEqual(ChurchDiseaseStats.objects.get(
+            church=self.church, disease=self.gripe).treatments, 1)
+        self.assertFalse(ChurchMedicineStats.objects.filter(
+            prescriptions__gt=0).exists())
+
+    def test_deleted_patient_uncounts_treatments(self):
+        """Test deleting a patient uncounts its treatments and medicines."""
+        patient = self.create_patient('00000000001')
+        treatment = Treatment.objects.create(patient=patient,
+                                             disease=self.asma)
+        treatment.medicine.add(self.salbutamol)
+
+        patient.contact.delete()
+
+        self.assertEqual(self.stats(), (0, 0))
+        self.assertFalse(ChurchDiseaseStats.objects.filter(
+            treatments__gt=0).exists())
+        self.assertFalse(ChurchMedicineStats.objects.filter(
+            prescriptions__gt=0).exists())
+
+    def test_moved_patient_recounted(self):
+        """Test moving a patient moves its counts to the new church."""
+        patient = self.create_patient('00000000001')
+        treatment = Treatment.objects.create(patient=patient,
+                                             disease=self.asma)
+        treatment.medicine.add(self.salbutamol)
+
+        patient.church = self.other
+        patient.save()
+
+        self.assertEqual(self.stats(), (0, 0))
+        self.assertEqual(self.stats(self.other), (1, 1))
+        self.assertEqual(ChurchMedicineStats.objects.get(
+            medicine=self.salbutamol, prescriptions__gt=0).church,
+            self.other)
+
+    def test_rebuild_matches_incremental(self):
+        """Test a rebuild gives the counts kept by the signals."""
+        for index, church in enumerate([self.church, self.other,
+                                        self.church]):
+            patient = self.create_patient(f'0000000000{index}', church)
+            treatment = Treatment.objects.create(patient=patient,
+                                                 disease=self.asma)
+            treatment.medicine.add(self.salbutamol)
+        Treatment.objects.create(patient=patient, disease=self.gripe)
+        incremental = snapshot()
+
+        rebuild_church_stats()
+
+        self.assertEqual(snapshot(), incremental)
@@ -2,9 +2,13 @@
 Serializers for the medicine API.
 """
 from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, MANY_RELATION_KWARGS
 
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
 
+from core.serializers import DynamicFieldsMixin
+from core.inventory import InsufficientStock, record_movement
 from core.utils import measurement_choices
 from core.models import (
     MedClass,
@@ -12,11 +16,55 @@ from core.models import (
     Medicine,
     Disease,
     Treatment,
-    Patient
+    Patient,
+    Church,
+    StockBalance,
+    StockMovement
 )
 
 
-class BasicNameOnlyModelSerializer(serializers.ModelSerializer):
+class BulkManyRelatedField(ManyRelatedField):
+    """Many related field resolving all its primary keys in one query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise ValidationError(item)
+                pks.append(queryset.model._meta.pk.to_python(item))
+            except ValidationError:
+                child.fail('incorrect_type', data_type=type(item).__name__)
+
+        objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key related field validating many=True lists in bulk."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class BasicNameOnlyModelSerializer(DynamicFieldsMixin,
+                                   serializers.ModelSerializer):
     """Serializer Meta for models that has only name attr."""
 
     class Meta:
@@ -31,7 +79,7 @@ class MedClassSerializer(BasicNameOnlyModelSerializer):
         model = MedClass
 
 
-class MedicinePresentationSerializer(serializers.ModelSerializer):
+class MedicinePresentationSerializer(BasicNameOnlyModelSerializer):
     """Serializer fo the medclass endpoints."""
 
     class Meta(BasicNameOnlyModelSerializer.Meta):
@@ -56,7 +104,7 @@ class MedicineDetailSerializer(MedicineSerializer):
 
     class Meta(MedicineSerializer.Meta):
         fields = MedicineSerializer.Meta.fields + \
-              ['classification', 'batch']
+              ['classification', 'batch', 'expiry_date']
 
 
 class DiseaseSerializer(BasicNameOnlyModelSerializer):
@@ -66,7 +114,7 @@ class DiseaseSerializer(BasicNameOnlyModelSerializer):
         model = Disease
 
 
-class TreatmentSerializer(serializers.ModelSerializer):
+class TreatmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the treatments."""
     patient = serializers.PrimaryKeyRelatedField(
         queryset=Patient.objects.all(),
@@ -75,7 +123,7 @@ class TreatmentSerializer(serializers.ModelSerializer):
     disease = serializers.PrimaryKeyRelatedField(
         queryset=Disease.objects.all(),
         required=True)
-    medicine = serializers.PrimaryKeyRelatedField(
+    medicine = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Medicine.objects.all(),
         required=False
@@ -86,19 +134,15 @@ class TreatmentSerializer(serializers.ModelSerializer):
         fields = ['id', 'patient', 'disease', 'medicine']
         read_only_fields = ['id']
 
-    def _get_set_medicines(self, medicines, treatment):
-        """Get medicine id list and add it to the treatment."""
-        invalid_meds = []
-        for obj in medicines:
-            try:
-                medicine_id = obj.id
-                medicine_obj = Medicine.objects.get(id=medicine_id)
-                treatment.medicine.add(medicine_obj)
-            except Medicine.DoesNotExist:
-                invalid_meds.append(obj)
-
-        if len(invalid_meds) > 0:
-            return JsonResponse({'ivalid_meds': invalid_meds}, status=200)
+    def _get_set_medicines(self, medicines, treatment, created=False):
+        """
+        Link the treatment to the validated medicines. New treatments get a
+        single insert, existing ones only add and remove the difference.
+        """
+        if created:
+            treatment.medicine.add(*medicines)
+        else:
+            treatment.medicine.set(medicines)
 
     def create(self, validated_data):
         """Create new treatment instance in the DB."""
@@ -106,7 +150,7 @@ class TreatmentSerializer(serializers.ModelSerializer):
         treatment = Treatment.objects.create(**validated_data)
 
         if meds:
-            self._get_set_medicines(meds, treatment)
+            self._get_set_medicines(meds, treatment, created=True)
 
         return treatment
 
@@ -115,8 +159,82 @@ class TreatmentSerializer(serializers.ModelSerializer):
         meds = validated_data.pop('medicine', None)
 
         if meds is not None:
-            instance.medicine.clear()
             self._get_set_medicines(meds, instance)
 
         instance.save()
         return instance
+
+
+class StockBalanceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Serializer for the units of a medicine in stock at a church."""
+    medicine = MedicineSerializer(read_only=True)
+
+    class Meta:
+        model = StockBalance
+        fields = ['id', 'church', 'medicine', 'quantity']
+        read_only_fields = fields
+
+
+class StockMovementSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the stock ledger entries. Receipts add units and
+    dispensations, for a treatment prescribing the medicine, take them
+    away; adjustments correct the count either way.
+    """
+    church = serializers.PrimaryKeyRelatedField(
+        queryset=Church.objects.all(),
+        required=False
+    )
+
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'church', 'medicine', 'kind', 'quantity', 'donor',
+                  'treatment', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate(self, attrs):
+        """Check the sign of the quantity and the references of the kind."""
+        kind, quantity = attrs['kind'], attrs['quantity']
+        treatment = attrs.get('treatment')
+        errors = {}
+        if kind == StockMovement.RECEIPT and quantity <= 0:
+            errors['quantity'] = _('Receipts add a positive quantity.')
+        elif kind == StockMovement.DISPENSATION and quantity >= 0:
+            errors['quantity'] = _('Dispensations take a negative quantity.')
+        elif kind == StockMovement.ADJUSTMENT and quantity == 0:
+            errors['quantity'] = _('Adjustments change the quantity.')
+
+        if kind == StockMovement.DISPENSATION:
+            if treatment is None:
+                errors['treatment'] = _('Dispensations need a treatment.')
+            elif not treatment.medicine.filter(
+                pk=attrs['medicine'].pk
+            ).exists():
+                errors['medicine'] = _('The treatment does not prescribe '
+                                       'this medicine.')
+            else:
+                # Units are dispensed from the church of the patient.
+                church = attrs.pop('church', None)
+                attrs['church_id'] = treatment.patient.church_id
+                if church is not None and church.pk != attrs['church_id']:
+                    errors['church'] = _('The patient of the treatment is '
+                                         'not from this church.')
+        elif treatment is not None:
+            errors['treatment'] = _('Only dispensations have a treatment.')
+        if kind != StockMovement.DISPENSATION and 'church' not in attrs:
+            errors['church'] = _('This field is required.')
+        if kind != StockMovement.RECEIPT and attrs.get('donor') is not None:
+            errors['donor'] = _('Only receipts have a donor.')
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def create(self, validated_data):
+        """Write the movement and apply it to the stock balance."""
+        try:
+            return record_movement(**validated_data)
+        except InsufficientStock:
+            raise serializers.ValidationError(
+                {'quantity': _('Not enough units in stock.')}
+            )
@@ -9,7 +9,9 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 from core.models import (
+    MedClass,
     Medicine,
+    MedicinePresentation,
 )
 
 from medicine.serializers import MedicineSerializer
@@ -100,10 +102,41 @@ class PrivateMedicineAPITests(TestCase):
 
         res = self.client.get(MEDICINE_URL)
 
-        medicines = Medicine.objects.all()
+        medicines = Medicine.objects.all().order_by('id')
         serializer = MedicineSerializer(medicines, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_staff_medicine_invalid_id(self):
+        """Test retrieving a medicine by a non numeric id is not found."""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_medicines(self):
+        """Test filtering medicines by classification, presentation, name."""
+        analgesic = MedClass.objects.create(name='Analgesic')
+        tablet = MedicinePresentation.objects.create(name='Tablet')
+        dipirone = Medicine.objects.create(name='Dipirone',
+                                           classification=analgesic,
+                                           presentation=tablet)
+        diclofenac = Medicine.objects.create(name='Diclofenac',
+                                             classification=analgesic)
+        amoxicillin = Medicine.objects.create(name='Amoxicillin',
+                                              presentation=tablet)
+
+        def ids(params):
+            res = self.client.get(MEDICINE_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return [item['id'] for item in res.data['results']]
+
+        self.assertEqual(ids({'classification': analgesic.id}),
+                         [dipirone.id, diclofenac.id])
+        self.assertEqual(ids({'presentation': tablet.id}),
+                         [dipirone.id, amoxicillin.id])
+        self.assertEqual(ids({'name': 'di'}), [dipirone.id, diclofenac.id])
+        self.assertEqual(ids({'name': 'dip', 'presentation': tablet.id}),
+                         [dipirone.id])
 
     def test_staff_delete_medicine(self):
         """Test staff user deleting medicine instance success."""
@@ -0,0 +1,143 @@
+"""
+Tests for the medicine batch expiry API.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.inventory import (
+    expiring_medicines,
+    precompute_expiring_stock,
+    record_movement,
+)
+from core.models import (
+    Church,
+    Denomination,
+    ExpiringStock,
+    Medicine,
+)
+
+
+EXPIRING_URL = reverse('medicine:medicine-expiring')
+
+
+def church_expiring_url(church_id):
+    """Create and return the expiring stock URL of a church."""
+    return reverse('church:church-expiring', args=[church_id])
+
+
+class PrivateMedicineExpiryAPITests(TestCase):
+    """Test the expiring medicine batches of authenticated users."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        self.church = Church.objects.create(
+            name='Iglesia',
+            denomination=Denomination.objects.create(name='Metodista'),
+        )
+        today = timezone.localdate()
+        self.batches = {
+            days: Medicine.objects.create(
+                name=f'Batch {days}', batch=f'B{days}',
+                expiry_date=today + timedelta(days=days),
+            )
+            for days in (-1, 0, 20, 10, 60)
+        }
+        Medicine.objects.create(name='Without expiry')
+
+    def receive(self, days, quantity=5):
+        """Receive units of the batch expiring in `days` at the church."""
+        record_movement(church=self.church, medicine=self.batches[days],
+                        kind='receipt', quantity=quantity)
+
+    def test_expiring_batches(self):
+        """Test the batches expiring in the days, the first one first."""
+        res = self.client.get(EXPIRING_URL, {'days': 30})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in res.data['results']],
+                         ['Batch 0', 'Batch 10', 'Batch 20'])
+        self.assertEqual(res.data['results'][0]['expiry_date'],
+                         str(timezone.localdate()))
+
+    def test_expiring_batches_pages(self):
+        """Test the expiring batches are paginated in expiry order."""
+        res = self.client.get(EXPIRING_URL, {'days': 90, 'page_size': 2})
+        names = [row['name'] for row in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [row['name'] for row in res.data['results']]
+
+        self.assertEqual(names, ['Batch 0', 'Batch 10', 'Batch 20',
+                                 'Batch 60'])
+
+    def test_expiring_batches_pages_same_date(self):
+        """Test paging past more batches expiring the same day than 1000."""
+        expiry_date = timezone.localdate() + timedelta(days=5)
+        Medicine.objects.bulk_create([
+            Medicine(name=f'Tie {index}', expiry_date=expiry_date)
+            for index in range(1205)
+        ])
+        expected = list(expiring_medicines(90).values_list('id', flat=True))
+
+        ids, url, params = [], EXPIRING_URL, {'days': 90, 'page_size': 100}
+        while url and len(ids) <= len(expected):
+            res = self.client.get(url, params)
+            ids += [row['id'] for row in res.data['results']]
+            url, params = res.data['next'], None
+
+        self.assertEqual(ids, expected)
+        last = len(expected) - len(res.data['results'])
+        res = self.client.get(res.data['previous'])
+        self.assertEqual([row['id'] for row in res.data['results']],
+                         expected[last - 100:last])
+
+    def test_expiring_batches_in_stock(self):
+        """Test the expiring batches in stock at a church."""
+        self.receive(20)
+        self.receive(60)
+
+        res = self.client.get(EXPIRING_URL, {'church': self.church.id})
+
+        self.assertEqual([row['name'] for row in res.data['results']],
+                         ['Batch 20'])
+
+    def test_expiring_invalid_days(self):
+        """Test a negative number of days is rejected."""
+        res = self.client.get(EXPIRING_URL, {'days': -1})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('days', res.data)
+
+    def test_church_expiring_stock(self):
+        """Test the precomputed expiring stock of a church."""
+        for days in (-1, 20, 10, 60):
+            self.receive(days, quantity=days + 2)
+
+        self.assertEqual(precompute_expiring_stock(30), 2)
+        res = self.client.get(church_expiring_url(self.church.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['batch'], row['quantity']) for row in res.data['results']],
+            [('B10', 12), ('B20', 22)],
+        )
+
+    def test_precompute_replaces_stock(self):
+        """Test a new precompute drops the batches no longer in stock."""
+        self.receive(10)
+        precompute_expiring_stock(30)
+        record_movement(church=self.church, medicine=self.batches[10],
+                        kind='adjustment', quantity=-5)
+
+        precompute_expiring_stock(30)
+
+        self.assertFalse(ExpiringStock.objects.exists())
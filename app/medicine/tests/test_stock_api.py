@@ -0,0 +1,169 @@
+"""
+Tests for the medicine stock API.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.inventory import rebuild_stock_balances
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    Donor,
+    Medicine,
+    Patient,
+    StockBalance,
+    StockMovement,
+    Treatment,
+)
+
+
+STOCK_URL = reverse('medicine:stockbalance-list')
+MOVEMENT_URL = reverse('medicine:stockmovement-list')
+
+
+class PublicStockAPITests(TestCase):
+    """Test unauthenticated stock requests."""
+
+    def test_stock_unauthenticated(self):
+        """Test the stock requires authentication."""
+        res = APIClient().get(STOCK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStockAPITests(TestCase):
+    """Test the medicine stock of authenticated users."""
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(name='Iglesia',
+                                            denomination=denomination)
+        self.other = Church.objects.create(name='Otra',
+                                           denomination=denomination)
+        self.medicine = Medicine.objects.create(name='Salbutamol')
+        self.donor = Donor.objects.create(
+            contact=Contact.objects.create(name='Donor')
+        )
+        patient = Patient.objects.create(
+            contact=Contact.objects.create(name='Patient'),
+            ci='00000000001', church=self.church,
+        )
+        self.treatment = Treatment.objects.create(
+            patient=patient, disease=Disease.objects.create(name='Asma')
+        )
+        self.treatment.medicine.add(self.medicine)
+
+    def move(self, **payload):
+        """Post a stock movement of the medicine."""
+        return self.client.post(
+            MOVEMENT_URL, {'medicine': self.medicine.id, **payload},
+            format='json'
+        )
+
+    def balance(self, church=None):
+        """Return the units of the medicine at the church."""
+        return StockBalance.objects.get(church=church or self.church,
+                                        medicine=self.medicine).quantity
+
+    def test_receipt_and_dispensation(self):
+        """Test the movements are recorded and applied to the balance."""
+        res = self.move(church=self.church.id, kind='receipt', quantity=10,
+                        donor=self.donor.id)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.move(kind='dispensation', quantity=-4,
+                        treatment=self.treatment.id)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['church'], self.church.id)
+        self.assertEqual(self.balance(), 6)
+        self.assertEqual(StockMovement.objects.count(), 2)
+
+    def test_dispensation_over_stock_rejected(self):
+        """Test dispensing more than in stock changes nothing."""
+        self.move(church=self.church.id, kind='receipt', quantity=3)
+
+        res = self.move(kind='dispensation', quantity=-4,
+                        treatment=self.treatment.id)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', res.data)
+        self.assertEqual(self.balance(), 3)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_invalid_movements(self):
+        """Test the kind of a movement sets its sign and references."""
+        payloads = [
+            ({'church': self.church.id, 'kind': 'receipt', 'quantity': -1},
+             'quantity'),
+            ({'kind': 'dispensation', 'quantity': -1}, 'treatment'),
+            ({'kind': 'receipt', 'quantity': 1}, 'church'),
+            ({'church': self.other.id, 'kind': 'dispensation',
+              'quantity': -1, 'treatment': self.treatment.id}, 'church'),
+            ({'church': self.church.id, 'kind': 'adjustment',
+              'quantity': 1, 'donor': self.donor.id}, 'donor'),
+        ]
+        for payload, field in payloads:
+            res = self.move(**payload)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, res.data)
+
+    def test_dispensation_needs_prescribed_medicine(self):
+        """Test only medicines of the treatment are dispensed for it."""
+        self.treatment.medicine.clear()
+
+        res = self.move(kind='dispensation', quantity=-1,
+                        treatment=self.treatment.id)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('medicine', res.data)
+
+    def test_stock_of_church(self):
+        """Test the medicines in stock at a church are listed."""
+        empty = Medicine.objects.create(name='Dipirona')
+        self.move(church=self.church.id, kind='receipt', quantity=5)
+        self.move(church=self.other.id, kind='receipt', quantity=2)
+        StockBalance.objects.create(church=self.church, medicine=empty)
+
+        res = self.client.get(STOCK_URL, {'church': self.church.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['medicine']['name'], row['quantity'])
+             for row in res.data['results']],
+            [('Salbutamol', 5)],
+        )
+        res = self.client.get(STOCK_URL, {'church': self.church.id,
+                                          'empty': 1})
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_ledger_cannot_change(self):
+        """Test ledger entries cannot be updated or deleted."""
+        res = self.move(church=self.church.id, kind='receipt', quantity=5)
+        url = reverse('medicine:stockmovement-detail', args=[res.data['id']])
+
+        self.assertEqual(self.client.patch(url, {'quantity': 50}).status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.delete(url).status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_rebuild_balances(self):
+        """Test the balances rebuilt from the ledger match the kept ones."""
+        self.move(church=self.church.id, kind='receipt', quantity=5)
+        self.move(church=self.church.id, kind='adjustment', quantity=-2)
+        StockBalance.objects.update(quantity=0)
+
+        rebuild_stock_balances([self.church.id])
+
+        self.assertEqual(self.balance(), 3)
@@ -1,7 +1,9 @@
 """
 Tests for the Treatment API.
 """
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
@@ -160,3 +162,60 @@ class PrivateTreatmentAPITest(TestCase):
         url = reverse('medicine:treatment-detail', args=[treatment.id])
         res = self.client.delete(url)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_create_treatment_medicine_query_count_constant(self):
+        """Test attaching more medicines does not cost more queries."""
+        few = [Medicine.objects.create(name=f'Few {i}').id for i in range(2)]
+        many = [
+            Medicine.objects.create(name=f'Many {i}').id for i in range(20)
+        ]
+
+        with CaptureQueriesContext(connection) as few_queries:
+            self.client.post(TREATMENT_URL,
+                             {**self.treatment_data, 'medicine': few},
+                             format='json')
+        with CaptureQueriesContext(connection) as many_queries:
+            res = self.client.post(TREATMENT_URL,
+                                   {**self.treatment_data, 'medicine': many},
+                                   format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(few_queries), len(many_queries))
+        treatment = Treatment.objects.get(id=res.data['id'])
+        self.assertEqual(treatment.medicine.count(), 20)
+
+    def test_create_treatment_unknown_medicine(self):
+        """Test an unknown medicine id is rejected and nothing created."""
+        payload = {**self.treatment_data,
+                   'medicine': [self.medicine.id, 987654]}
+
+        res = self.client.post(TREATMENT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('medicine', res.data)
+        self.assertFalse(Treatment.objects.exists())
+
+    def test_update_treatment_keeps_unchanged_links(self):
+        """Test updating medicines only touches the changed links."""
+        treatment = Treatment.objects.create(patient=self.patient,
+                                             disease=self.disease)
+        other = Medicine.objects.create(name="Other Medicine")
+        treatment.medicine.add(self.medicine, other)
+        Through = Treatment.medicine.through
+        kept = Through.objects.get(treatment=treatment,
+                                   medicine=self.medicine)
+        new_medicine = Medicine.objects.create(name="New Medicine")
+
+        url = reverse('medicine:treatment-detail', args=[treatment.id])
+        res = self.client.patch(
+            url,
+            {'medicine': [self.medicine.id, new_medicine.id]},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(treatment.medicine.values_list('id', flat=True)),
+            {self.medicine.id, new_medicine.id}
+        )
+        self.assertTrue(Through.objects.filter(id=kept.id).exists())
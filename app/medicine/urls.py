@@ -13,6 +13,8 @@ router.register('medicinepresentation', views.MedicinePresentationViewSet)
 router.register('medicine', views.MedicineViewSet)
 router.register('disease', views.DiseaseViewSet)
 router.register('treatments', views.TreatmentViewSet)
+router.register('stock', views.StockBalanceViewSet)
+router.register('stockmovements', views.StockMovementViewSet)
 
 
 app_name = 'medicine'
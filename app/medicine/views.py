@@ -3,35 +3,52 @@ Views for the medicine API.
 """
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from django.utils.translation import gettext as _
+
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import (
+    mixins,
     viewsets,
 )
 
 from medicine import serializers
 
+from core import filters
+from core.inventory import expiring_medicines
+from core.mixins import (
+    CachedListMixin,
+    ConditionalGetMixin,
+    OptimizedQuerySetMixin,
+)
+from core.pagination import ExpiryCursorPagination, IdCursorPagination
 from core. models import (
     MedClass,
     MedicinePresentation,
     Medicine,
     Disease,
+    StockBalance,
+    StockMovement,
     Treatment
 )
 
 
-class BaseNameOnlyPrivateModel(viewsets.ModelViewSet):
+class BaseNameOnlyPrivateModel(ConditionalGetMixin, OptimizedQuerySetMixin,
+                               viewsets.ModelViewSet):
     """Basic view Authorization for name-only models."""
     authentication_classes = [JWTAuthentication]
+    pagination_class = IdCursorPagination
     permission_classes = [IsAuthenticated]
 
 
-class MedClassViewSet(BaseNameOnlyPrivateModel):
+class MedClassViewSet(CachedListMixin, BaseNameOnlyPrivateModel):
     """Manage medicine classifications."""
     serializer_class = serializers.MedClassSerializer
     queryset = MedClass.objects.all()
 
 
-class MedicinePresentationViewSet(BaseNameOnlyPrivateModel):
+class MedicinePresentationViewSet(CachedListMixin, BaseNameOnlyPrivateModel):
     serializer_class = serializers.MedicinePresentationSerializer
     queryset = MedicinePresentation.objects.all()
 
@@ -41,6 +58,25 @@ class MedicineViewSet(BaseNameOnlyPrivateModel):
     serializer_class = serializers.MedicineDetailSerializer
     queryset = Medicine.objects.all()
 
+    def get_queryset(self):
+        """
+        Filter medicines by `classification` and `presentation` ids and by
+        a case insensitive `name` prefix.
+        """
+        queryset = super().get_queryset()
+        classifications = filters.int_list_param(self.request,
+                                                 'classification')
+        if classifications:
+            queryset = queryset.filter(classification__in=classifications)
+        presentations = filters.int_list_param(self.request, 'presentation')
+        if presentations:
+            queryset = queryset.filter(presentation__in=presentations)
+        name = filters.str_param(self.request, 'name')
+        if name:
+            queryset = queryset.filter(name__istartswith=name)
+
+        return queryset
+
     def get_serializer_class(self):
         """Return the serializer class for request."""
         if self.action == 'list':
@@ -48,8 +84,32 @@ class MedicineViewSet(BaseNameOnlyPrivateModel):
 
         return self.serializer_class
 
-
-class DiseaseViewSet(BaseNameOnlyPrivateModel):
+    @action(detail=False, methods=['get'],
+            pagination_class=ExpiryCursorPagination)
+    def expiring(self, request):
+        """
+        List the medicine batches expiring within `days`, the first to
+        expire first, to dispense them before the rest. With `church` ids
+        only the batches in stock at those churches are listed.
+        """
+        days = filters.int_param(request, 'days')
+        if days is not None and days < 0:
+            raise ValidationError({'days': _('Enter a positive number.')})
+        queryset = expiring_medicines(days, self.get_queryset())
+        churches = filters.int_list_param(request, 'church')
+        if churches:
+            queryset = queryset.filter(
+                id__in=StockBalance.objects.filter(
+                    church__in=churches, quantity__gt=0
+                ).values('medicine')
+            )
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class DiseaseViewSet(CachedListMixin, BaseNameOnlyPrivateModel):
     """Manage disease endpoints."""
     serializer_class = serializers.DiseaseSerializer
     queryset = Disease.objects.all()
@@ -59,3 +119,60 @@ class TreatmentViewSet(BaseNameOnlyPrivateModel):
     """Manage treatments."""
     serializer_class = serializers.TreatmentSerializer
     queryset = Treatment.objects.all()
+
+
+class StockBalanceViewSet(OptimizedQuerySetMixin, mixins.ListModelMixin,
+                          viewsets.GenericViewSet):
+    """Units of the medicines in stock at the churches."""
+    authentication_classes = [JWTAuthentication]
+    pagination_class = IdCursorPagination
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.StockBalanceSerializer
+    queryset = StockBalance.objects.all()
+
+    def get_queryset(self):
+        """
+        Filter the balances by `church` and `medicine` ids. Only medicines
+        in stock are listed unless `empty=1` is sent.
+        """
+        queryset = super().get_queryset()
+        churches = filters.int_list_param(self.request, 'church')
+        if churches:
+            queryset = queryset.filter(church__in=churches)
+        medicines = filters.int_list_param(self.request, 'medicine')
+        if medicines:
+            queryset = queryset.filter(medicine__in=medicines)
+        if filters.int_param(self.request, 'empty') != 1:
+            queryset = queryset.filter(quantity__gt=0)
+
+        return queryset
+
+
+class StockMovementViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Medicine stock ledger. Entries are never changed or removed, mistakes
+    are corrected with adjustments.
+    """
+    authentication_classes = [JWTAuthentication]
+    pagination_class = IdCursorPagination
+    permission_classes = [IsAuthenticated]
+    serializer_class = serializers.StockMovementSerializer
+    queryset = StockMovement.objects.all()
+
+    def get_queryset(self):
+        """Filter the entries by `church`, `medicine` and `kind`."""
+        queryset = super().get_queryset()
+        churches = filters.int_list_param(self.request, 'church')
+        if churches:
+            queryset = queryset.filter(church__in=churches)
+        medicines = filters.int_list_param(self.request, 'medicine')
+        if medicines:
+            queryset = queryset.filter(medicine__in=medicines)
+        kinds = filters.str_param(self.request, 'kind')
+        if kinds:
+            queryset = queryset.filter(kind__in=kinds.lower().split(','))
+
+        return queryset
@@ -0,0 +1,39 @@
+"""
+Serializers for the reports API.
+"""
+from rest_framework import serializers
+
+from core.models import (
+    MedicineDemandReport,
+    MunicipalityDiseaseReport,
+    ProvincePatientsReport,
+)
+
+
+class ProvincePatientsReportSerializer(serializers.ModelSerializer):
+    """Serializer for the patients per province report."""
+
+    class Meta:
+        model = ProvincePatientsReport
+        fields = ['id', 'province', 'churches', 'patients', 'treatments']
+        read_only_fields = fields
+
+
+class MunicipalityDiseaseReportSerializer(serializers.ModelSerializer):
+    """Serializer for the treatments per disease and municipality report."""
+
+    class Meta:
+        model = MunicipalityDiseaseReport
+        fields = ['id', 'municipality_id', 'municipality', 'province',
+                  'disease_id', 'disease', 'treatments', 'patients']
+        read_only_fields = fields
+
+
+class MedicineDemandReportSerializer(serializers.ModelSerializer):
+    """Serializer for the medicine demand per classification report."""
+
+    class Meta:
+        model = MedicineDemandReport
+        fields = ['id', 'classification_id', 'classification', 'medicines',
+                  'prescriptions', 'patients']
+        read_only_fields = fields
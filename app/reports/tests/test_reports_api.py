@@ -0,0 +1,173 @@
+"""
+Tests for the reports API.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    MedClass,
+    Medicine,
+    Municipality,
+    Patient,
+    ReportRefresh,
+    Treatment,
+)
+from core.reports import refresh_reports
+
+
+PROVINCES_URL = reverse('reports:province-list')
+DISEASES_URL = reverse('reports:disease-list')
+MEDICINES_URL = reverse('reports:medicine-list')
+
+
+class PublicReportsAPITests(TestCase):
+    """Test unauthenticated report requests."""
+
+    def test_reports_unauthenticated(self):
+        """Test the reports require authentication."""
+        res = APIClient().get(PROVINCES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateReportsAPITests(TestCase):
+    """Test the reports of authenticated users."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        denomination = Denomination.objects.create(name='Metodista')
+        self.playa = Municipality.objects.create(name='Playa',
+                                                 province='HAB')
+        self.cardenas = Municipality.objects.create(name='Cardenas',
+                                                    province='MTZ')
+        self.churches = [
+            Church.objects.create(name=f'Iglesia {municipality.name}',
+                                  denomination=denomination,
+                                  municipality=municipality)
+            for municipality in (self.playa, self.cardenas)
+        ]
+        self.asma = Disease.objects.create(name='Asma')
+        self.gripe = Disease.objects.create(name='Gripe')
+        self.salbutamol = Medicine.objects.create(
+            name='Salbutamol',
+            classification=MedClass.objects.create(name='Broncodilatador'),
+        )
+        self.dipirona = Medicine.objects.create(name='Dipirona')
+
+    def create_patient(self, ci, church, treatments):
+        """Create a patient with a treatment per disease and medicines."""
+        patient = Patient.objects.create(
+            contact=Contact.objects.create(name=f'Patient {ci}'),
+            ci=ci, church=church,
+        )
+        for disease, medicines in treatments:
+            treatment = Treatment.objects.create(patient=patient,
+                                                 disease=disease)
+            treatment.medicine.set(medicines)
+
+    def create_data(self):
+        """Create patients in both churches and refresh the reports."""
+        playa, cardenas = self.churches
+        self.create_patient('00000000001', playa,
+                            [(self.asma, [self.salbutamol]),
+                             (self.gripe, [self.dipirona])])
+        self.create_patient('00000000002', playa,
+                            [(self.asma, [self.salbutamol, self.dipirona])])
+        self.create_patient('00000000003', cardenas, [])
+        refresh_reports()
+
+    def test_reports_empty_before_refresh(self):
+        """Test the reports only show the data of the last refresh."""
+        refresh_reports()
+        self.create_patient('00000000001', self.churches[0],
+                            [(self.asma, [])])
+
+        res = self.client.get(PROVINCES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['patients'] for row in res.data['results']],
+                         [0, 0])
+
+    def test_province_report(self):
+        """Test the patients and treatments per province."""
+        self.create_data()
+
+        res = self.client.get(PROVINCES_URL)
+
+        self.assertEqual(
+            [(row['province'], row['churches'], row['patients'],
+              row['treatments']) for row in res.data['results']],
+            [('HAB', 1, 2, 3), ('MTZ', 1, 1, 0)],
+        )
+
+    def test_disease_report(self):
+        """Test the treatments per disease and municipality, filtered."""
+        self.create_data()
+
+        res = self.client.get(DISEASES_URL, {'province': 'hab'})
+
+        self.assertEqual(
+            [(row['municipality'], row['disease'], row['treatments'],
+              row['patients']) for row in res.data['results']],
+            [('Playa', 'Asma', 2, 2), ('Playa', 'Gripe', 1, 1)],
+        )
+
+        res = self.client.get(DISEASES_URL, {'disease': self.gripe.id})
+
+        self.assertEqual([row['disease'] for row in res.data['results']],
+                         ['Gripe'])
+
+    def test_medicine_report(self):
+        """Test the prescriptions per medicine classification."""
+        self.create_data()
+
+        res = self.client.get(MEDICINES_URL)
+
+        self.assertEqual(
+            [(row['classification'], row['medicines'], row['prescriptions'],
+              row['patients']) for row in res.data['results']],
+            [('Broncodilatador', 1, 2, 2), (None, 1, 2, 2)],
+        )
+
+    def test_refresh_renews_cached_report(self):
+        """Test a refresh replaces the cached report responses."""
+        refresh_reports()
+        res = self.client.get(PROVINCES_URL)
+        etag = res['ETag']
+        self.assertEqual(
+            self.client.get(PROVINCES_URL,
+                            HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        self.create_data()
+
+        res = self.client.get(PROVINCES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['patients'], 2)
+
+    def test_refresh_in_other_process_renews_report(self):
+        """Test a refresh recorded by another process renews the report."""
+        refresh_reports()
+        etag = self.client.get(PROVINCES_URL)['ETag']
+        ReportRefresh.objects.filter(
+            model='core.provincepatientsreport',
+        ).update(refreshed_at=timezone.now())
+
+        res = self.client.get(PROVINCES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,25 @@
+"""
+URL mapping for the reports API.
+"""
+from django.urls import path, include
+
+from rest_framework.routers import DefaultRouter
+
+from reports import views
+
+
+router = DefaultRouter()
+router.register('provinces', views.ProvincePatientsReportViewSet,
+                basename='province')
+router.register('diseases', views.MunicipalityDiseaseReportViewSet,
+                basename='disease')
+router.register('medicines', views.MedicineDemandReportViewSet,
+                basename='medicine')
+
+
+app_name = 'reports'
+
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
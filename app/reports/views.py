@@ -0,0 +1,94 @@
+"""
+Views for the reports API.
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from rest_framework import mixins, viewsets
+from rest_framework.permissions import IsAuthenticated
+
+from core import filters
+from core.mixins import CachedListMixin
+from core.models import (
+    MedicineDemandReport,
+    MunicipalityDiseaseReport,
+    ProvincePatientsReport,
+)
+from core.pagination import IdCursorPagination
+from core.reports import report_version
+from reports import serializers
+
+
+class BaseReportViewSet(CachedListMixin, mixins.ListModelMixin,
+                        viewsets.GenericViewSet):
+    """
+    Base viewset listing the rows of a precomputed report. The rows and
+    the cached responses are renewed by the `refresh_reports` command.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    pagination_class = IdCursorPagination
+
+    def get_data_version(self):
+        """Return the version of the last refresh of the report."""
+        return report_version(self.queryset.model)
+
+
+class ProvincePatientsReportViewSet(BaseReportViewSet):
+    """Churches, patients and treatments per province."""
+    serializer_class = serializers.ProvincePatientsReportSerializer
+    queryset = ProvincePatientsReport.objects.all()
+
+    def get_queryset(self):
+        """Filter the rows by `province` codes."""
+        queryset = super().get_queryset()
+        provinces = filters.str_param(self.request, 'province')
+        if provinces:
+            queryset = queryset.filter(
+                province__in=provinces.upper().split(',')
+            )
+
+        return queryset
+
+
+class MunicipalityDiseaseReportViewSet(BaseReportViewSet):
+    """Treatments and patients per disease in every municipality."""
+    serializer_class = serializers.MunicipalityDiseaseReportSerializer
+    queryset = MunicipalityDiseaseReport.objects.all()
+
+    def get_queryset(self):
+        """
+        Filter the rows by `province` codes and by `municipality` and
+        `disease` ids.
+        """
+        queryset = super().get_queryset()
+        provinces = filters.str_param(self.request, 'province')
+        if provinces:
+            queryset = queryset.filter(
+                province__in=provinces.upper().split(',')
+            )
+        municipalities = filters.int_list_param(self.request, 'municipality')
+        if municipalities:
+            queryset = queryset.filter(municipality_id__in=municipalities)
+        diseases = filters.int_list_param(self.request, 'disease')
+        if diseases:
+            queryset = queryset.filter(disease_id__in=diseases)
+
+        return queryset
+
+
+class MedicineDemandReportViewSet(BaseReportViewSet):
+    """Prescriptions of the medicines of every classification."""
+    serializer_class = serializers.MedicineDemandReportSerializer
+    queryset = MedicineDemandReport.objects.all()
+
+    def get_queryset(self):
+        """Filter the rows by `classification` ids."""
+        queryset = super().get_queryset()
+        classifications = filters.int_list_param(self.request,
+                                                 'classification')
+        if classifications:
+            queryset = queryset.filter(
+                classification_id__in=classifications
+            )
+
+        return queryset
@@ -0,0 +1,200 @@
+"""
+Tests for the delta sync API.
+"""
+import gzip
+import json
+
+import psycopg2
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Church,
+    Contact,
+    Denomination,
+    Disease,
+    Medicine,
+    Note,
+    Patient,
+    PhoneNumber,
+    Treatment,
+)
+
+
+SYNC_URL = reverse('sync:sync')
+
+
+def create_patient(name, ci, church):
+    """Create and return a patient with a phone number."""
+    contact = Contact.objects.create(name=name)
+    PhoneNumber.objects.create(contact=contact, number=f'+53{ci[-8:]}')
+    return Patient.objects.create(contact=contact, ci=ci, church=church)
+
+
+class PublicSyncAPITests(TestCase):
+    """Test unauthenticated sync requests."""
+
+    def test_anonymous_sync(self):
+        """Test the sync requires authentication."""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncAPITests(TransactionTestCase):
+    """
+    Test the authenticated delta sync. Writes commit, as the sync only
+    covers committed transactions.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(id=999999,
+                                                    email='test@example.com')
+        self.client.force_authenticate(user=user)
+        denomination = Denomination.objects.create(name='Metodista')
+        self.church = Church.objects.create(name='Iglesia',
+                                            denomination=denomination)
+        self.patients = [
+            create_patient(f'Patient {index}', f'0000000000{index}',
+                           self.church)
+            for index in range(3)
+        ]
+
+    def sync(self, cursor=None, **params):
+        """Follow the pages of a sync and return them and the cursor."""
+        pages = []
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            res = self.client.get(SYNC_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            cursor = res.data['cursor']
+            if not res.data['more']:
+                return pages, cursor
+
+    def ids(self, pages, name):
+        """Return the ids of the rows of a model sent in the pages."""
+        return [row['id'] for page in pages
+                for row in page['changes'].get(name, [])]
+
+    def test_full_sync(self):
+        """Test a sync without cursor sends every row."""
+        pages, cursor = self.sync()
+
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(self.ids(pages, 'patient'),
+                         [patient.id for patient in self.patients])
+        self.assertEqual(self.ids(pages, 'church'), [self.church.id])
+        self.assertEqual(len(self.ids(pages, 'contact')), 3)
+        patient = pages[0]['changes']['patient'][0]
+        self.assertEqual(patient['church_id'], self.church.id)
+        self.assertEqual(patient['ci'], '00000000000')
+        self.assertEqual(pages[0]['deleted'], {})
+
+    def test_sync_pages(self):
+        """Test small pages send every row once, across models."""
+        pages, cursor = self.sync(page_size=2)
+
+        self.assertGreater(len(pages), 1)
+        self.assertTrue(all(
+            sum(len(rows) for rows in page['changes'].values()) <= 2
+            for page in pages
+        ))
+        self.assertEqual(self.ids(pages, 'patient'),
+                         [patient.id for patient in self.patients])
+        self.assertEqual(len(self.ids(pages, 'phonenumber')), 3)
+
+    def test_delta_sync(self):
+        """Test a sync with a cursor sends only the later changes."""
+        pages, cursor = self.sync()
+        changed, removed = self.patients[0], self.patients[1]
+        changed.ci = '11111111111'
+        changed.save()
+        phone = removed.contact.phonenumber_set.get()
+        removed.contact.delete()
+
+        pages, cursor = self.sync(cursor)
+
+        self.assertEqual(self.ids(pages, 'patient'), [changed.id])
+        self.assertEqual(self.ids(pages, 'church'), [])
+        self.assertEqual(pages[0]['deleted'], {
+            'contact': [removed.contact_id],
+            'phonenumber': [phone.id],
+            'patient': [removed.id],
+        })
+
+        pages, cursor = self.sync(cursor)
+        self.assertEqual(pages[0]['changes'], {})
+        self.assertEqual(pages[0]['deleted'], {})
+
+    def test_queryset_updates_synced(self):
+        """Test rows changed by queryset updates and cascades sync again."""
+        note = Note.objects.create(note='Note')
+        Church.objects.filter(id=self.church.id).update(note=note)
+        pages, cursor = self.sync()
+
+        Patient.objects.filter(id=self.patients[0].id).update(ci='2' * 11)
+        note.delete()
+        pages, cursor = self.sync(cursor)
+
+        self.assertEqual(self.ids(pages, 'patient'), [self.patients[0].id])
+        self.assertEqual(self.ids(pages, 'church'), [self.church.id])
+        self.assertIsNone(pages[0]['changes']['church'][0]['note_id'])
+
+    def test_late_commit_synced(self):
+        """Test a transaction committing after a sync is in the next one."""
+        other = psycopg2.connect(**connection.get_connection_params())
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute('UPDATE core_patient SET ci = %s WHERE id = %s',
+                           ['2' * 11, self.patients[0].id])
+
+        pages, cursor = self.sync()
+        self.assertEqual(
+            pages[0]['changes']['patient'][0]['ci'], '00000000000'
+        )
+        other.commit()
+        pages, cursor = self.sync(cursor)
+
+        self.assertEqual(self.ids(pages, 'patient'), [self.patients[0].id])
+        self.assertEqual(pages[0]['changes']['patient'][0]['ci'], '2' * 11)
+
+    def test_treatment_medicines_resynced(self):
+        """Test changing the medicines of a treatment sends it again."""
+        treatment = Treatment.objects.create(
+            patient=self.patients[0],
+            disease=Disease.objects.create(name='Asma'),
+        )
+        medicine = Medicine.objects.create(name='Salbutamol')
+        pages, cursor = self.sync()
+        self.assertEqual(pages[0]['changes']['treatment'][0]['medicine'], [])
+
+        treatment.medicine.add(medicine)
+        pages, cursor = self.sync(cursor)
+
+        self.assertEqual(pages[0]['changes']['treatment'][0]['medicine'],
+                         [medicine.id])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected."""
+        for cursor in ('not-a-cursor', 'e30='):
+            res = self.client.get(SYNC_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('cursor', res.data)
+
+    def test_sync_compressed(self):
+        """Test the sync is gzip compressed for clients accepting it."""
+        res = self.client.get(SYNC_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(res.content))
+        self.assertEqual(len(data['changes']['patient']), 3)
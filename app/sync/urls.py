@@ -0,0 +1,14 @@
+"""
+URL mapping for the sync API.
+"""
+from django.urls import path
+
+from sync import views
+
+
+app_name = 'sync'
+
+
+urlpatterns = [
+    path('', views.SyncView.as_view(), name='sync'),
+]
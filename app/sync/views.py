@@ -0,0 +1,42 @@
+"""
+Views for the sync API.
+"""
+from django.conf import settings
+from django.utils.translation import gettext as _
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import filters
+from core.sync import InvalidCursor, sync_page
+
+
+class SyncView(APIView):
+    """
+    Delta sync for offline clients. Without a `cursor` every row is sent;
+    with the cursor of the last page of a sync, only the rows created,
+    updated or deleted since. Pages hold up to `page_size` rows and are
+    followed while `more` is true.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the next page of changes."""
+        page_size = filters.int_param(request, 'page_size')
+        if page_size is not None and page_size < 1:
+            raise ValidationError(
+                {'page_size': _('Enter a positive whole number.')}
+            )
+        try:
+            page = sync_page(filters.str_param(request, 'cursor'),
+                             min(page_size or settings.SYNC_PAGE_SIZE,
+                                 settings.SYNC_PAGE_SIZE))
+        except InvalidCursor:
+            raise ValidationError({'cursor': _('Invalid cursor.')})
+
+        return Response(page)